@@ -0,0 +1,239 @@
+"""
+Amostragem adaptativa de regiões por quadtree.
+"""
+from src.models.weather_data import WeatherBatch
+
+class QuadtreeCell:
+    """
+    Célula da quadtree, definida em coordenadas inteiras da grade mais fina.
+    
+    Usar índices inteiros em vez de graus garante que os vértices partilhados por
+    células vizinhas correspondem exatamente ao mesmo ponto amostrado.
+    """
+    
+    __slots__ = ('row', 'col', 'size', 'depth', 'risk_range', 'children')
+    
+    def __init__(self, row, col, size, depth):
+        self.row = row
+        self.col = col
+        self.size = size
+        self.depth = depth
+        self.risk_range = None  # Diferença entre o maior e o menor risco dos vértices
+        self.children = []
+    
+    def corners(self):
+        """Retorna os índices (linha, coluna) dos quatro vértices."""
+        return [
+            (self.row, self.col),
+            (self.row, self.col + self.size),
+            (self.row + self.size, self.col),
+            (self.row + self.size, self.col + self.size)
+        ]
+    
+    def split_points(self):
+        """Retorna os índices dos cinco pontos novos necessários para subdividir a célula."""
+        half = self.size // 2
+        return [
+            (self.row + half, self.col + half),
+            (self.row, self.col + half),
+            (self.row + self.size, self.col + half),
+            (self.row + half, self.col),
+            (self.row + half, self.col + self.size)
+        ]
+    
+    def split(self):
+        """
+        Subdivide a célula em quatro quadrantes.
+        
+        Returns:
+            list: Células filhas
+        """
+        half = self.size // 2
+        self.children = [
+            QuadtreeCell(self.row + dr, self.col + dc, half, self.depth + 1)
+            for dr in (0, half)
+            for dc in (0, half)
+        ]
+        return self.children
+
+class AdaptiveSampler:
+    """
+    Amostra uma região começando numa grade grosseira e refinando apenas onde o risco varia.
+    
+    A região é dividida uniformemente até min_depth. A partir daí, em cada nível, as
+    células cujos vértices diferem em risco mais do que tolerance são subdivididas,
+    até max_depth. As células com maior variação são refinadas primeiro e o refinamento
+    para quando o próximo passo ultrapassaria max_calls pontos amostrados.
+    
+    O amostrador não faz chamadas: next_points indica os pontos a obter e
+    add_observations recebe as respetivas observações, pela mesma ordem.
+    """
+    
+    def __init__(self, bounds, tolerance=10.0, max_depth=4, max_calls=40, min_depth=1):
+        """
+        Inicializa o amostrador.
+        
+        Args:
+            bounds (dict): Limites da região {north, south, east, west}
+            tolerance (float): Diferença máxima de risco entre vértices sem subdividir
+            max_depth (int): Profundidade máxima da quadtree
+            max_calls (int): Número máximo de pontos amostrados, incluindo a grade inicial
+            min_depth (int): Profundidade da grade inicial uniforme
+        
+        Raises:
+            ValueError: Se os parâmetros forem inválidos ou a grade inicial exceder max_calls
+        """
+        if not 0 <= min_depth <= max_depth:
+            raise ValueError("É necessário 0 <= min_depth <= max_depth.")
+        if tolerance < 0 or max_calls < 1:
+            raise ValueError("tolerance deve ser >= 0 e max_calls >= 1.")
+        if (2 ** min_depth + 1) ** 2 > max_calls:
+            raise ValueError(f"A grade inicial de min_depth={min_depth} excede max_calls={max_calls}.")
+        
+        self.bounds = bounds
+        self.tolerance = tolerance
+        self.max_depth = max_depth
+        self.max_calls = max_calls
+        self.min_depth = min_depth
+        
+        # Número de divisões por lado da grade mais fina possível
+        self.resolution = 2 ** max_depth
+        self.root = QuadtreeCell(0, 0, self.resolution, 0)
+        
+        self._lat_step = (bounds['north'] - bounds['south']) / self.resolution
+        self._lon_step = (bounds['east'] - bounds['west']) / self.resolution
+        
+        self._order = []  # Índices dos pontos pela ordem em que foram amostrados
+        self._observations = {}  # {(linha, coluna): WeatherData ou None}
+        self._risk = {}  # {(linha, coluna): índice de risco ou None}
+        
+        self.budget_exhausted = False
+        self.depth_limited = 0
+        
+        # Grade inicial uniforme
+        self._frontier = [self.root]
+        while self._frontier[0].depth < min_depth:
+            self._frontier = [child for cell in self._frontier for child in cell.split()]
+        self._pending = self._unsampled(
+            point for cell in self._frontier for point in cell.corners()
+        )
+    
+    def _unsampled(self, points):
+        """Filtra pontos já amostrados ou repetidos, mantendo a ordem."""
+        result = []
+        seen = set(self._observations)
+        for point in points:
+            if point not in seen:
+                seen.add(point)
+                result.append(point)
+        return result
+    
+    def _coordinates(self, point):
+        row, col = point
+        return (self.bounds['south'] + row * self._lat_step, self.bounds['west'] + col * self._lon_step)
+    
+    def next_points(self):
+        """
+        Obtém os pontos a amostrar no passo atual.
+        
+        Returns:
+            list: Tuplas (lat, lon); lista vazia quando a amostragem terminou
+        """
+        return [self._coordinates(point) for point in self._pending]
+    
+    def add_observations(self, observations):
+        """
+        Regista as observações dos pontos pedidos e decide o refinamento seguinte.
+        
+        Args:
+            observations (list): WeatherData de cada ponto de next_points, ou None se falhou
+        """
+        points = self._pending
+        batch = WeatherBatch([self._coordinates(point) for point in points], observations)
+        risk_index, _, _ = batch.calculate_risk()
+        
+        for i, point in enumerate(points):
+            self._order.append(point)
+            self._observations[point] = observations[i]
+            self._risk[point] = float(risk_index[i]) if batch.valid[i] else None
+        
+        self._pending = []
+        self._refine()
+    
+    def _refine(self):
+        candidates = []
+        for cell in self._frontier:
+            risks = [self._risk[point] for point in cell.corners() if self._risk.get(point) is not None]
+            # Sem pelo menos dois vértices válidos não há variação a avaliar
+            if len(risks) < 2:
+                continue
+            cell.risk_range = max(risks) - min(risks)
+            if cell.risk_range <= self.tolerance:
+                continue
+            if cell.depth >= self.max_depth:
+                self.depth_limited += 1
+                continue
+            candidates.append(cell)
+        
+        # Refinar primeiro as células com maior variação
+        candidates.sort(key=lambda cell: cell.risk_range, reverse=True)
+        
+        frontier = []
+        pending = []
+        planned = set()
+        for cell in candidates:
+            new_points = [
+                point for point in cell.split_points()
+                if point not in self._observations and point not in planned
+            ]
+            if len(self._order) + len(pending) + len(new_points) > self.max_calls:
+                self.budget_exhausted = True
+                continue
+            planned.update(new_points)
+            pending.extend(new_points)
+            frontier.extend(cell.split())
+        
+        self._frontier = frontier
+        self._pending = pending
+    
+    @property
+    def coordinates(self):
+        """Tuplas (lat, lon) de todos os pontos amostrados."""
+        return [self._coordinates(point) for point in self._order]
+    
+    @property
+    def observations(self):
+        """Observações de todos os pontos amostrados, pela ordem de coordinates."""
+        return [self._observations[point] for point in self._order]
+    
+    def _cell_to_dict(self, cell):
+        south, west = self._coordinates((cell.row, cell.col))
+        north, east = self._coordinates((cell.row + cell.size, cell.col + cell.size))
+        node = {
+            'bounds': {'north': north, 'south': south, 'east': east, 'west': west},
+            'depth': cell.depth,
+            'risk_range': round(cell.risk_range, 2) if cell.risk_range is not None else None
+        }
+        if cell.children:
+            node['children'] = [self._cell_to_dict(child) for child in cell.children]
+        return node
+    
+    def to_dict(self):
+        """
+        Descreve a amostragem efetuada.
+        
+        Returns:
+            dict: Parâmetros, pontos amostrados, pontos da grade uniforme equivalente e a quadtree
+        """
+        return {
+            'mode': 'adaptive',
+            'tolerance': self.tolerance,
+            'min_depth': self.min_depth,
+            'max_depth': self.max_depth,
+            'max_calls': self.max_calls,
+            'points_sampled': len(self._order),
+            'uniform_points': (self.resolution + 1) ** 2,
+            'budget_exhausted': self.budget_exhausted,
+            'depth_limited_cells': self.depth_limited,
+            'quadtree': self._cell_to_dict(self.root)
+        }
@@ -0,0 +1,407 @@
+"""
+Serviço assíncrono para interação com a API OpenWeather.
+"""
+import asyncio
+import os
+import time
+import httpx
+import requests
+from src.models.openweather_service import OpenWeatherService
+from src.models.weather_data import WeatherData
+from src.models.weather_cache import WeatherCache, quantize_coordinates
+from src.models.single_flight import SingleFlight, SingleFlightTimeout
+from src.models.rate_limiter import TokenBucketRateLimiter, RateLimitExceeded
+from src.models.circuit_breaker import CircuitOpenError
+from src.models.weather_backends import ReplayMissError
+
+class AsyncOpenWeatherService:
+    """
+    Contraparte assíncrona de OpenWeatherService, baseada em httpx.AsyncClient.
+    
+    As conexões pertencem ao loop de eventos em que o cliente é aberto, por isso o
+    serviço deve ser usado como gestor de contexto assíncrono:
+        
+        async with AsyncOpenWeatherService() as service:
+            weather = await service.get_weather_by_location(lat, lon)
+    
+    ou aberto uma só vez com open() num loop de longa duração (ver BackgroundEventLoop),
+    em que todas as chamadas devem então ser feitas. Nesse caso o pool de conexões e o
+    limite max_concurrency são partilhados por todos os pedidos do processo.
+    """
+    
+    BASE_URL = OpenWeatherService.BASE_URL
+    RETRY_STATUS_CODES = OpenWeatherService.RETRY_STATUS_CODES
+    
+    def __init__(self, api_key=None, base_url=None, cache=None, max_concurrency=10,
+                 connect_timeout=3.05, read_timeout=10, max_retries=3, backoff_factor=0.5,
+                 single_flight=None, backend=None, rate_limiter=None, persistent_cache=None,
+                 circuit_breaker=None, sync_service=None, keep_raw=False):
+        """
+        Inicializa o serviço assíncrono.
+        
+        Args:
+            api_key (str, optional): Chave da API OpenWeather. Se não fornecida,
+                                    tenta obter da variável de ambiente OPENWEATHER_API_KEY.
+            base_url (str, optional): URL base alternativa (por exemplo, um servidor local de testes)
+            cache (WeatherCache, optional): Cache partilhado com o serviço síncrono
+            max_concurrency (int): Número máximo de chamadas simultâneas à API
+            connect_timeout (float): Tempo limite para estabelecer a conexão, em segundos
+            read_timeout (float): Tempo limite para leitura da resposta, em segundos
+            max_retries (int): Número máximo de novas tentativas em erros 429/5xx
+            backoff_factor (float): Fator de espera exponencial entre tentativas
+            single_flight (SingleFlight, optional): Coalescência de chamadas partilhada com o
+                                    serviço síncrono. Se não fornecida, é criada uma própria.
+            backend (WeatherBackend, optional): Transporte alternativo (gravação, reprodução, ...).
+                                    Se não fornecido, as chamadas são feitas com httpx.
+            rate_limiter (TokenBucketRateLimiter, optional): Quota de chamadas partilhada com o
+                                    serviço síncrono. Se não fornecida, as chamadas não são limitadas.
+            persistent_cache (PersistentWeatherCache, optional): Cache em disco partilhado com o
+                                    serviço síncrono, consultado quando o cache em memória falha.
+            circuit_breaker (CircuitBreaker, optional): Disjuntor partilhado com o serviço síncrono
+            sync_service (OpenWeatherService, optional): Serviço síncrono que fornece observações
+                                    desatualizadas e as atualiza em segundo plano quando a API
+                                    está lenta ou indisponível.
+            keep_raw (bool): Manter o JSON original em cada WeatherData (padrão: só os campos usados)
+        """
+        self.api_key = api_key or os.environ.get("OPENWEATHER_API_KEY", "demo_key")
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.cache = cache
+        self.single_flight = single_flight or SingleFlight()
+        self.max_concurrency = max_concurrency
+        self.timeout = httpx.Timeout(read_timeout, connect=connect_timeout)
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.backend = backend
+        self.rate_limiter = rate_limiter
+        self.persistent_cache = persistent_cache
+        self.circuit_breaker = circuit_breaker
+        self.sync_service = sync_service
+        self.keep_raw = keep_raw
+        
+        self._client = None
+        self._semaphore = None
+    
+    async def __aenter__(self):
+        await self.open()
+        return self
+    
+    async def open(self):
+        """
+        Abre o cliente e o seu pool de conexões no loop de eventos atual.
+        """
+        if self._client is not None:
+            return
+        self._client = httpx.AsyncClient(
+            timeout=self.timeout,
+            limits=httpx.Limits(
+                max_connections=self.max_concurrency,
+                max_keepalive_connections=self.max_concurrency
+            )
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+    
+    async def close(self):
+        """
+        Fecha o cliente e todas as suas conexões.
+        """
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+    
+    def _retry_delay(self, attempt, response=None):
+        """
+        Calcula a espera antes da próxima tentativa, respeitando o cabeçalho Retry-After.
+        
+        Args:
+            attempt (int): Número da tentativa que falhou (começando em 0)
+            response (httpx.Response, optional): Resposta que motivou a nova tentativa
+        
+        Returns:
+            float: Espera em segundos
+        """
+        if response is not None:
+            retry_after = response.headers.get("Retry-After")
+            if retry_after and retry_after.isdigit():
+                return float(retry_after)
+        return self.backoff_factor * (2 ** attempt)
+    
+    async def _get(self, endpoint, params, priority=TokenBucketRateLimiter.PRIORITY_INTERACTIVE,
+                   deadline=None):
+        """
+        Executa um GET na API com novas tentativas em erros transitórios, dentro da quota.
+        
+        Args:
+            endpoint (str): URL completa do endpoint
+            params (dict): Parâmetros da query string
+            priority (str): Prioridade da chamada na fila da quota (interactive, bulk ou prefetch)
+            deadline (float, optional): Prazo absoluto do pedido em time.monotonic()
+        
+        Returns:
+            dict: Corpo JSON da resposta
+        
+        Raises:
+            httpx.HTTPError: Se a chamada falhar após as novas tentativas
+            RateLimitExceeded: Se a espera pela quota ultrapassaria o prazo do pedido
+            CircuitOpenError: Se as chamadas estiverem suspensas pelo disjuntor
+            ReplayMissError: Se a resposta não existir no arquivo de reprodução
+        """
+        if self._client is None:
+            raise RuntimeError("AsyncOpenWeatherService deve ser aberto com 'async with' ou open()")
+        
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            breaker.before_call()
+        
+        if self.rate_limiter is not None:
+            try:
+                await self.rate_limiter.acquire_async(priority, deadline)
+            except BaseException:
+                if breaker is not None:
+                    breaker.release()
+                raise
+        
+        try:
+            payload = await self._send(endpoint, params)
+        except (httpx.HTTPError, requests.exceptions.RequestException) as e:
+            if breaker is not None:
+                if self.is_upstream_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            raise
+        except (asyncio.CancelledError, ReplayMissError):
+            # Chamada cancelada ou resposta em falta no arquivo: nada a registar sobre a API
+            if breaker is not None:
+                breaker.release()
+            raise
+        except BaseException:
+            # Respostas ilegíveis ou erros do backend também contam como falha,
+            # para o disjuntor nunca ficar preso com uma chamada de teste em curso
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        
+        if breaker is not None:
+            breaker.record_success()
+        return payload
+    
+    @staticmethod
+    def is_upstream_failure(error):
+        """
+        Indica se um erro revela uma falha da API (ver OpenWeatherService.is_upstream_failure).
+        """
+        if isinstance(error, httpx.HTTPStatusError):
+            return error.response.status_code in AsyncOpenWeatherService.RETRY_STATUS_CODES
+        if isinstance(error, requests.exceptions.RequestException):
+            return OpenWeatherService.is_upstream_failure(error)
+        return True
+    
+    async def _send(self, endpoint, params):
+        """
+        Envia o GET pelo backend configurado ou por httpx, com novas tentativas.
+        """
+        if self.backend is not None:
+            async with self._semaphore:
+                return await self.backend.fetch_async(endpoint, params)
+        
+        async with self._semaphore:
+            for attempt in range(self.max_retries + 1):
+                is_last_attempt = attempt == self.max_retries
+                try:
+                    response = await self._client.get(endpoint, params=params)
+                except httpx.TransportError:
+                    if is_last_attempt:
+                        raise
+                    await asyncio.sleep(self._retry_delay(attempt))
+                    continue
+                
+                if response.status_code in self.RETRY_STATUS_CODES and not is_last_attempt:
+                    await asyncio.sleep(self._retry_delay(attempt, response))
+                    continue
+                
+                response.raise_for_status()  # Lança exceção para códigos de erro HTTP
+                return response.json()
+    
+    async def get_weather_by_location(self, lat, lon, units="metric",
+                                      priority=TokenBucketRateLimiter.PRIORITY_INTERACTIVE, deadline=None):
+        """
+        Obtém dados meteorológicos atuais para uma localização específica.
+        
+        Args:
+            lat (float): Latitude da localização
+            lon (float): Longitude da localização
+            units (str, optional): Unidades de medida (metric, imperial, standard)
+            priority (str, optional): Prioridade na fila da quota (interactive, bulk ou prefetch)
+            deadline (float, optional): Prazo absoluto do pedido em time.monotonic()
+        
+        Returns:
+            WeatherData: Objeto com os dados meteorológicos processados
+        
+        Raises:
+            Exception: Se ocorrer um erro na chamada à API e não houver observação anterior
+            RateLimitExceeded: Se a espera pela quota ultrapassaria o prazo do pedido
+        """
+        # Verificar se já existe uma observação recente para este ponto
+        if self.cache is not None:
+            cached = self.cache.get(lat, lon, units)
+            if cached is not None:
+                return cached
+        
+        # Servir já a última observação expirada e atualizá-la em segundo plano
+        # (a consulta pode ir ao SQLite, por isso corre fora do loop de eventos)
+        if self.sync_service is not None:
+            stale = await asyncio.to_thread(self.sync_service.get_stale_weather, lat, lon, units)
+            if stale is not None:
+                return stale
+        
+        # Pedidos simultâneos para o mesmo ponto partilham uma única chamada,
+        # inclusive com pedidos em curso noutros loops de eventos ou threads
+        try:
+            return await self.single_flight.do_async(
+                self.coalescing_key(lat, lon, units),
+                lambda: self._fetch_weather_by_location(lat, lon, units, priority, deadline),
+                OpenWeatherService.follower_deadline(priority, deadline)
+            )
+        except SingleFlightTimeout as e:
+            # A chamada partilhada excedeu o prazo deste pedido: tratar como um tempo limite próprio
+            print(f"Erro ao obter dados meteorológicos: {e}")
+            if self.sync_service is not None:
+                last_known = await asyncio.to_thread(self.sync_service.last_known_weather, lat, lon, units)
+                if last_known is not None:
+                    return last_known
+            raise httpx.TimeoutException(str(e)) from e
+    
+    def coalescing_key(self, lat, lon, units="metric", kind="weather"):
+        """
+        Obtém a chave usada para coalescer chamadas (a mesma do serviço síncrono).
+        """
+        if self.cache is not None:
+            return self.cache.make_key(lat, lon, units, kind)
+        return (kind,) + quantize_coordinates(lat, lon) + (units,)
+    
+    async def _fetch_weather_by_location(self, lat, lon, units, priority, deadline):
+        """
+        Obtém os dados meteorológicos de uma localização (do disco ou da API) e guarda-os no cache.
+        
+        Args:
+            lat (float): Latitude da localização
+            lon (float): Longitude da localização
+            units (str): Unidades de medida
+            priority (str): Prioridade na fila da quota
+            deadline (float): Prazo absoluto do pedido, ou None
+            
+        Returns:
+            WeatherData: Objeto com os dados meteorológicos processados
+        """
+        ttl = self.cache.ttl if self.cache is not None else WeatherCache.DEFAULT_TTL
+        
+        # Reaproveitar uma observação recente guardada em disco (leitura local por chave primária,
+        # feita numa thread para não bloquear o loop de eventos)
+        if self.persistent_cache is not None:
+            entry = await asyncio.to_thread(self.persistent_cache.get, lat, lon, units, max_age=ttl)
+            if entry is not None:
+                payload, fetched_at = entry
+                weather_data = WeatherData(payload, fetched_at, keep_raw=self.keep_raw)
+                if self.cache is not None:
+                    self.cache.put(lat, lon, weather_data, units, ttl=ttl - (time.time() - fetched_at))
+                return weather_data
+        
+        endpoint = f"{self.base_url}/weather"
+        params = {
+            "lat": lat,
+            "lon": lon,
+            "appid": self.api_key,
+            "units": units
+        }
+        
+        try:
+            payload = await self._get(endpoint, params, priority, deadline)
+        except (httpx.HTTPError, requests.exceptions.RequestException,
+                RateLimitExceeded, CircuitOpenError) as e:
+            # Registrar o erro e, se possível, servir a última observação conhecida
+            print(f"Erro ao obter dados meteorológicos: {e}")
+            if self.sync_service is not None:
+                last_known = await asyncio.to_thread(self.sync_service.last_known_weather, lat, lon, units)
+                if last_known is not None:
+                    return last_known
+            raise
+        
+        weather_data = WeatherData(payload, keep_raw=self.keep_raw)
+        if self.persistent_cache is not None:
+            await asyncio.to_thread(self.persistent_cache.put, lat, lon, payload, units)
+        if self.cache is not None:
+            self.cache.put(lat, lon, weather_data, units)
+        
+        return weather_data
+    
+    async def get_forecast_by_location(self, lat, lon, units="metric",
+                                       priority=TokenBucketRateLimiter.PRIORITY_INTERACTIVE, deadline=None):
+        """
+        Obtém previsão meteorológica para os próximos dias para uma localização específica.
+        
+        Args:
+            lat (float): Latitude da localização
+            lon (float): Longitude da localização
+            units (str, optional): Unidades de medida (metric, imperial, standard)
+            priority (str, optional): Prioridade na fila da quota (interactive, bulk ou prefetch)
+            deadline (float, optional): Prazo absoluto do pedido em time.monotonic()
+        
+        Returns:
+            dict: Dados brutos da previsão meteorológica
+        
+        Raises:
+            Exception: Se ocorrer um erro na chamada à API
+            RateLimitExceeded: Se a espera pela quota ultrapassaria o prazo do pedido
+        """
+        endpoint = f"{self.base_url}/forecast"
+        params = {
+            "lat": lat,
+            "lon": lon,
+            "appid": self.api_key,
+            "units": units
+        }
+        
+        try:
+            return await self._get(endpoint, params, priority, deadline)
+        except httpx.HTTPError as e:
+            print(f"Erro ao obter previsão meteorológica: {e}")
+            raise
+    
+    async def get_weather_by_city(self, city_name, country_code=None, units="metric",
+                                  priority=TokenBucketRateLimiter.PRIORITY_INTERACTIVE, deadline=None):
+        """
+        Obtém dados meteorológicos atuais para uma cidade.
+        
+        Args:
+            city_name (str): Nome da cidade
+            country_code (str, optional): Código do país (ISO 3166)
+            units (str, optional): Unidades de medida (metric, imperial, standard)
+            priority (str, optional): Prioridade na fila da quota (interactive, bulk ou prefetch)
+            deadline (float, optional): Prazo absoluto do pedido em time.monotonic()
+        
+        Returns:
+            WeatherData: Objeto com os dados meteorológicos processados
+        
+        Raises:
+            Exception: Se ocorrer um erro na chamada à API
+            RateLimitExceeded: Se a espera pela quota ultrapassaria o prazo do pedido
+        """
+        endpoint = f"{self.base_url}/weather"
+        location = f"{city_name}"
+        if country_code:
+            location = f"{city_name},{country_code}"
+        
+        params = {
+            "q": location,
+            "appid": self.api_key,
+            "units": units
+        }
+        
+        try:
+            return WeatherData(await self._get(endpoint, params, priority, deadline), keep_raw=self.keep_raw)
+        except httpx.HTTPError as e:
+            print(f"Erro ao obter dados meteorológicos para {location}: {e}")
+            raise
@@ -0,0 +1,69 @@
+"""
+Loop de eventos assíncrono de longa duração, executado numa thread dedicada.
+"""
+import asyncio
+import threading
+
+class BackgroundEventLoop:
+    """
+    Loop de eventos que vive durante todo o processo numa thread própria.
+    
+    Recursos assíncronos ligados a um loop (como as conexões de um httpx.AsyncClient)
+    podem assim ser criados uma só vez e partilhados por todos os pedidos, mesmo que
+    cada pedido corra no seu próprio loop: as corrotinas que os usam são submetidas a
+    este loop e aguardadas a partir do loop do pedido.
+    """
+    
+    def __init__(self, name="background-loop"):
+        """
+        Inicializa e arranca o loop.
+        
+        Args:
+            name (str): Nome da thread do loop
+        """
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+    
+    def _run(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+    
+    def submit(self, coro):
+        """
+        Agenda uma corrotina no loop.
+        
+        Returns:
+            concurrent.futures.Future: Resultado da corrotina
+        """
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+    
+    async def run(self, coro):
+        """
+        Executa uma corrotina no loop e aguarda o resultado a partir do loop atual.
+        
+        O cancelamento de quem aguarda é propagado à corrotina no loop de fundo.
+        
+        Returns:
+            object: Valor devolvido pela corrotina
+        """
+        if asyncio.get_running_loop() is self.loop:
+            return await coro
+        return await asyncio.wrap_future(self.submit(coro))
+    
+    def run_sync(self, coro, timeout=None):
+        """
+        Executa uma corrotina no loop e bloqueia a thread atual até ao resultado.
+        
+        Returns:
+            object: Valor devolvido pela corrotina
+        """
+        return self.submit(coro).result(timeout)
+    
+    def stop(self):
+        """
+        Para o loop e aguarda o fim da thread.
+        """
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self._thread.join(timeout=5)
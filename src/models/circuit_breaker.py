@@ -0,0 +1,144 @@
+"""
+Disjuntor (circuit breaker) para chamadas a serviços externos.
+"""
+import threading
+import time
+
+class CircuitOpenError(Exception):
+    """
+    Lançada quando o disjuntor está aberto e a chamada não é feita.
+    """
+    
+    def __init__(self, retry_after):
+        self.retry_after = max(0.0, retry_after)
+        super().__init__(
+            f"OpenWeather indisponível: chamadas suspensas por mais {self.retry_after:.0f}s"
+        )
+
+class CircuitBreaker:
+    """
+    Suspende as chamadas a um serviço que está a falhar.
+    
+    Após failure_threshold falhas consecutivas o disjuntor abre e as chamadas são
+    rejeitadas de imediato durante recovery_timeout segundos. Depois disso, uma única
+    chamada de teste é permitida (meio-aberto): se tiver sucesso o disjuntor fecha,
+    se falhar volta a abrir. Uma chamada de teste sem resposta ao fim de probe_timeout
+    segundos é dada como perdida e outra pode ser feita.
+    """
+    
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+    
+    def __init__(self, failure_threshold=5, recovery_timeout=30, probe_timeout=60):
+        """
+        Inicializa o disjuntor.
+        
+        Args:
+            failure_threshold (int): Falhas consecutivas que abrem o disjuntor
+            recovery_timeout (float): Tempo, em segundos, até à chamada de teste
+            probe_timeout (float): Tempo, em segundos, após o qual uma chamada de teste
+                sem resultado deixa de bloquear a seguinte
+        """
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.probe_timeout = probe_timeout
+        
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._probe_started_at = 0.0
+        self._lock = threading.Lock()
+        
+        self.times_opened = 0
+        self.rejected = 0
+    
+    @property
+    def state(self):
+        with self._lock:
+            return self._current_state(time.monotonic())
+    
+    def _current_state(self, now):
+        """
+        Obtém o estado, passando a meio-aberto quando o tempo de recuperação termina.
+        """
+        if self._state == self.OPEN and now - self._opened_at >= self.recovery_timeout:
+            self._state = self.HALF_OPEN
+            self._probe_in_flight = False
+        elif (self._state == self.HALF_OPEN and self._probe_in_flight
+              and now - self._probe_started_at >= self.probe_timeout):
+            # A chamada de teste nunca registou o resultado: libertar a vaga
+            self._probe_in_flight = False
+        return self._state
+    
+    def before_call(self):
+        """
+        Verifica se a chamada pode ser feita.
+        
+        Raises:
+            CircuitOpenError: Se o disjuntor estiver aberto ou já houver uma chamada de teste
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            if state == self.CLOSED:
+                return
+            if state == self.HALF_OPEN and not self._probe_in_flight:
+                self._probe_in_flight = True
+                self._probe_started_at = now
+                return
+            
+            self.rejected += 1
+            retry_after = self._opened_at + self.recovery_timeout - now
+            raise CircuitOpenError(retry_after if state == self.OPEN else self.recovery_timeout)
+    
+    def release(self):
+        """
+        Liberta a vaga de uma chamada que não chegou a ser feita.
+        """
+        with self._lock:
+            self._probe_in_flight = False
+    
+    def record_success(self):
+        """
+        Regista uma chamada bem-sucedida e fecha o disjuntor.
+        """
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+    
+    def record_failure(self):
+        """
+        Regista uma falha e abre o disjuntor se o limite for atingido.
+        """
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    self.times_opened += 1
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+    
+    def get_stats(self):
+        """
+        Obtém o estado e as estatísticas do disjuntor.
+        
+        Returns:
+            dict: Estado, falhas consecutivas, aberturas e chamadas rejeitadas
+        """
+        with self._lock:
+            now = time.monotonic()
+            state = self._current_state(now)
+            return {
+                'state': state,
+                'consecutive_failures': self._failures,
+                'failure_threshold': self.failure_threshold,
+                'recovery_timeout': self.recovery_timeout,
+                'probe_timeout': self.probe_timeout,
+                'retry_after': max(0.0, self._opened_at + self.recovery_timeout - now) if state == self.OPEN else 0.0,
+                'times_opened': self.times_opened,
+                'rejected': self.rejected
+            }
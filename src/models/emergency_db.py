@@ -99,6 +99,22 @@ class DatabaseManager:
         )
         ''')
         
+        # Tabela de chamados resolvidos arquivados pelo serviço de despacho
+        self.cursor.execute('''
+        CREATE TABLE IF NOT EXISTS archived_calls (
+            id INTEGER PRIMARY KEY,
+            local TEXT NOT NULL,
+            severidade INTEGER NOT NULL,
+            tipo_vegetacao TEXT NOT NULL,
+            clima TEXT NOT NULL,
+            status TEXT NOT NULL,
+            prioridade REAL NOT NULL,
+            data_criacao TEXT NOT NULL,
+            data_resolucao TEXT,
+            data_arquivamento TEXT NOT NULL
+        )
+        ''')
+        
         # Inserir equipes padrão se não existirem
         self.cursor.execute('SELECT COUNT(*) FROM teams')
         if self.cursor.fetchone()[0] == 0:
@@ -362,3 +378,103 @@ class DatabaseManager:
             self.add_team_action(team_id, emergency_id, action)
         
         return True
+    
+    def archive_emergency_calls(self, calls):
+        """
+        Grava chamados resolvidos no arquivo.
+        
+        Args:
+            calls (list): Chamados (dicionários do serviço de despacho)
+        
+        Returns:
+            int: Número de chamados gravados
+        """
+        self.connect()
+        
+        archived_at = datetime.now().isoformat()
+        self.cursor.executemany('''
+        INSERT OR REPLACE INTO archived_calls
+        (id, local, severidade, tipo_vegetacao, clima, status, prioridade,
+         data_criacao, data_resolucao, data_arquivamento)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', [
+            (
+                call['id'],
+                call['local'],
+                call['severidade'],
+                call['tipo_vegetacao'] or '',
+                call['clima'] or '',
+                call['status'],
+                call['prioridade'],
+                call['data_criacao'],
+                call.get('data_resolucao'),
+                archived_at
+            )
+            for call in calls
+        ])
+        
+        self.conn.commit()
+        self.disconnect()
+        
+        return len(calls)
+    
+    def get_archived_calls(self, limit, after_id=None):
+        """
+        Obtém chamados arquivados por ordem de ID.
+        
+        Args:
+            limit (int): Número máximo de chamados
+            after_id (int, optional): Só chamados com ID maior
+        
+        Returns:
+            list: Lista de chamados
+        """
+        self.connect()
+        
+        self.cursor.execute('''
+        SELECT * FROM archived_calls
+        WHERE id > ?
+        ORDER BY id
+        LIMIT ?
+        ''', (after_id or 0, limit))
+        
+        calls = [dict(row) for row in self.cursor.fetchall()]
+        
+        self.disconnect()
+        
+        return calls
+    
+    def get_archived_call(self, emergency_id):
+        """
+        Obtém um chamado arquivado pelo ID.
+        
+        Args:
+            emergency_id (int): ID do chamado
+        
+        Returns:
+            dict: Dados do chamado ou None se não estiver arquivado
+        """
+        self.connect()
+        
+        self.cursor.execute('SELECT * FROM archived_calls WHERE id = ?', (emergency_id,))
+        row = self.cursor.fetchone()
+        
+        self.disconnect()
+        
+        return dict(row) if row else None
+    
+    def get_max_archived_id(self):
+        """
+        Obtém o maior ID de chamado arquivado.
+        
+        Returns:
+            int: Maior ID, ou 0 se o arquivo estiver vazio
+        """
+        self.connect()
+        
+        self.cursor.execute('SELECT MAX(id) FROM archived_calls')
+        result = self.cursor.fetchone()[0]
+        
+        self.disconnect()
+        
+        return result or 0
@@ -4,15 +4,23 @@ Implementa fila, heap, pilha, lista ligada, árvore e grafo para operações de
 """
 import heapq
 import json
+import os
+import time
+from bisect import bisect_left, bisect_right, insort
 from datetime import datetime
-from collections import deque
+from collections import OrderedDict
+from itertools import islice
+from src.models.emergency_db import DatabaseManager
 
 class EmergencyNode:
-    """Nó para representação de chamados de emergência na lista ligada."""
+    """Nó para representação de chamados de emergência na lista duplamente ligada."""
+    __slots__ = ("emergency_id", "local", "status", "prev", "next")
+    
     def __init__(self, emergency_id, local, status="ativo"):
         self.emergency_id = emergency_id
         self.local = local
         self.status = status
+        self.prev = None
         self.next = None
     
     def to_dict(self):
@@ -24,50 +32,463 @@ class EmergencyNode:
         }
 
 class EmergencyLinkedList:
-    """Lista ligada para gestão de áreas afetadas com status dinâmico."""
+    """
+    Lista duplamente ligada para gestão de áreas afetadas com status dinâmico.
+    
+    Mantém a ordem de inserção com ponteiros para a cabeça e a cauda e um índice
+    id→nó, pelo que inserir, atualizar, consultar e remover uma área são O(1).
+    """
+    
+    # Campos de cada linha na exportação compacta
+    COMPACT_FIELDS = ("emergency_id", "local", "status")
+    
     def __init__(self):
         self.head = None
+        self.tail = None
+        self._nodes = {}  # {emergency_id: EmergencyNode}
+    
+    def __len__(self):
+        return len(self._nodes)
+    
+    def __iter__(self):
+        """Percorre os nós por ordem de inserção."""
+        current = self.head
+        while current:
+            yield current
+            current = current.next
     
     def add(self, emergency_id, local, status="ativo"):
-        """Adiciona uma nova área afetada à lista."""
+        """
+        Adiciona uma nova área afetada ao final da lista.
+        
+        Se o ID já existir, atualiza o local e o status da área, que mantém a posição.
+        """
+        node = self._nodes.get(emergency_id)
+        if node is not None:
+            node.local = local
+            node.status = status
+            return
+        
         new_node = EmergencyNode(emergency_id, local, status)
+        self._nodes[emergency_id] = new_node
         if not self.head:
-            self.head = new_node
+            self.head = self.tail = new_node
             return
         
         # Adicionar no final da lista
-        current = self.head
-        while current.next:
-            current = current.next
-        current.next = new_node
+        new_node.prev = self.tail
+        self.tail.next = new_node
+        self.tail = new_node
+    
+    def remove(self, emergency_id):
+        """
+        Remove uma área afetada da lista.
+        
+        Returns:
+            bool: True se a área existia
+        """
+        node = self._nodes.pop(emergency_id, None)
+        if node is None:
+            return False
+        
+        if node.prev:
+            node.prev.next = node.next
+        else:
+            self.head = node.next
+        if node.next:
+            node.next.prev = node.prev
+        else:
+            self.tail = node.prev
+        node.prev = node.next = None
+        return True
     
     def update_status(self, emergency_id, new_status):
         """Atualiza o status de uma área afetada."""
-        current = self.head
-        while current:
-            if current.emergency_id == emergency_id:
-                current.status = new_status
-                return True
-            current = current.next
-        return False
+        node = self._nodes.get(emergency_id)
+        if node is None:
+            return False
+        node.status = new_status
+        return True
     
-    def get_all(self):
-        """Retorna todas as áreas afetadas."""
-        areas = []
-        current = self.head
-        while current:
-            areas.append(current.to_dict())
-            current = current.next
-        return areas
+    def iter_by_status(self, status=None):
+        """
+        Percorre as áreas por ordem de inserção, opcionalmente só as de um status.
+        
+        Args:
+            status (str, optional): Status das áreas a incluir (todas se None)
+        
+        Returns:
+            generator: Nós da lista
+        """
+        for node in self:
+            if status is None or node.status == status:
+                yield node
+    
+    def get_all(self, status=None):
+        """Retorna todas as áreas afetadas, opcionalmente só as de um status."""
+        return [node.to_dict() for node in self.iter_by_status(status)]
+    
+    def to_compact(self, status=None):
+        """
+        Exporta as áreas como linhas de valores, sem repetir os nomes dos campos.
+        
+        Args:
+            status (str, optional): Status das áreas a incluir (todas se None)
+        
+        Returns:
+            dict: Nomes dos campos em 'fields' e uma lista por área em 'rows'
+        """
+        return {
+            "fields": list(self.COMPACT_FIELDS),
+            "rows": [[node.emergency_id, node.local, node.status] for node in self.iter_by_status(status)]
+        }
     
     def get_by_id(self, emergency_id):
         """Retorna uma área afetada pelo ID."""
-        current = self.head
-        while current:
-            if current.emergency_id == emergency_id:
-                return current.to_dict()
-            current = current.next
-        return None
+        node = self._nodes.get(emergency_id)
+        return None if node is None else node.to_dict()
+
+class EmergencyCallQueue:
+    """
+    Fila de chamados por ordem de chegada, paginável e com arquivamento dos resolvidos.
+    
+    Os IDs dos chamados são crescentes, pelo que a ordem de chegada é a ordem dos IDs
+    e uma página é localizada por busca binária a partir do último ID lido. Chamados
+    resolvidos há mais de retention segundos, ou além dos max_resolved mais recentes,
+    saem da fila (ver expired, overflow e discard), de modo que a memória ocupada
+    depende só dos chamados em aberto e de no máximo max_resolved resolvidos.
+    """
+    def __init__(self, retention=3600, max_resolved=1000):
+        """
+        Inicializa a fila.
+        
+        Args:
+            retention (float): Tempo, em segundos, que um chamado resolvido permanece na fila
+            max_resolved (int): Número máximo de chamados resolvidos mantidos na fila
+        """
+        self.retention = retention
+        self.max_resolved = max_resolved
+        
+        self._ids = []  # IDs por ordem de chegada (crescente)
+        self._calls = {}  # {id: chamado}
+        self._resolved = OrderedDict()  # {id: instante da resolução}, do mais antigo ao mais recente
+    
+    def __len__(self):
+        return len(self._ids)
+    
+    def __iter__(self):
+        """Percorre os chamados por ordem de chegada."""
+        return (self._calls[call_id] for call_id in self._ids)
+    
+    def append(self, call):
+        """Acrescenta um chamado ao final da fila."""
+        call_id = call["id"]
+        if self._ids and call_id <= self._ids[-1]:
+            insort(self._ids, call_id)
+        else:
+            self._ids.append(call_id)
+        self._calls[call_id] = call
+    
+    def get(self, call_id):
+        """Retorna um chamado da fila pelo ID, ou None."""
+        return self._calls.get(call_id)
+    
+    def mark_resolved(self, call_id, resolved_at=None):
+        """Regista a resolução de um chamado, iniciando o prazo de retenção."""
+        if call_id in self._calls:
+            self._resolved[call_id] = time.time() if resolved_at is None else resolved_at
+            self._resolved.move_to_end(call_id)
+    
+    def unmark_resolved(self, call_id):
+        """Cancela a resolução de um chamado reaberto."""
+        self._resolved.pop(call_id, None)
+    
+    def expired(self, now=None):
+        """
+        Obtém, sem os retirar, os chamados resolvidos há mais de retention segundos
+        e os que excedem max_resolved.
+        
+        Returns:
+            list: Chamados expirados, pela ordem em que foram resolvidos
+        """
+        cutoff = (time.time() if now is None else now) - self.retention
+        excess = len(self._resolved) - self.max_resolved
+        expired = []
+        for call_id, resolved_at in self._resolved.items():
+            if resolved_at > cutoff and len(expired) >= excess:
+                break
+            expired.append(self._calls[call_id])
+        return expired
+    
+    def overflow(self):
+        """
+        Obtém, sem os retirar, os chamados resolvidos mais antigos que excedem max_resolved.
+        
+        Returns:
+            list: Chamados excedentes, pela ordem em que foram resolvidos
+        """
+        excess = max(0, len(self._resolved) - self.max_resolved)
+        return [self._calls[call_id] for call_id in islice(self._resolved, excess)]
+    
+    def discard(self, call_ids):
+        """Retira chamados da fila (por exemplo, depois de arquivados)."""
+        for call_id in call_ids:
+            if self._calls.pop(call_id, None) is not None:
+                self._resolved.pop(call_id, None)
+                del self._ids[bisect_left(self._ids, call_id)]
+    
+    def page(self, limit, after_id=None, since=None):
+        """
+        Obtém uma página de chamados por ordem de chegada.
+        
+        Args:
+            limit (int): Número máximo de chamados
+            after_id (int, optional): Só chamados com ID maior (cursor da página anterior)
+            since (str, optional): Só chamados criados depois deste instante (ISO 8601)
+        
+        Returns:
+            tuple: (chamados, cursor da página seguinte ou None se for a última)
+        """
+        start = 0
+        if after_id is not None:
+            start = bisect_right(self._ids, after_id)
+        if since is not None:
+            start = max(start, bisect_right(self._ids, since, key=lambda i: self._calls[i]["data_criacao"]))
+        chunk = self._ids[start:start + limit]
+        next_cursor = chunk[-1] if chunk and start + limit < len(self._ids) else None
+        return [self._calls[call_id] for call_id in chunk], next_cursor
+
+class IndexedPriorityQueue:
+    """
+    Heap binário de máximo com índice id→posição para priorização de chamados.
+    
+    Além de inserir e extrair o máximo, permite consultar, alterar a prioridade e
+    remover um item pelo ID em O(log n), sem percorrer o heap. Itens com a mesma
+    prioridade saem por ordem de ID (o mais antigo primeiro).
+    """
+    def __init__(self):
+        self._heap = []  # [(prioridade, id, item)]
+        self._positions = {}  # {id: posição no heap}
+    
+    def __len__(self):
+        return len(self._heap)
+    
+    def __contains__(self, item_id):
+        return item_id in self._positions
+    
+    def __iter__(self):
+        """Percorre os itens na ordem interna do heap (não ordenada)."""
+        return (item for _, _, item in self._heap)
+    
+    def _before(self, a, b):
+        """Indica se a entrada na posição a deve ficar acima da entrada na posição b."""
+        (pa, ia, _), (pb, ib, _) = self._heap[a], self._heap[b]
+        return pa > pb or (pa == pb and ia < ib)
+    
+    def _swap(self, a, b):
+        heap = self._heap
+        heap[a], heap[b] = heap[b], heap[a]
+        self._positions[heap[a][1]] = a
+        self._positions[heap[b][1]] = b
+    
+    def _sift_up(self, pos):
+        while pos > 0:
+            parent = (pos - 1) // 2
+            if not self._before(pos, parent):
+                break
+            self._swap(pos, parent)
+            pos = parent
+    
+    def _sift_down(self, pos):
+        size = len(self._heap)
+        while True:
+            best = pos
+            for child in (2 * pos + 1, 2 * pos + 2):
+                if child < size and self._before(child, best):
+                    best = child
+            if best == pos:
+                break
+            self._swap(pos, best)
+            pos = best
+    
+    def push(self, item_id, priority, item):
+        """
+        Insere um item ou, se o ID já existir, substitui-o com a nova prioridade.
+        """
+        if item_id in self._positions:
+            self.update(item_id, priority, item)
+            return
+        self._heap.append((priority, item_id, item))
+        self._positions[item_id] = len(self._heap) - 1
+        self._sift_up(len(self._heap) - 1)
+    
+    def get(self, item_id):
+        """Retorna o item com o ID indicado, ou None se não estiver no heap."""
+        pos = self._positions.get(item_id)
+        return None if pos is None else self._heap[pos][2]
+    
+    def update(self, item_id, priority, item=None):
+        """
+        Altera a prioridade (e opcionalmente o item) de uma entrada existente.
+        
+        Returns:
+            bool: True se o ID existia no heap
+        """
+        pos = self._positions.get(item_id)
+        if pos is None:
+            return False
+        old_priority, _, old_item = self._heap[pos]
+        self._heap[pos] = (priority, item_id, old_item if item is None else item)
+        if priority > old_priority:
+            self._sift_up(pos)
+        else:
+            self._sift_down(pos)
+        return True
+    
+    def remove(self, item_id):
+        """
+        Remove uma entrada pelo ID.
+        
+        Returns:
+            object: Item removido, ou None se o ID não existia
+        """
+        pos = self._positions.pop(item_id, None)
+        if pos is None:
+            return None
+        item = self._heap[pos][2]
+        last = self._heap.pop()
+        if pos < len(self._heap):
+            self._heap[pos] = last
+            self._positions[last[1]] = pos
+            self._sift_up(pos)
+            self._sift_down(self._positions[last[1]])
+        return item
+    
+    def peek(self):
+        """Retorna o item de maior prioridade sem o remover, ou None se o heap estiver vazio."""
+        return self._heap[0][2] if self._heap else None
+    
+    def pop(self):
+        """Remove e retorna o item de maior prioridade, ou None se o heap estiver vazio."""
+        if not self._heap:
+            return None
+        return self.remove(self._heap[0][1])
+    
+    def ordered(self):
+        """
+        Retorna todos os itens ordenados por prioridade, sem alterar o heap.
+        
+        Returns:
+            list: Itens do de maior para o de menor prioridade
+        """
+        return [item for _, _, item in sorted(self._heap, key=lambda entry: (-entry[0], entry[1]))]
+
+class PriorityOrderedView:
+    """
+    Vista dos chamados em aberto mantida ordenada por prioridade, para paginação.
+    
+    Guarda as chaves (-prioridade, id) numa lista ordenada geral e numa por status,
+    atualizadas a cada inserção, mudança de prioridade ou de status. Uma página é
+    obtida por busca binária a partir do cursor, com custo proporcional ao tamanho
+    da página e não ao número de chamados.
+    """
+    def __init__(self):
+        self._keys = []  # [(-prioridade, id)] ordenadas
+        self._by_status = {}  # {status: [(-prioridade, id)] ordenadas}
+        self._entries = {}  # {id: (chave, status, item)}
+    
+    def __len__(self):
+        return len(self._keys)
+    
+    @staticmethod
+    def encode_cursor(key):
+        """Converte a chave do último item de uma página no cursor da seguinte."""
+        return f"{-key[0]!r}_{key[1]}"
+    
+    @staticmethod
+    def decode_cursor(cursor):
+        """
+        Converte um cursor na chave a partir da qual a página começa.
+        
+        Raises:
+            ValueError: Se o cursor for inválido
+        """
+        priority, _, item_id = cursor.rpartition("_")
+        return (-float(priority), int(item_id))
+    
+    @staticmethod
+    def _discard(keys, key):
+        pos = bisect_right(keys, key) - 1
+        if pos >= 0 and keys[pos] == key:
+            del keys[pos]
+    
+    def add(self, item_id, priority, status, item):
+        """Insere um item na vista, ou substitui-o se o ID já existir."""
+        if item_id in self._entries:
+            self.remove(item_id)
+        key = (-priority, item_id)
+        insort(self._keys, key)
+        insort(self._by_status.setdefault(status, []), key)
+        self._entries[item_id] = (key, status, item)
+    
+    def remove(self, item_id):
+        """Retira um item da vista, se existir."""
+        entry = self._entries.pop(item_id, None)
+        if entry is None:
+            return
+        key, status, _ = entry
+        self._discard(self._keys, key)
+        keys = self._by_status[status]
+        self._discard(keys, key)
+        if not keys:
+            del self._by_status[status]
+    
+    def update(self, item_id, priority=None, status=None):
+        """
+        Reposiciona um item após mudança de prioridade e/ou status.
+        
+        Returns:
+            bool: True se o ID existia na vista
+        """
+        entry = self._entries.get(item_id)
+        if entry is None:
+            return False
+        key, old_status, item = entry
+        self.add(item_id, -key[0] if priority is None else priority,
+                 old_status if status is None else status, item)
+        return True
+    
+    def count(self, status=None):
+        """Retorna o número de itens, no total ou com um status."""
+        if status is None:
+            return len(self._keys)
+        return len(self._by_status.get(status, ()))
+    
+    def items(self, status=None):
+        """Retorna todos os itens por ordem de prioridade, opcionalmente só os de um status."""
+        keys = self._keys if status is None else self._by_status.get(status, [])
+        return [self._entries[item_id][2] for _, item_id in keys]
+    
+    def page(self, limit, cursor=None, status=None):
+        """
+        Obtém uma página de itens por ordem de prioridade.
+        
+        Args:
+            limit (int): Número máximo de itens
+            cursor (str, optional): Cursor devolvido pela página anterior
+            status (str, optional): Só itens com este status
+        
+        Returns:
+            tuple: (itens, cursor da página seguinte ou None se for a última)
+        
+        Raises:
+            ValueError: Se o cursor for inválido
+        """
+        keys = self._keys if status is None else self._by_status.get(status, [])
+        start = bisect_right(keys, self.decode_cursor(cursor)) if cursor else 0
+        chunk = keys[start:start + limit]
+        next_cursor = self.encode_cursor(chunk[-1]) if chunk and start + limit < len(keys) else None
+        return [self._entries[item_id][2] for _, item_id in chunk], next_cursor
 
 class RegionTreeNode:
     """Nó para representação hierárquica de regiões na árvore."""
@@ -144,10 +565,23 @@ class EmergencyDispatchService:
     """
     def __init__(self):
         # Fila (Queue) para organização de chamadas por ordem de chegada
-        self.emergency_queue = deque()
+        self.emergency_queue = EmergencyCallQueue(
+            retention=float(os.environ.get("DISPATCH_ARCHIVE_AFTER", 3600)),
+            max_resolved=int(os.environ.get("DISPATCH_MAX_RESOLVED", 1000))
+        )
+        
+        # Arquivo em SQLite dos chamados resolvidos retirados da fila (opcional)
+        archive_db = os.environ.get("DISPATCH_ARCHIVE_DB")
+        self.archive = DatabaseManager(archive_db) if archive_db else None
+        
+        # Heap indexado para priorização dos chamados em aberto
+        self.priority_heap = IndexedPriorityQueue()
         
-        # Heap para priorização de chamados
-        self.priority_heap = []
+        # Vista dos chamados em aberto ordenada por prioridade, para paginação
+        self.prioritized_view = PriorityOrderedView()
+        
+        # Índice de todos os chamados pelo ID
+        self.emergencies = {}  # {id: chamado}
         
         # Pilha (Stack) para histórico de ações por equipe
         self.team_actions = {}  # {team_id: [actions]}
@@ -159,6 +593,10 @@ class EmergencyDispatchService:
         self.region_tree = RegionTree()
         self.region_tree.build_default_tree()
         
+        # Árvores de caminhos mínimos por base de equipe, válidas para uma versão do grafo
+        self._path_trees = {}  # {origem: (versão, distâncias, predecessores)}
+        self._graph_version = 0
+        
         # Grafo para mapa de locais conectados
         self.location_graph = {
             "Base Central": {"Zona Norte": 10, "Vila Verde": 5, "Zona Sul": 8},
@@ -169,8 +607,8 @@ class EmergencyDispatchService:
             "Parque Nacional": {"Vila Verde": 6, "Zona Sul": 4}
         }
         
-        # Contador para IDs de emergência
-        self.emergency_counter = 1
+        # Contador para IDs de emergência, a seguir aos já arquivados
+        self.emergency_counter = (self.archive.get_max_archived_id() + 1) if self.archive else 1
         
         # Equipes disponíveis
         self.teams = [
@@ -211,12 +649,16 @@ class EmergencyDispatchService:
             "data_criacao": datetime.now().isoformat()
         }
         
+        # Arquivar chamados resolvidos há mais do que o prazo de retenção
+        self.archive_resolved_calls()
+        
         # Adicionar à fila (Queue)
         self.emergency_queue.append(emergency)
         
-        # Adicionar ao heap de prioridade
-        # Usamos negativo da prioridade porque heapq é um min-heap
-        heapq.heappush(self.priority_heap, (-prioridade, emergency_id, emergency))
+        # Adicionar ao heap de prioridade e ao índice por ID
+        self.priority_heap.push(emergency_id, prioridade, emergency)
+        self.prioritized_view.add(emergency_id, prioridade, emergency["status"], emergency)
+        self.emergencies[emergency_id] = emergency
         
         # Adicionar à lista ligada de áreas afetadas
         self.affected_areas.add(emergency_id, local)
@@ -244,23 +686,39 @@ class EmergencyDispatchService:
         peso = vegetacao_pesos.get(tipo_vegetacao, 1.0)
         return severidade * peso
     
-    def get_prioritized_calls(self):
+    def get_prioritized_calls(self, status=None):
         """
-        Obtém chamados priorizados pelo heap.
+        Obtém chamados priorizados.
+        
+        Args:
+            status (str, optional): Só chamados com este status
         
         Returns:
-            list: Lista de chamados ordenados por prioridade
+            list: Lista de chamados em aberto ordenados por prioridade
+        """
+        return self.prioritized_view.items(status)
+    
+    def get_prioritized_page(self, limit, cursor=None, status=None):
         """
-        # Criar uma cópia do heap para não modificar o original
-        heap_copy = self.priority_heap.copy()
-        result = []
+        Obtém uma página dos chamados priorizados, sem ordenar a lista completa.
         
-        # Extrair chamados do heap em ordem de prioridade
-        while heap_copy:
-            _, _, emergency = heapq.heappop(heap_copy)
-            result.append(emergency)
+        Args:
+            limit (int): Número máximo de chamados (os limit primeiros formam o top-K)
+            cursor (str, optional): Cursor devolvido pela página anterior
+            status (str, optional): Só chamados com este status
         
-        return result
+        Returns:
+            dict: Chamados da página, cursor da página seguinte e total de chamados do filtro
+        
+        Raises:
+            ValueError: Se o cursor for inválido
+        """
+        items, next_cursor = self.prioritized_view.page(limit, cursor, status)
+        return {
+            "items": items,
+            "next_cursor": next_cursor,
+            "total": self.prioritized_view.count(status)
+        }
     
     def get_emergency_by_id(self, emergency_id):
         """
@@ -272,10 +730,118 @@ class EmergencyDispatchService:
         Returns:
             dict: Dados do chamado ou None se não encontrado
         """
-        for _, eid, emergency in self.priority_heap:
-            if eid == emergency_id:
-                return emergency
-        return None
+        emergency = self.emergencies.get(emergency_id)
+        if emergency is None and self.archive:
+            emergency = self.archive.get_archived_call(emergency_id)
+        return emergency
+    
+    def get_emergency_calls(self, limit=50, cursor=None, since=None):
+        """
+        Obtém uma página de chamados por ordem de chegada.
+        
+        Args:
+            limit (int): Número máximo de chamados
+            cursor (int, optional): Valor de next_cursor da página anterior (último ID lido)
+            since (str, optional): Só chamados criados depois deste instante (ISO 8601)
+        
+        Returns:
+            dict: Chamados da página, cursor da página seguinte e total de chamados em memória
+        """
+        self.archive_resolved_calls()
+        items, next_cursor = self.emergency_queue.page(limit, cursor, since)
+        return {
+            "items": items,
+            "next_cursor": next_cursor,
+            "total": len(self.emergency_queue)
+        }
+    
+    def get_archived_calls(self, limit=50, cursor=None):
+        """
+        Obtém chamados arquivados, por ordem de ID.
+        
+        Args:
+            limit (int): Número máximo de chamados
+            cursor (int, optional): Último ID lido na página anterior
+        
+        Returns:
+            dict: Chamados da página e cursor da seguinte (None se for a última ou sem arquivo)
+        """
+        if not self.archive:
+            return {"items": [], "next_cursor": None}
+        
+        items = self.archive.get_archived_calls(limit + 1, cursor)
+        next_cursor = items[limit - 1]["id"] if len(items) > limit else None
+        return {"items": items[:limit], "next_cursor": next_cursor}
+    
+    def archive_resolved_calls(self):
+        """
+        Retira da memória os chamados resolvidos antigos, arquivando-os se possível.
+        
+        Com arquivo SQLite (DISPATCH_ARCHIVE_DB), os chamados resolvidos há mais do que
+        o prazo de retenção ou além de DISPATCH_MAX_RESOLVED são gravados e só depois
+        removidos da fila, do índice por ID e da lista de áreas afetadas; se a gravação
+        falhar, ficam em memória e são tentados de novo na próxima chamada. Sem arquivo,
+        mantêm-se em memória os DISPATCH_MAX_RESOLVED resolvidos mais recentes e os
+        mais antigos são descartados.
+        
+        Returns:
+            int: Número de chamados retirados da memória
+        """
+        if not self.archive:
+            expired = self.emergency_queue.overflow()
+        else:
+            expired = self.emergency_queue.expired()
+            if expired:
+                try:
+                    self.archive.archive_emergency_calls(expired)
+                except Exception as e:
+                    print(f"Erro ao arquivar chamados resolvidos (mantidos em memória): {e}")
+                    return 0
+        if not expired:
+            return 0
+        
+        self.emergency_queue.discard(emergency["id"] for emergency in expired)
+        for emergency in expired:
+            self.emergencies.pop(emergency["id"], None)
+            self.affected_areas.remove(emergency["id"])
+        return len(expired)
+    
+    def update_emergency_priority(self, emergency_id, severidade, tipo_vegetacao=None):
+        """
+        Recalcula a prioridade de um chamado em aberto após mudança de severidade ou vegetação.
+        
+        Args:
+            emergency_id (int): ID do chamado
+            severidade (int): Novo nível de severidade (1-5)
+            tipo_vegetacao (str, optional): Novo tipo de vegetação (mantém o atual se None)
+        
+        Returns:
+            dict: Dados do chamado atualizado ou None se não estiver em aberto
+        """
+        emergency = self.priority_heap.get(emergency_id)
+        if emergency is None:
+            return None
+        
+        if tipo_vegetacao is not None:
+            emergency["tipo_vegetacao"] = tipo_vegetacao
+        emergency["severidade"] = severidade
+        emergency["prioridade"] = self._calculate_priority(severidade, emergency["tipo_vegetacao"])
+        
+        self.priority_heap.update(emergency_id, emergency["prioridade"])
+        self.prioritized_view.update(emergency_id, priority=emergency["prioridade"])
+        return emergency
+    
+    def resolve_emergency(self, emergency_id):
+        """
+        Marca um chamado como resolvido e retira-o do heap de prioridade.
+        
+        Args:
+            emergency_id (int): ID do chamado
+        
+        Returns:
+            bool: True se o chamado existia
+        """
+        return self.update_area_status(emergency_id, "resolvido")
     
     def add_team_action(self, team_id, emergency_id, action):
         """
@@ -333,23 +899,60 @@ class EmergencyDispatchService:
         # Atualizar na lista ligada
         success = self.affected_areas.update_status(emergency_id, status)
         
-        # Atualizar também no heap
-        for i, (_, eid, emergency) in enumerate(self.priority_heap):
-            if eid == emergency_id:
-                emergency["status"] = status
-                self.priority_heap[i] = (self.priority_heap[i][0], eid, emergency)
-                break
+        # Atualizar também o chamado
+        self._set_emergency_status(emergency_id, status)
         
         return success
     
-    def get_affected_areas(self):
+    def _set_emergency_status(self, emergency_id, status):
+        """
+        Altera o status de um chamado e atualiza as estruturas de priorização.
+        
+        Chamados resolvidos deixam de ser priorizados e voltam a sê-lo se forem reabertos.
+        """
+        emergency = self.emergencies.get(emergency_id)
+        if emergency is None:
+            return
+        emergency["status"] = status
+        if status == "resolvido":
+            emergency["data_resolucao"] = datetime.now().isoformat()
+            self.priority_heap.remove(emergency_id)
+            self.prioritized_view.remove(emergency_id)
+            self.emergency_queue.mark_resolved(emergency_id)
+        elif emergency_id in self.priority_heap:
+            self.prioritized_view.update(emergency_id, status=status)
+        else:
+            emergency.pop("data_resolucao", None)
+            self.priority_heap.push(emergency_id, emergency["prioridade"], emergency)
+            self.prioritized_view.add(emergency_id, emergency["prioridade"], status, emergency)
+            self.emergency_queue.unmark_resolved(emergency_id)
+    
+    def get_affected_areas(self, status=None, compact=False):
+        """
+        Obtém as áreas afetadas da lista ligada.
+        
+        Args:
+            status (str, optional): Só áreas com este status
+            compact (bool): Exportar como campos e linhas em vez de uma lista de objetos
+        
+        Returns:
+            list: Lista de áreas afetadas (ou dict com 'fields' e 'rows' se compact)
+        """
+        if compact:
+            return self.affected_areas.to_compact(status)
+        return self.affected_areas.get_all(status)
+    
+    def remove_affected_area(self, emergency_id):
         """
-        Obtém todas as áreas afetadas da lista ligada.
+        Remove uma área da lista de áreas afetadas.
+        
+        Args:
+            emergency_id (int): ID do chamado
         
         Returns:
-            list: Lista de áreas afetadas
+            bool: True se a área existia
         """
-        return self.affected_areas.get_all()
+        return self.affected_areas.remove(emergency_id)
     
     def get_region_hierarchy(self):
         """
@@ -372,10 +975,121 @@ class EmergencyDispatchService:
         """
         return self.region_tree.find_zone_path(zone_name)
     
+    @property
+    def location_graph(self):
+        """
+        Cópia do grafo de locais conectados: {origem: {destino: distância}}.
+        
+        Alterações à cópia não afetam o serviço; devem ser feitas atribuindo um novo
+        grafo ou com update_route e remove_route, que invalidam as árvores de caminhos
+        mínimos em cache.
+        """
+        return {origin: dict(neighbors) for origin, neighbors in self._location_graph.items()}
+    
+    @location_graph.setter
+    def location_graph(self, graph):
+        # Guardar uma cópia, para que o grafo original não possa ser alterado por fora
+        self._location_graph = {origin: dict(neighbors) for origin, neighbors in graph.items()}
+        self._invalidate_path_trees()
+    
+    def _invalidate_path_trees(self):
+        """Marca as árvores de caminhos mínimos em cache como desatualizadas."""
+        self._graph_version += 1
+        self._path_trees.clear()
+    
+    def update_route(self, origin, destination, distance, bidirectional=True):
+        """
+        Cria ou altera a ligação entre dois locais do grafo.
+        
+        Args:
+            origin (str): Local de origem
+            destination (str): Local de destino
+            distance (float): Distância da ligação
+            bidirectional (bool): Aplicar também no sentido inverso
+        """
+        self._location_graph.setdefault(origin, {})[destination] = distance
+        self._location_graph.setdefault(destination, {})
+        if bidirectional:
+            self._location_graph[destination][origin] = distance
+        self._invalidate_path_trees()
+    
+    def remove_route(self, origin, destination, bidirectional=True):
+        """
+        Remove a ligação entre dois locais do grafo.
+        
+        Args:
+            origin (str): Local de origem
+            destination (str): Local de destino
+            bidirectional (bool): Remover também no sentido inverso
+        
+        Returns:
+            bool: True se alguma ligação foi removida
+        """
+        removed = self._location_graph.get(origin, {}).pop(destination, None) is not None
+        if bidirectional:
+            removed = self._location_graph.get(destination, {}).pop(origin, None) is not None or removed
+        if removed:
+            self._invalidate_path_trees()
+        return removed
+    
+    def _dijkstra(self, origin, destination=None):
+        """
+        Algoritmo de Dijkstra com heap binário, em O((V + E) log V).
+        
+        Args:
+            origin (str): Local de origem
+            destination (str, optional): Parar ao fixar este local (árvore completa se None)
+        
+        Returns:
+            tuple: (distâncias, predecessores) dos locais alcançados
+        """
+        distances = {origin: 0}
+        previous = {origin: None}
+        visited = set()
+        heap = [(0, origin)]
+        
+        while heap:
+            distance, current = heapq.heappop(heap)
+            if current in visited:
+                continue
+            visited.add(current)
+            
+            # Se chegamos ao destino, paramos
+            if current == destination:
+                break
+            
+            # Verificar vizinhos
+            for neighbor, weight in self._location_graph.get(current, {}).items():
+                new_distance = distance + weight
+                if new_distance < distances.get(neighbor, float('inf')):
+                    distances[neighbor] = new_distance
+                    previous[neighbor] = current
+                    heapq.heappush(heap, (new_distance, neighbor))
+        
+        return distances, previous
+    
+    def _shortest_path_tree(self, origin):
+        """
+        Obtém a árvore de caminhos mínimos de uma base de equipe, do cache ou calculada.
+        
+        Returns:
+            tuple: (distâncias, predecessores) a partir da base
+        """
+        cached = self._path_trees.get(origin)
+        if cached is not None and cached[0] == self._graph_version:
+            return cached[1], cached[2]
+        
+        distances, previous = self._dijkstra(origin)
+        self._path_trees[origin] = (self._graph_version, distances, previous)
+        return distances, previous
+    
     def calculate_shortest_path(self, origin, destination):
         """
         Calcula o menor caminho entre dois pontos usando o algoritmo de Dijkstra.
         
+        A partir das bases das equipes, usa a árvore de caminhos mínimos em cache, pelo
+        que a consulta custa apenas a reconstrução do caminho.
+        
         Args:
             origin (str): Local de origem
             destination (str): Local de destino
@@ -384,7 +1098,7 @@ class EmergencyDispatchService:
             dict: Dados da rota calculada
         """
         # Verificar se origem e destino existem no grafo
-        if origin not in self.location_graph or destination not in self.location_graph:
+        if origin not in self._location_graph or destination not in self._location_graph:
             return {
                 "origem": origin,
                 "destino": destination,
@@ -393,32 +1107,10 @@ class EmergencyDispatchService:
                 "tempo_estimado": float('inf')
             }
         
-        # Implementação do algoritmo de Dijkstra
-        distances = {node: float('inf') for node in self.location_graph}
-        distances[origin] = 0
-        previous = {node: None for node in self.location_graph}
-        unvisited = list(self.location_graph.keys())
-        
-        while unvisited:
-            # Encontrar o nó não visitado com menor distância
-            current = min(unvisited, key=lambda node: distances[node])
-            
-            # Se chegamos ao destino ou a distância é infinita, paramos
-            if current == destination or distances[current] == float('inf'):
-                break
-            
-            # Remover o nó atual dos não visitados
-            unvisited.remove(current)
-            
-            # Verificar vizinhos
-            for neighbor, distance in self.location_graph[current].items():
-                # Calcular nova distância
-                new_distance = distances[current] + distance
-                
-                # Se a nova distância é menor, atualizamos
-                if new_distance < distances[neighbor]:
-                    distances[neighbor] = new_distance
-                    previous[neighbor] = current
+        if any(team["base"] == origin for team in self.teams):
+            distances, previous = self._shortest_path_tree(origin)
+        else:
+            distances, previous = self._dijkstra(origin, destination)
         
         # Reconstruir o caminho
         path = []
@@ -426,19 +1118,20 @@ class EmergencyDispatchService:
         
         while current:
             path.append(current)
-            current = previous[current]
+            current = previous.get(current)
         
         # Inverter o caminho para ter origem -> destino
         path.reverse()
         
         # Calcular tempo estimado (2 minutos por unidade de distância)
-        tempo_estimado = distances[destination] * 2
+        distance = distances.get(destination, float('inf'))
+        tempo_estimado = distance * 2
         
         return {
             "origem": origin,
             "destino": destination,
             "rota": path,
-            "distancia": distances[destination],
+            "distancia": distance,
             "tempo_estimado": tempo_estimado
         }
     
@@ -499,11 +1192,7 @@ class EmergencyDispatchService:
         self.update_team_status(team_id, "em missão")
         
         # Atualizar status do chamado
-        for i, (_, eid, e) in enumerate(self.priority_heap):
-            if eid == emergency_id:
-                e["status"] = "em_atendimento"
-                self.priority_heap[i] = (self.priority_heap[i][0], eid, e)
-                break
+        self._set_emergency_status(emergency_id, "em_atendimento")
         
         # Atualizar status da área
         self.update_area_status(emergency_id, "controle em andamento")
@@ -1,6 +1,7 @@
 """
 Modelo para cálculo de risco de incêndio florestal baseado em dados meteorológicos.
 """
+import numpy as np
 
 class FireRiskCalculator:
     """
@@ -25,6 +26,13 @@ class FireRiskCalculator:
         'muito_alto': 100
     }
     
+    # Categorias e cores em ordem crescente de risco; o índice é o código da categoria
+    RISK_CATEGORIES = ('muito_baixo', 'baixo', 'moderado', 'alto', 'muito_alto')
+    RISK_COLORS = ('#3CB371', '#ADFF2F', '#FFD700', '#FF8C00', '#FF0000')
+    
+    # Limites superiores das categorias, exceto a última (usados em pesquisa ordenada)
+    RISK_EDGES = np.array([20, 40, 60, 80], dtype=np.float64)
+    
     @staticmethod
     def calculate_risk(temperature, humidity, wind_speed, precipitation_3h):
         """
@@ -64,6 +72,51 @@ class FireRiskCalculator:
                 
         return risk_index, risk_category
     
+    @staticmethod
+    def calculate_risk_batch(temperature, humidity, wind_speed, precipitation_3h):
+        """
+        Calcula o índice de risco de incêndio para muitas amostras de uma só vez.
+        
+        Aplica a mesma fórmula de calculate_risk, operação a operação e na mesma
+        ordem, pelo que os índices são idênticos bit a bit aos da versão escalar.
+        
+        Args:
+            temperature (array_like): Temperaturas em Celsius
+            humidity (array_like): Humidades relativas em percentagem
+            wind_speed (array_like): Velocidades do vento em m/s
+            precipitation_3h (array_like): Precipitação nas últimas 3 horas em mm
+        
+        Returns:
+            tuple: (índices de risco, códigos de categoria, cores hexadecimais) como arrays NumPy.
+                   Os códigos indexam RISK_CATEGORIES e RISK_COLORS.
+        """
+        temperature = np.asarray(temperature, dtype=np.float64)
+        humidity = np.asarray(humidity, dtype=np.float64)
+        wind_speed = np.asarray(wind_speed, dtype=np.float64)
+        precipitation_3h = np.asarray(precipitation_3h, dtype=np.float64)
+        
+        # fmax/fmin reproduzem min(100, max(0, x)), inclusive para NaN (que resulta em 0)
+        temp_factor = np.fmin(100, np.fmax((temperature - 5) * 4, 0))
+        humidity_factor = np.fmin(100, np.fmax(100 - humidity, 0))
+        wind_factor = np.fmin(100, np.fmax(wind_speed * 10, 0))
+        rain_factor = np.fmin(100, np.fmax(100 - (precipitation_3h * 20), 0))
+        
+        # Cálculo ponderado do risco
+        risk_index = (
+            FireRiskCalculator.TEMP_WEIGHT * temp_factor +
+            FireRiskCalculator.HUMIDITY_WEIGHT * humidity_factor +
+            FireRiskCalculator.WIND_WEIGHT * wind_factor +
+            FireRiskCalculator.RAIN_WEIGHT * rain_factor
+        )
+        
+        # Primeira categoria cujo limite é maior ou igual ao índice
+        category_codes = np.searchsorted(
+            FireRiskCalculator.RISK_EDGES, risk_index, side='left'
+        ).astype(np.uint8)
+        colors = np.asarray(FireRiskCalculator.RISK_COLORS)[category_codes]
+        
+        return risk_index, category_codes, colors
+    
     @staticmethod
     def get_risk_color(risk_index):
         """
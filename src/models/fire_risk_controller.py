@@ -2,11 +2,35 @@
 Controlador para integração dos serviços de meteorologia, cálculo de risco de incêndio e análise de grafo.
 """
 from src.models.openweather_service import OpenWeatherService
+from src.models.async_openweather_service import AsyncOpenWeatherService
+from src.models.background_loop import BackgroundEventLoop
+from src.models.weather_cache import WeatherCache
+from src.models.spatial_index import SpatialIndex
+from src.models.weather_data import WeatherBatch
+from src.models.persistent_weather_cache import PersistentWeatherCache
+from src.models.rate_limiter import TokenBucketRateLimiter
+from src.models.circuit_breaker import CircuitBreaker
+from src.models.adaptive_sampler import AdaptiveSampler
+from src.models.job_manager import JobManager
+from src.models.tile_service import TileService
+from src.models.result_store import ResultStore
+from src.models.prefetch_scheduler import PrefetchScheduler, DEFAULT_WATCHED_AREAS
+from src.models.weather_backends import (
+    HttpWeatherBackend,
+    RecordingWeatherBackend,
+    ReplayWeatherBackend,
+    WeatherArchive
+)
 from src.models.fire_risk import FireRiskCalculator
 from src.models.maps_service import MapsService
 from src.models.graph_service import GraphService
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as FuturesTimeoutError
+from datetime import datetime, timezone
+import asyncio
 import os
+import time
 import json
+import numpy as np
 
 class FireRiskController:
     """
@@ -19,76 +43,1008 @@ class FireRiskController:
         """
         # Inicializar serviços com chaves de API do ambiente
         openweather_api_key = os.environ.get("OPENWEATHER_API_KEY", "demo_key")
+        openweather_base_url = os.environ.get("OPENWEATHER_BASE_URL")
         maps_api_key = os.environ.get("GOOGLE_MAPS_API_KEY", "demo_key")
         
-        self.weather_service = OpenWeatherService(api_key=openweather_api_key)
+        # Índice espacial das observações em cache, para respostas pelo ponto mais próximo
+        self.spatial_index = SpatialIndex(cell_size=float(os.environ.get("SPATIAL_INDEX_CELL", 0.1)))
+        self.location_tolerance_km = float(os.environ.get("LOCATION_TOLERANCE_KM", 0))
+        
+        # Cache partilhado de observações, alinhado ao ciclo de atualização da OpenWeather
+        self.weather_cache = WeatherCache(
+            resolution=float(os.environ.get("WEATHER_CACHE_RESOLUTION", 0.01)),
+            ttl=float(os.environ.get("WEATHER_CACHE_TTL", WeatherCache.DEFAULT_TTL)),
+            max_entries=int(os.environ.get("WEATHER_CACHE_MAX_ENTRIES", 5000)),
+            stale_ttl=float(os.environ.get("WEATHER_CACHE_STALE_TTL", 3600)),
+            spatial_index=self.spatial_index
+        )
+        
+        # Cache opcional em disco, partilhado entre processos e reinícios
+        weather_cache_db = os.environ.get("WEATHER_CACHE_DB")
+        self.persistent_weather_cache = PersistentWeatherCache(
+            weather_cache_db,
+            resolution=self.weather_cache.resolution,
+            max_age=float(os.environ.get("WEATHER_CACHE_DB_MAX_AGE", 86400))
+        ) if weather_cache_db else None
+        
+        # Backend de transporte: HTTP (padrão), gravação ou reprodução de um arquivo
+        self.weather_backend = self._create_weather_backend()
+        
+        # Quota de chamadas à OpenWeather partilhada por todo o processo (0 desativa)
+        calls_per_minute = float(os.environ.get("OPENWEATHER_CALLS_PER_MINUTE", 60))
+        burst = os.environ.get("OPENWEATHER_BURST")
+        self.rate_limiter = TokenBucketRateLimiter(
+            calls_per_minute=calls_per_minute,
+            burst=int(burst) if burst is not None else None
+        ) if calls_per_minute > 0 else None
+        
+        # Disjuntor que suspende as chamadas enquanto a OpenWeather estiver a falhar
+        self.circuit_breaker = CircuitBreaker(
+            failure_threshold=int(os.environ.get("WEATHER_BREAKER_THRESHOLD", 5)),
+            recovery_timeout=float(os.environ.get("WEATHER_BREAKER_RECOVERY", 30)),
+            probe_timeout=float(os.environ.get("WEATHER_BREAKER_PROBE_TIMEOUT", 60))
+        )
+        
+        self.weather_service = OpenWeatherService(
+            api_key=openweather_api_key,
+            base_url=openweather_base_url,
+            cache=self.weather_cache,
+            backend=self.weather_backend,
+            rate_limiter=self.rate_limiter,
+            persistent_cache=self.persistent_weather_cache,
+            circuit_breaker=self.circuit_breaker,
+            keep_raw=os.environ.get("WEATHER_KEEP_RAW", "0") == "1"
+        )
         self.maps_service = MapsService(api_key=maps_api_key)
         self.graph_service = GraphService(openweather_service=self.weather_service)
+        
+        # Concorrência e prazo para amostragem de regiões
+        self.region_max_workers = int(os.environ.get("REGION_MAX_WORKERS", 8))
+        self.region_deadline = float(os.environ.get("REGION_DEADLINE", 30))
+        
+        # Cliente assíncrono único, aberto num loop de fundo e partilhado por todos os pedidos:
+        # as conexões keep-alive são reutilizadas e o limite de chamadas simultâneas vale
+        # para o processo inteiro, e não para cada pedido
+        self.weather_loop = BackgroundEventLoop(name="weather-async")
+        self.async_weather_service = self.create_async_weather_service(
+            max_concurrency=int(os.environ.get("WEATHER_ASYNC_MAX_CONCURRENCY", 16))
+        )
+        self.weather_loop.run_sync(self.async_weather_service.open())
+        
+        # Parâmetros padrão da amostragem adaptativa (quadtree)
+        self.adaptive_tolerance = float(os.environ.get("ADAPTIVE_TOLERANCE", 10))
+        self.adaptive_max_depth = int(os.environ.get("ADAPTIVE_MAX_DEPTH", 4))
+        self.adaptive_max_calls = int(os.environ.get("ADAPTIVE_MAX_CALLS", 40))
+        
+        # Tarefas em segundo plano para regiões que excedem o tempo de um pedido HTTP
+        self.job_manager = JobManager(
+            max_workers=int(os.environ.get("REGION_JOB_WORKERS", 2)),
+            result_ttl=float(os.environ.get("REGION_JOB_TTL", 600)),
+            max_pending=int(os.environ.get("REGION_JOB_MAX_PENDING", 20))
+        )
+        # Prazo de uma tarefa: longo, para que grades grandes caibam na quota por minuto
+        self.region_job_deadline = float(os.environ.get("REGION_JOB_DEADLINE", 3600))
+        
+        # Resultados recentes, para renderizar os mapas só quando pedidos
+        self.result_store = ResultStore(ttl=float(os.environ.get("RESULT_TTL", 600)))
+        
+        # Mosaicos PNG de risco para mapas deslizantes
+        self.tile_service = TileService(
+            fetch_points=self._fetch_weather_for_points,
+            samples=int(os.environ.get("TILE_SAMPLES", 4)),
+            ttl=float(os.environ.get("TILE_TTL", self.weather_cache.ttl)),
+            cache_dir=os.environ.get("TILE_CACHE_DIR") or None,
+            max_memory_tiles=int(os.environ.get("TILE_CACHE_MAX_TILES", 512)),
+            partial_ttl=float(os.environ.get("TILE_PARTIAL_TTL", 30))
+        )
+        
+        # Atualização antecipada, em segundo plano, das áreas vigiadas pela central
+        self.prefetch_scheduler = None
+        if os.environ.get("PREFETCH_ENABLED", "0") == "1":
+            self.prefetch_scheduler = PrefetchScheduler(
+                self.weather_service,
+                refresh_margin=float(os.environ.get("PREFETCH_REFRESH_MARGIN", 60)),
+                calls_per_minute=float(os.environ.get("PREFETCH_CALLS_PER_MINUTE",
+                                                      calls_per_minute / 2 if self.rate_limiter else 0)),
+                on_refresh=self._precompute_watched_region
+            )
+            for area in self._load_watched_areas():
+                try:
+                    self.watch_area(area)
+                except (KeyError, TypeError, ValueError) as e:
+                    print(f"Área vigiada inválida {area}: {e}")
+            self.prefetch_scheduler.start()
     
-    def calculate_fire_risk_for_location(self, lat, lon):
+    def create_async_weather_service(self, max_concurrency=None):
+        """
+        Cria um cliente assíncrono da OpenWeather que partilha o cache e a quota do controlador.
+        
+        O cliente deve ser usado como gestor de contexto assíncrono, pois as suas
+        conexões pertencem ao loop de eventos em que é aberto. Os métodos do controlador
+        usam o cliente partilhado async_weather_service, aberto em weather_loop.
+        
+        Args:
+            max_concurrency (int, optional): Chamadas simultâneas (padrão: REGION_MAX_WORKERS)
+        
+        Returns:
+            AsyncOpenWeatherService: Cliente assíncrono configurado
+        """
+        return AsyncOpenWeatherService(
+            api_key=self.weather_service.api_key,
+            base_url=self.weather_service.base_url,
+            cache=self.weather_cache,
+            max_concurrency=max_concurrency or self.region_max_workers,
+            single_flight=self.weather_service.single_flight,
+            backend=None if isinstance(self.weather_backend, HttpWeatherBackend) else self.weather_backend,
+            rate_limiter=self.rate_limiter,
+            persistent_cache=self.persistent_weather_cache,
+            circuit_breaker=self.circuit_breaker,
+            sync_service=self.weather_service,
+            keep_raw=self.weather_service.keep_raw
+        )
+    
+    def _load_watched_areas(self):
+        """
+        Obtém as áreas vigiadas no arranque.
+        
+        Por padrão, vigia cada município de DEFAULT_WATCHED_AREAS como ponto e como
+        região em grade à sua volta. A variável PREFETCH_WATCHES pode indicar um
+        ficheiro JSON com uma lista adicional de áreas no formato aceite por watch_area.
+        
+        Returns:
+            list: Lista de áreas
+        """
+        radius = float(os.environ.get("PREFETCH_DEFAULT_RADIUS", 0.15))
+        areas = []
+        for area in DEFAULT_WATCHED_AREAS:
+            areas.append(area)
+            areas.append({
+                'name': f"{area['name']} (região)",
+                'bounds': {
+                    'north': area['lat'] + radius,
+                    'south': area['lat'] - radius,
+                    'east': area['lon'] + radius,
+                    'west': area['lon'] - radius
+                },
+                'grid_size': 5
+            })
+        
+        watches_file = os.environ.get("PREFETCH_WATCHES")
+        if watches_file:
+            try:
+                with open(watches_file, encoding="utf-8") as f:
+                    areas.extend(json.load(f))
+            except (OSError, ValueError) as e:
+                print(f"Erro ao ler áreas vigiadas de {watches_file}: {e}")
+        
+        return areas
+    
+    def watch_area(self, area):
+        """
+        Regista uma área vigiada no agendador de atualização antecipada.
+        
+        Args:
+            area (dict): {name, lat, lon} para um ponto ou
+                         {name, bounds: {north, south, east, west}, grid_size} para uma região
+            
+        Returns:
+            dict: Área registada
+            
+        Raises:
+            KeyError, TypeError, ValueError: Se a área for inválida
+        """
+        if 'bounds' in area:
+            bounds = {k: float(area['bounds'][k]) for k in ('north', 'south', 'east', 'west')}
+            grid_size = int(area.get('grid_size', 5))
+            if not (1 <= grid_size <= 20):
+                raise ValueError("grid_size deve estar entre 1 e 20")
+            watch = self.prefetch_scheduler.watch_bounds(
+                bounds, self._build_grid_coordinates(bounds, grid_size), grid_size, area.get('name')
+            )
+        else:
+            watch = self.prefetch_scheduler.watch_point(
+                float(area['lat']), float(area['lon']), area.get('name')
+            )
+        return watch.to_dict()
+    
+    def _precompute_watched_region(self, watch):
+        """
+        Recalcula o resultado de uma região vigiada a partir do cache já atualizado.
+        
+        Args:
+            watch (WatchedArea): Região vigiada
+            
+        Returns:
+            dict: Dados de risco de incêndio para a região
+        """
+        observations = self._fetch_weather_for_points(watch.coordinates)
+        return self._build_region_result(watch.bounds, watch.coordinates, observations)
+    
+    def _create_weather_backend(self):
+        """
+        Cria o backend de transporte da OpenWeather conforme a variável WEATHER_BACKEND.
+        
+        Valores aceites:
+            http (padrão): chamadas reais à API
+            record: chamadas reais, gravadas em WEATHER_ARCHIVE
+            replay: respostas reproduzidas de WEATHER_ARCHIVE, sem acesso à rede,
+                    com latência (WEATHER_REPLAY_LATENCY, WEATHER_REPLAY_JITTER) e
+                    taxa de erros (WEATHER_REPLAY_ERROR_RATE) opcionais
+        
+        Returns:
+            WeatherBackend: Backend configurado
+        """
+        mode = os.environ.get("WEATHER_BACKEND", "http").lower()
+        archive_path = os.environ.get(
+            "WEATHER_ARCHIVE",
+            os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "weather_archive.jsonl.gz")
+        )
+        
+        if mode == "replay":
+            seed = os.environ.get("WEATHER_REPLAY_SEED")
+            return ReplayWeatherBackend(
+                WeatherArchive(archive_path, resolution=self.weather_cache.resolution),
+                latency=float(os.environ.get("WEATHER_REPLAY_LATENCY", 0)),
+                latency_jitter=float(os.environ.get("WEATHER_REPLAY_JITTER", 0)),
+                error_rate=float(os.environ.get("WEATHER_REPLAY_ERROR_RATE", 0)),
+                seed=int(seed) if seed is not None else None
+            )
+        
+        http_backend = HttpWeatherBackend()
+        if mode == "record":
+            return RecordingWeatherBackend(
+                http_backend,
+                WeatherArchive(archive_path, resolution=self.weather_cache.resolution)
+            )
+        if mode != "http":
+            print(f"WEATHER_BACKEND desconhecido '{mode}', a usar http")
+        
+        return http_backend
+    
+    def calculate_fire_risk_for_location(self, lat, lon, priority=TokenBucketRateLimiter.PRIORITY_INTERACTIVE,
+                                         deadline=None, tolerance_km=None):
         """
         Calcula o risco de incêndio para uma localização específica.
         
         Args:
             lat (float): Latitude da localização
             lon (float): Longitude da localização
+            priority (str, optional): Prioridade na quota de chamadas (interactive, bulk ou prefetch)
+            deadline (float, optional): Prazo absoluto do pedido em time.monotonic()
+            tolerance_km (float, optional): Distância até à qual uma observação recente em cache
+                                    é usada em vez de uma chamada à API. Padrão: LOCATION_TOLERANCE_KM.
             
         Returns:
             dict: Informações sobre o risco de incêndio e dados meteorológicos
         """
+        nearby = self._nearest_location_result(lat, lon, tolerance_km)
+        if nearby is not None:
+            return nearby
+        
         try:
             # Obter dados meteorológicos
-            weather_data = self.weather_service.get_weather_by_location(lat, lon)
-            
-            # Calcular risco de incêndio
-            risk_index, risk_category = FireRiskCalculator.calculate_risk(
-                weather_data.temperature,
-                weather_data.humidity,
-                weather_data.wind_speed,
-                weather_data.precipitation
+            weather_data = self.weather_service.get_weather_by_location(
+                lat, lon, priority=priority, deadline=deadline
             )
             
-            # Obter cor e descrição do risco
-            risk_color = FireRiskCalculator.get_risk_color(risk_index)
-            risk_description = FireRiskCalculator.get_risk_description(risk_category)
+            return self._build_location_result(weather_data)
+        except Exception as e:
+            print(f"Erro ao calcular risco de incêndio: {e}")
+            raise
+    
+    async def calculate_fire_risk_for_location_async(self, lat, lon, weather_service=None,
+                                                     priority=TokenBucketRateLimiter.PRIORITY_INTERACTIVE,
+                                                     deadline=None, tolerance_km=None):
+        """
+        Versão assíncrona de calculate_fire_risk_for_location.
+        
+        Args:
+            lat (float): Latitude da localização
+            lon (float): Longitude da localização
+            weather_service (AsyncOpenWeatherService, optional): Cliente assíncrono já aberto no
+                                    loop atual. Se não fornecido, a chamada é feita pelo cliente
+                                    partilhado, no loop de fundo do controlador.
+            priority (str, optional): Prioridade na quota de chamadas (interactive, bulk ou prefetch)
+            deadline (float, optional): Prazo absoluto do pedido em time.monotonic()
+            tolerance_km (float, optional): Distância até à qual uma observação recente em cache
+                                    é usada em vez de uma chamada à API. Padrão: LOCATION_TOLERANCE_KM.
             
-            # Preparar resposta
-            result = {
-                'location': {
-                    'name': weather_data.location_name,
-                    'coordinates': weather_data.coordinates
-                },
-                'weather': {
-                    'temperature': weather_data.temperature,
-                    'humidity': weather_data.humidity,
-                    'wind_speed': weather_data.wind_speed,
-                    'precipitation': weather_data.precipitation,
-                    'description': weather_data.weather_description
-                },
-                'fire_risk': {
-                    'index': risk_index,
-                    'category': risk_category,
-                    'color': risk_color,
-                    'description': risk_description
-                }
-            }
+        Returns:
+            dict: Informações sobre o risco de incêndio e dados meteorológicos
+        """
+        nearby = self._nearest_location_result(lat, lon, tolerance_km)
+        if nearby is not None:
+            return nearby
+        
+        if weather_service is None:
+            return await self.weather_loop.run(self.calculate_fire_risk_for_location_async(
+                lat, lon, self.async_weather_service, priority, deadline, tolerance_km=0
+            ))
+        
+        try:
+            # Obter dados meteorológicos
+            weather_data = await weather_service.get_weather_by_location(
+                lat, lon, priority=priority, deadline=deadline
+            )
             
-            return result
+            return self._build_location_result(weather_data)
         except Exception as e:
             print(f"Erro ao calcular risco de incêndio: {e}")
             raise
     
-    def calculate_fire_risk_for_region(self, bounds, grid_size=5):
+    def _nearest_location_result(self, lat, lon, tolerance_km=None):
+        """
+        Calcula o risco a partir da observação recente em cache mais próxima, se houver.
+        
+        Args:
+            lat (float): Latitude da localização
+            lon (float): Longitude da localização
+            tolerance_km (float, optional): Distância máxima em km. Padrão: LOCATION_TOLERANCE_KM.
+            
+        Returns:
+            dict: Resultado com 'nearest_sample' (ponto usado e distância), ou None
+        """
+        tolerance_km = self.location_tolerance_km if tolerance_km is None else tolerance_km
+        if tolerance_km <= 0:
+            return None
+        
+        nearest = self.spatial_index.nearest(lat, lon, tolerance_km)
+        if nearest is None:
+            return None
+        
+        weather_data, sample_lat, sample_lon, distance = nearest
+        result = self._build_location_result(weather_data)
+        result['nearest_sample'] = {
+            'lat': sample_lat,
+            'lon': sample_lon,
+            'distance_km': round(distance, 3)
+        }
+        return result
+    
+    def cached_observations_in_bounds(self, bounds):
+        """
+        Obtém o risco de todas as observações recentes em cache dentro de um retângulo, sem chamar a API.
+        
+        Args:
+            bounds (dict): Limites {north, south, east, west}
+            
+        Returns:
+            list: Pontos com lat, lon, risk_index, risk_category, color e age_seconds
+        """
+        observations = self.spatial_index.within_bounds(bounds)
+        if not observations:
+            return []
+        
+        batch = WeatherBatch([(lat, lon) for lat, lon, _ in observations],
+                             [weather_data for _, _, weather_data in observations])
+        risk_index, category_codes, colors = batch.calculate_risk()
+        now = time.time()
+        
+        return [
+            {
+                'lat': observations[i][0],
+                'lon': observations[i][1],
+                'risk_index': float(risk_index[i]),
+                'risk_category': FireRiskCalculator.RISK_CATEGORIES[category_codes[i]],
+                'color': str(colors[i]),
+                'age_seconds': round(now - batch.fetched_at[i])
+            }
+            for i in np.flatnonzero(batch.valid)
+        ]
+    
+    def _build_location_result(self, weather_data):
+        """
+        Calcula o risco de incêndio a partir de dados meteorológicos e prepara a resposta.
+        
+        Args:
+            weather_data (WeatherData): Dados meteorológicos da localização
+            
+        Returns:
+            dict: Informações sobre o risco de incêndio e dados meteorológicos
+        """
+        # Calcular risco de incêndio
+        risk_index, risk_category = FireRiskCalculator.calculate_risk(
+            weather_data.temperature,
+            weather_data.humidity,
+            weather_data.wind_speed,
+            weather_data.precipitation
+        )
+        
+        # Obter cor e descrição do risco
+        risk_color = FireRiskCalculator.get_risk_color(risk_index)
+        risk_description = FireRiskCalculator.get_risk_description(risk_category)
+        
+        # Preparar resposta
+        result = {
+            'location': {
+                'name': weather_data.location_name,
+                'coordinates': weather_data.coordinates
+            },
+            'weather': {
+                'temperature': weather_data.temperature,
+                'humidity': weather_data.humidity,
+                'wind_speed': weather_data.wind_speed,
+                'precipitation': weather_data.precipitation,
+                'description': weather_data.weather_description,
+                # Idade da observação; stale indica que foi servida após expirar
+                'age_seconds': round(weather_data.age),
+                'stale': weather_data.stale
+            },
+            'fire_risk': {
+                'index': risk_index,
+                'category': risk_category,
+                'color': risk_color,
+                'description': risk_description
+            }
+        }
+        
+        return result
+    
+    def calculate_fire_risk_forecast(self, lat, lon, window_hours=24):
+        """
+        Calcula a evolução do risco de incêndio ao longo da previsão de 5 dias / 3 horas.
+        
+        A previsão é obtida numa única chamada (e mantida em cache até à próxima
+        emissão) e todos os instantes são pontuados numa só passagem vetorizada.
+        
+        Args:
+            lat (float): Latitude da localização
+            lon (float): Longitude da localização
+            window_hours (float): Duração da janela usada para encontrar o período de maior risco
+            
+        Returns:
+            dict: Série temporal de risco, instante de pico e janela de maior risco médio
+        """
+        try:
+            forecast = self.weather_service.get_forecast_by_location(lat, lon)
+        except Exception as e:
+            print(f"Erro ao obter previsão para ({lat}, {lon}): {e}")
+            raise
+        
+        # Ignorar instantes incompletos: um campo em falta não pode valer 0
+        # (umidade 0 % pontuaria como secura máxima e criaria um falso pico)
+        steps = [
+            step for step in forecast.get('list', [])
+            if step.get('dt') is not None
+            and step.get('main', {}).get('temp') is not None
+            and step.get('main', {}).get('humidity') is not None
+            and step.get('wind', {}).get('speed') is not None
+        ]
+        city = forecast.get('city', {})
+        location = {
+            'name': city.get('name', ''),
+            'coordinates': [lat, lon]
+        }
+        
+        if not steps:
+            return {
+                'location': location,
+                'timeline': [],
+                'peak': None,
+                'peak_window': None
+            }
+        
+        # Extrair as séries da previsão (struct-of-arrays)
+        timestamps = np.array([step['dt'] for step in steps], dtype=np.int64)
+        temperature = np.array([step['main']['temp'] for step in steps], dtype=np.float64)
+        humidity = np.array([step['main']['humidity'] for step in steps], dtype=np.float64)
+        wind_speed = np.array([step['wind']['speed'] for step in steps], dtype=np.float64)
+        # A OpenWeather omite 'rain' quando não há precipitação prevista
+        precipitation = np.array([step.get('rain', {}).get('3h', 0) for step in steps], dtype=np.float64)
+        
+        # Pontuar todos os instantes de uma vez
+        risk_index, category_codes, colors = FireRiskCalculator.calculate_risk_batch(
+            temperature, humidity, wind_speed, precipitation
+        )
+        
+        timeline = [
+            {
+                'timestamp': int(timestamps[i]),
+                'datetime': self._format_timestamp(timestamps[i]),
+                'temperature': float(temperature[i]),
+                'humidity': float(humidity[i]),
+                'wind_speed': float(wind_speed[i]),
+                'precipitation': float(precipitation[i]),
+                'risk_index': float(risk_index[i]),
+                'risk_category': FireRiskCalculator.RISK_CATEGORIES[category_codes[i]],
+                'color': str(colors[i])
+            }
+            for i in range(len(steps))
+        ]
+        
+        # Instante de maior risco
+        peak_position = int(np.argmax(risk_index))
+        
+        # Janela contínua com o maior risco médio (média móvel)
+        step_seconds = int(np.median(np.diff(timestamps))) if len(timestamps) > 1 else 3 * 3600
+        window_steps = max(1, min(len(steps), int(round(window_hours * 3600 / max(step_seconds, 1)))))
+        window_means = np.convolve(risk_index, np.ones(window_steps) / window_steps, mode='valid')
+        window_start = int(np.argmax(window_means))
+        window_end = window_start + window_steps - 1
+        window_mean = float(window_means[window_start])
+        window_code = int(np.searchsorted(FireRiskCalculator.RISK_EDGES, window_mean, side='left'))
+        
+        return {
+            'location': location,
+            'timeline': timeline,
+            'peak': timeline[peak_position],
+            'peak_window': {
+                'start': timeline[window_start]['datetime'],
+                'end': timeline[window_end]['datetime'],
+                'start_timestamp': timeline[window_start]['timestamp'],
+                'end_timestamp': timeline[window_end]['timestamp'],
+                'hours': window_steps * step_seconds / 3600,
+                'average_index': window_mean,
+                'max_index': float(risk_index[window_start:window_end + 1].max()),
+                'category': FireRiskCalculator.RISK_CATEGORIES[window_code],
+                'color': FireRiskCalculator.RISK_COLORS[window_code]
+            }
+        }
+    
+    def _format_timestamp(self, timestamp):
+        """
+        Converte um instante Unix para texto ISO 8601 em UTC.
+        """
+        return datetime.fromtimestamp(int(timestamp), tz=timezone.utc).isoformat()
+    
+    def _fetch_weather_for_points(self, coordinates, max_workers=None, deadline=None):
+        """
+        Obtém os dados meteorológicos de vários pontos em paralelo.
+        
+        As chamadas são distribuídas por um pool limitado de threads e os resultados
+        são devolvidos na mesma ordem das coordenadas recebidas.
+        
+        Args:
+            coordinates (list): Lista de tuplas (lat, lon)
+            max_workers (int, optional): Número máximo de chamadas simultâneas
+            deadline (float, optional): Tempo máximo total em segundos
+            
+        Returns:
+            list: WeatherData de cada ponto, ou None se falhou
+        """
+        observations = [None] * len(coordinates)
+        for i, weather_data in self._iter_weather_for_points(coordinates, max_workers, deadline):
+            observations[i] = weather_data
+        return observations
+    
+    def _iter_weather_for_points(self, coordinates, max_workers=None, deadline=None):
+        """
+        Obtém os dados meteorológicos de vários pontos em paralelo, à medida que ficam prontos.
+        
+        Args:
+            coordinates (list): Lista de tuplas (lat, lon)
+            max_workers (int, optional): Número máximo de chamadas simultâneas
+            deadline (float, optional): Tempo máximo total em segundos
+            
+        Yields:
+            tuple: (posição do ponto em coordinates, WeatherData ou None se falhou), por ordem de conclusão
+        """
+        if not coordinates:
+            return
+        
+        max_workers = max_workers or self.region_max_workers
+        deadline = deadline if deadline is not None else self.region_deadline
+        # Pontos da grade entram na quota como pedidos em lote, com o prazo da região
+        expires_at = time.monotonic() + deadline
+        
+        executor = ThreadPoolExecutor(max_workers=min(max_workers, len(coordinates)))
+        try:
+            futures = {
+                executor.submit(self.weather_service.get_weather_by_location, lat, lon,
+                                priority=TokenBucketRateLimiter.PRIORITY_BULK, deadline=expires_at): i
+                for i, (lat, lon) in enumerate(coordinates)
+            }
+            pending = set(futures)
+            try:
+                for future in as_completed(futures, timeout=deadline):
+                    pending.discard(future)
+                    i = futures[future]
+                    try:
+                        weather_data = future.result()
+                    except Exception as e:
+                        lat, lon = coordinates[i]
+                        print(f"Erro ao processar ponto ({lat}, {lon}): {e}")
+                        weather_data = None
+                    yield i, weather_data
+            except FuturesTimeoutError:
+                for future in sorted(pending, key=futures.get):
+                    future.cancel()
+                    lat, lon = coordinates[futures[future]]
+                    print(f"Erro ao processar ponto ({lat}, {lon}): tempo limite de {deadline}s excedido")
+                    yield futures[future], None
+        finally:
+            # Não esperar por chamadas que ultrapassaram o prazo (nem pelo cliente que desistiu)
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def calculate_fire_risk_for_region(self, bounds, grid_size=5, max_workers=None, deadline=None):
         """
         Calcula o risco de incêndio para uma região definida por limites geográficos.
         
         Args:
             bounds (dict): Limites da região {north, south, east, west}
             grid_size (int): Tamanho da grade para amostragem de pontos
+            max_workers (int, optional): Número máximo de chamadas simultâneas à API
+            deadline (float, optional): Tempo máximo em segundos para amostrar a grade
             
         Returns:
             dict: Dados de risco de incêndio para a região
         """
+        # Regiões vigiadas já têm o resultado pré-calculado em segundo plano
+        if self.prefetch_scheduler is not None:
+            precomputed = self.prefetch_scheduler.get_result(bounds, grid_size)
+            if precomputed is not None:
+                return precomputed
+        
+        # Pontos da grade, em ordem de linha
+        coordinates = self._build_grid_coordinates(bounds, grid_size)
+        
+        # Obter os dados de cada ponto da grade em paralelo
+        observations = self._fetch_weather_for_points(coordinates, max_workers, deadline)
+        
+        return self._build_region_result(bounds, coordinates, observations)
+    
+    async def calculate_fire_risk_for_region_async(self, bounds, grid_size=5, deadline=None):
+        """
+        Versão assíncrona de calculate_fire_risk_for_region.
+        
+        Todos os pontos da grade são pedidos em simultâneo no loop de fundo do controlador;
+        a concorrência efetiva é limitada pelo cliente assíncrono partilhado.
+        
+        Args:
+            bounds (dict): Limites da região {north, south, east, west}
+            grid_size (int): Tamanho da grade para amostragem de pontos
+            deadline (float, optional): Tempo máximo em segundos para amostrar a grade
+            
+        Returns:
+            dict: Dados de risco de incêndio para a região
+        """
+        if self.prefetch_scheduler is not None:
+            precomputed = self.prefetch_scheduler.get_result(bounds, grid_size)
+            if precomputed is not None:
+                return precomputed
+        
+        deadline = deadline if deadline is not None else self.region_deadline
+        coordinates = self._build_grid_coordinates(bounds, grid_size)
+        expires_at = time.monotonic() + deadline
+        
+        observations = await self.weather_loop.run(self._fetch_weather_for_points_async(
+            self.async_weather_service, coordinates, expires_at
+        ))
+        
+        return self._build_region_result(bounds, coordinates, observations)
+    
+    async def _fetch_weather_for_points_async(self, weather_service, coordinates, expires_at):
+        """
+        Versão assíncrona de _fetch_weather_for_points.
+        
+        Args:
+            weather_service (AsyncOpenWeatherService): Cliente assíncrono aberto
+            coordinates (list): Lista de tuplas (lat, lon)
+            expires_at (float): Prazo absoluto (time.monotonic) para obter os pontos
+            
+        Returns:
+            list: WeatherData de cada ponto, ou None se falhou
+        """
+        deadline = max(0.0, expires_at - time.monotonic())
+        tasks = [
+            asyncio.ensure_future(weather_service.get_weather_by_location(
+                lat, lon, priority=TokenBucketRateLimiter.PRIORITY_BULK, deadline=expires_at
+            ))
+            for lat, lon in coordinates
+        ]
+        if tasks:
+            await asyncio.wait(tasks, timeout=deadline)
+        
+        observations = []
+        for (lat, lon), task in zip(coordinates, tasks):
+            if not task.done():
+                task.cancel()
+                print(f"Erro ao processar ponto ({lat}, {lon}): tempo limite de {deadline:.0f}s excedido")
+                observations.append(None)
+            elif task.cancelled():
+                print(f"Erro ao processar ponto ({lat}, {lon}): chamada cancelada")
+                observations.append(None)
+            elif task.exception() is not None:
+                print(f"Erro ao processar ponto ({lat}, {lon}): {task.exception()}")
+                observations.append(None)
+            else:
+                observations.append(task.result())
+        
+        # Aguardar o cancelamento das tarefas pendentes antes de devolver
+        await asyncio.gather(*tasks, return_exceptions=True)
+        return observations
+    
+    def _create_adaptive_sampler(self, bounds, tolerance=None, max_depth=None, max_calls=None, min_depth=1):
+        """
+        Cria um amostrador adaptativo com os parâmetros padrão do controlador.
+        
+        ADAPTIVE_MAX_DEPTH e ADAPTIVE_MAX_CALLS são também os limites máximos aceites,
+        para que um pedido não possa exigir mais chamadas do que o servidor permite.
+        
+        Returns:
+            AdaptiveSampler: Amostrador para a região
+        
+        Raises:
+            ValueError: Se os parâmetros forem inválidos ou excederem os limites do servidor
+        """
+        max_depth = self.adaptive_max_depth if max_depth is None else max_depth
+        max_calls = self.adaptive_max_calls if max_calls is None else max_calls
+        if max_depth > self.adaptive_max_depth or max_calls > self.adaptive_max_calls:
+            raise ValueError(
+                f"max_depth e max_calls não podem exceder {self.adaptive_max_depth} e {self.adaptive_max_calls}."
+            )
+        
+        return AdaptiveSampler(
+            bounds,
+            tolerance=self.adaptive_tolerance if tolerance is None else tolerance,
+            max_depth=max_depth,
+            max_calls=max_calls,
+            min_depth=min_depth
+        )
+    
+    def calculate_fire_risk_for_region_adaptive(self, bounds, tolerance=None, max_depth=None, max_calls=None,
+                                                min_depth=1, max_workers=None, deadline=None):
+        """
+        Calcula o risco de incêndio para uma região com amostragem adaptativa por quadtree.
+        
+        A região começa numa grade grosseira e só as células cujos vértices diferem em
+        risco mais do que a tolerância são subdivididas, até à profundidade máxima e ao
+        número máximo de chamadas.
+        
+        Args:
+            bounds (dict): Limites da região {north, south, east, west}
+            tolerance (float, optional): Diferença de risco que leva a subdividir uma célula
+            max_depth (int, optional): Profundidade máxima da quadtree
+            max_calls (int, optional): Número máximo de pontos amostrados
+            min_depth (int): Profundidade da grade inicial
+            max_workers (int, optional): Número máximo de chamadas simultâneas à API
+            deadline (float, optional): Tempo máximo em segundos para amostrar a região
+            
+        Returns:
+            dict: Dados de risco de incêndio para a região, com a quadtree em 'sampling'
+            
+        Raises:
+            ValueError: Se os parâmetros da amostragem forem inválidos
+        """
+        sampler = self._create_adaptive_sampler(bounds, tolerance, max_depth, max_calls, min_depth)
+        deadline = deadline if deadline is not None else self.region_deadline
+        expires_at = time.monotonic() + deadline
+        
+        coordinates = sampler.next_points()
+        while coordinates:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                break
+            sampler.add_observations(self._fetch_weather_for_points(coordinates, max_workers, remaining))
+            coordinates = sampler.next_points()
+        
+        return self._build_region_result(bounds, sampler.coordinates, sampler.observations,
+                                         sampling=sampler.to_dict())
+    
+    async def calculate_fire_risk_for_region_adaptive_async(self, bounds, tolerance=None, max_depth=None,
+                                                            max_calls=None, min_depth=1, deadline=None):
+        """
+        Versão assíncrona de calculate_fire_risk_for_region_adaptive.
+        
+        Returns:
+            dict: Dados de risco de incêndio para a região, com a quadtree em 'sampling'
+            
+        Raises:
+            ValueError: Se os parâmetros da amostragem forem inválidos
+        """
+        sampler = self._create_adaptive_sampler(bounds, tolerance, max_depth, max_calls, min_depth)
+        deadline = deadline if deadline is not None else self.region_deadline
+        expires_at = time.monotonic() + deadline
+        
+        coordinates = sampler.next_points()
+        while coordinates and time.monotonic() < expires_at:
+            sampler.add_observations(await self.weather_loop.run(self._fetch_weather_for_points_async(
+                self.async_weather_service, coordinates, expires_at
+            )))
+            coordinates = sampler.next_points()
+        
+        return self._build_region_result(bounds, sampler.coordinates, sampler.observations,
+                                         sampling=sampler.to_dict())
+    
+    def stream_fire_risk_for_region(self, bounds, grid_size=5, adaptive=None, max_workers=None, deadline=None):
+        """
+        Calcula o risco de incêndio para uma região, emitindo cada ponto assim que fica pronto.
+        
+        Os parâmetros são validados de imediato; a amostragem só começa quando o
+        gerador devolvido é consumido.
+        
+        Args:
+            bounds (dict): Limites da região {north, south, east, west}
+            grid_size (int): Tamanho da grade para amostragem de pontos
+            adaptive (dict, optional): Parâmetros da amostragem adaptativa (tolerance, max_depth,
+                                       max_calls, min_depth); None para a grade uniforme
+            max_workers (int, optional): Número máximo de chamadas simultâneas à API
+            deadline (float, optional): Tempo máximo em segundos para amostrar a região
+            
+        Returns:
+            generator: Eventos (dict) 'start', um 'point' ou 'point_error' por ponto e 'summary' no fim
+            
+        Raises:
+            ValueError: Se os parâmetros da amostragem forem inválidos
+        """
+        sampler = None
+        if adaptive is not None:
+            sampler = self._create_adaptive_sampler(bounds, **adaptive)
+        elif grid_size < 1:
+            raise ValueError("grid_size deve ser >= 1.")
+        
+        return self._stream_region(bounds, grid_size, sampler, max_workers, deadline)
+    
+    def _stream_region(self, bounds, grid_size, sampler, max_workers, deadline):
+        center = {
+            'lat': (bounds['north'] + bounds['south']) / 2,
+            'lon': (bounds['east'] + bounds['west']) / 2
+        }
+        
+        if sampler is None:
+            coordinates = self._build_grid_coordinates(bounds, grid_size)
+            precomputed = (self.prefetch_scheduler.get_result(bounds, grid_size)
+                           if self.prefetch_scheduler is not None else None)
+        else:
+            coordinates = sampler.next_points()
+            precomputed = None
+        
+        yield {
+            'type': 'start',
+            'region': {'bounds': bounds, 'center': center},
+            'mode': 'grid' if sampler is None else 'adaptive',
+            # No modo adaptativo o total só é conhecido no fim
+            'points': len(coordinates) if sampler is None else None
+        }
+        
+        # Região vigiada com resultado pré-calculado: emitir os pontos já prontos
+        if precomputed is not None:
+            for point in precomputed['fire_risk']['points']:
+                yield dict(point, type='point')
+            yield self._region_summary(precomputed)
+            return
+        
+        deadline = deadline if deadline is not None else self.region_deadline
+        expires_at = time.monotonic() + deadline
+        all_coordinates = []
+        all_observations = []
+        
+        while coordinates:
+            remaining = expires_at - time.monotonic()
+            if remaining <= 0:
+                break
+            
+            observations = [None] * len(coordinates)
+            for i, weather_data in self._iter_weather_for_points(coordinates, max_workers, remaining):
+                observations[i] = weather_data
+                yield self._region_point_event(coordinates[i], weather_data)
+            
+            all_coordinates.extend(coordinates)
+            all_observations.extend(observations)
+            if sampler is None:
+                break
+            sampler.add_observations(observations)
+            coordinates = sampler.next_points()
+        
+        result = self._build_region_result(
+            bounds, all_coordinates, all_observations,
+            sampling=sampler.to_dict() if sampler is not None else None
+        )
+        yield self._region_summary(result)
+    
+    def submit_region_job(self, bounds, grid_size=5, adaptive=None):
+        """
+        Submete o cálculo de uma região como tarefa em segundo plano.
+        
+        Pedidos com os mesmos limites e parâmetros feitos enquanto a tarefa está na fila
+        ou em execução recebem a mesma tarefa.
+        
+        Args:
+            bounds (dict): Limites da região {north, south, east, west}
+            grid_size (int): Tamanho da grade para amostragem de pontos
+            adaptive (dict, optional): Parâmetros da amostragem adaptativa; None para a grade uniforme
+            
+        Returns:
+            tuple: (Job, True se a tarefa foi criada ou False se já existia)
+            
+        Raises:
+            ValueError: Se os parâmetros da amostragem forem inválidos
+            JobQueueFull: Se a fila de tarefas estiver cheia
+        """
+        key = (
+            'region',
+            tuple(round(float(bounds[k]), 4) for k in ('north', 'south', 'east', 'west')),
+            grid_size if adaptive is None else None,
+            tuple(sorted(adaptive.items())) if adaptive is not None else None
+        )
+        # Validar já, para que parâmetros inválidos falhem no pedido e não na tarefa
+        events = self.stream_fire_risk_for_region(bounds, grid_size, adaptive,
+                                                  deadline=self.region_job_deadline)
+        return self.job_manager.submit(key, self._run_region_job, events)
+    
+    def _run_region_job(self, job, events):
+        """
+        Executa o cálculo de uma região, publicando o progresso na tarefa.
+        
+        Args:
+            job (Job): Tarefa em execução
+            events (generator): Eventos de stream_fire_risk_for_region
+            
+        Returns:
+            dict: Resultado da região, no mesmo formato de calculate_fire_risk_for_region
+        """
+        points = []
+        summary = None
+        for event in events:
+            if event['type'] == 'start':
+                job.total = event['points']
+            elif event['type'] == 'point':
+                points.append({k: v for k, v in event.items() if k != 'type'})
+            elif event['type'] == 'summary':
+                summary = event
+            job.publish(event, progress=event['type'] in ('point', 'point_error'))
+        
+        result = {k: v for k, v in summary.items() if k != 'type'}
+        result['fire_risk'] = {k: v for k, v in summary['fire_risk'].items() if k != 'points_count'}
+        result['fire_risk']['points'] = points
+        return result
+    
+    def _region_point_event(self, coordinates, weather_data):
+        """
+        Prepara o evento de um ponto da região, com o risco calculado individualmente.
+        
+        Args:
+            coordinates (tuple): (lat, lon) do ponto
+            weather_data (WeatherData): Observação do ponto, ou None se falhou
+            
+        Returns:
+            dict: Evento 'point' ou, se não houver dados suficientes, 'point_error'
+        """
+        lat, lon = coordinates
+        if weather_data is None or None in (weather_data.temperature, weather_data.humidity,
+                                            weather_data.wind_speed):
+            return {'type': 'point_error', 'lat': lat, 'lon': lon}
+        
+        risk_index, risk_category = FireRiskCalculator.calculate_risk(
+            weather_data.temperature,
+            weather_data.humidity,
+            weather_data.wind_speed,
+            weather_data.precipitation or 0
+        )
+        return {
+            'type': 'point',
+            'lat': lat,
+            'lon': lon,
+            'risk_index': risk_index,
+            'risk_category': risk_category,
+            'color': FireRiskCalculator.get_risk_color(risk_index)
+        }
+    
+    def _region_summary(self, result):
+        """
+        Prepara o evento final a partir do resultado da região, sem repetir os pontos já emitidos.
+        
+        Args:
+            result (dict): Resultado de _build_region_result
+            
+        Returns:
+            dict: Evento 'summary'
+        """
+        fire_risk = {k: v for k, v in result['fire_risk'].items() if k != 'points'}
+        fire_risk['points_count'] = len(result['fire_risk']['points'])
+        return dict(result, type='summary', fire_risk=fire_risk)
+    
+    def _build_grid_coordinates(self, bounds, grid_size):
+        """
+        Gera as coordenadas de uma grade uniforme sobre a região.
+        
+        Args:
+            bounds (dict): Limites da região {north, south, east, west}
+            grid_size (int): Tamanho da grade para amostragem de pontos
+            
+        Returns:
+            list: Tuplas (lat, lon) em ordem de linha, de sul para norte e de oeste para leste
+        """
         # Extrair limites
         north = bounds['north']
         south = bounds['south']
@@ -99,38 +1055,55 @@ class FireRiskController:
         lat_step = (north - south) / grid_size
         lon_step = (east - west) / grid_size
         
+        return [
+            (south + (i * lat_step), west + (j * lon_step))
+            for i in range(grid_size + 1)
+            for j in range(grid_size + 1)
+        ]
+    
+    def _build_region_result(self, bounds, coordinates, observations, sampling=None):
+        """
+        Agrega as observações dos pontos amostrados e prepara a resposta da região.
+        
+        Os mapas não são renderizados aqui: o resultado fica guardado com o identificador
+        result_id e os mapas são gerados a pedido por render_result_maps.
+        
+        Args:
+            bounds (dict): Limites da região {north, south, east, west}
+            coordinates (list): Tuplas (lat, lon) amostradas
+            observations (list): WeatherData de cada ponto, ou None se o ponto falhou
+            sampling (dict, optional): Descrição da amostragem adaptativa
+            
+        Returns:
+            dict: Dados de risco de incêndio para a região
+        """
         # Inicializar listas para armazenar resultados
         risk_points = []
         heat_map_data = []
         
         # Calcular centro da região para o mapa
-        center_lat = (north + south) / 2
-        center_lon = (east + west) / 2
-        
-        # Calcular risco para cada ponto da grade
-        for i in range(grid_size + 1):
-            lat = south + (i * lat_step)
-            for j in range(grid_size + 1):
-                lon = west + (j * lon_step)
-                
-                try:
-                    # Calcular risco para este ponto
-                    result = self.calculate_fire_risk_for_location(lat, lon)
-                    
-                    # Adicionar à lista de pontos de risco
-                    risk_points.append({
-                        'lat': lat,
-                        'lon': lon,
-                        'risk_index': result['fire_risk']['index'],
-                        'risk_category': result['fire_risk']['category'],
-                        'color': result['fire_risk']['color']
-                    })
-                    
-                    # Adicionar à lista de dados para mapa de calor
-                    heat_map_data.append([lat, lon, result['fire_risk']['index']])
-                except Exception as e:
-                    print(f"Erro ao processar ponto ({lat}, {lon}): {e}")
-                    # Continuar com o próximo ponto
+        center_lat = (bounds['north'] + bounds['south']) / 2
+        center_lon = (bounds['east'] + bounds['west']) / 2
+        
+        # Calcular o risco de todos os pontos numa só passagem vetorizada
+        batch = WeatherBatch(coordinates, observations)
+        risk_index, category_codes, colors = batch.calculate_risk()
+        
+        for i in np.flatnonzero(batch.valid):
+            lat, lon = coordinates[i]
+            index = float(risk_index[i])
+            
+            # Adicionar à lista de pontos de risco
+            risk_points.append({
+                'lat': lat,
+                'lon': lon,
+                'risk_index': index,
+                'risk_category': FireRiskCalculator.RISK_CATEGORIES[category_codes[i]],
+                'color': str(colors[i])
+            })
+            
+            # Adicionar à lista de dados para mapa de calor
+            heat_map_data.append([lat, lon, index])
         
         # Calcular risco médio para a região
         if risk_points:
@@ -149,21 +1122,6 @@ class FireRiskController:
             risk_color = '#CCCCCC'
             risk_description = 'Não foi possível calcular o risco para esta região.'
         
-        # Criar mapas
-        risk_map = self.maps_service.create_risk_map(
-            risk_points, 
-            center_lat=center_lat, 
-            center_lon=center_lon, 
-            zoom_start=8
-        )
-        
-        heat_map = self.maps_service.create_heat_map(
-            heat_map_data,
-            center_lat=center_lat,
-            center_lon=center_lon,
-            zoom_start=8
-        )
-        
         # Preparar resposta
         result = {
             'region': {
@@ -179,12 +1137,19 @@ class FireRiskController:
                 'color': risk_color,
                 'description': risk_description,
                 'points': risk_points
-            },
-            'maps': {
-                'risk_map_html': self.maps_service.generate_map_html(risk_map),
-                'heat_map_html': self.maps_service.generate_map_html(heat_map)
             }
         }
+        if sampling is not None:
+            result['sampling'] = sampling
+        
+        # Guardar os dados dos mapas para renderização posterior
+        result['result_id'] = self.result_store.put('region', result, {
+            'center_lat': center_lat,
+            'center_lon': center_lon,
+            'zoom_start': 8,
+            'risk': risk_points,
+            'heat': heat_map_data
+        })
         
         return result
     
@@ -208,33 +1173,136 @@ class FireRiskController:
             # Obter dados meteorológicos para todos os nós
             self.graph_service.populate_graph_with_weather_data()
             
-            # Obter dados comparativos
-            comparison_data = self.graph_service.get_regional_comparison_data()
-            
-            # Gerar visualização do grafo
-            graph_image_base64 = self.graph_service.generate_graph_visualization()
+            return self._build_regional_result(lat, lon)
+        except Exception as e:
+            print(f"Erro ao calcular risco regional: {e}")
+            raise
+    
+    async def calculate_regional_fire_risk_async(self, lat, lon, radius=0.5, num_points=8):
+        """
+        Versão assíncrona de calculate_regional_fire_risk.
+        
+        Args:
+            lat (float): Latitude da localização central
+            lon (float): Longitude da localização central
+            radius (float): Raio em graus para os pontos vizinhos
+            num_points (int): Número de pontos vizinhos a serem criados
             
-            # Obter dados para mapa de calor
-            heatmap_data = self.graph_service.get_heatmap_data()
+        Returns:
+            dict: Dados de risco de incêndio para a região e comparações
+        """
+        try:
+            # Criar grafo regional
+            self.graph_service.create_regional_graph(lat, lon, radius, num_points)
             
-            # Criar mapa de calor
-            heat_map = self.maps_service.create_heat_map(
-                heatmap_data,
-                center_lat=lat,
-                center_lon=lon,
-                zoom_start=9
+            # Obter dados meteorológicos para todos os nós em simultâneo
+            await self.weather_loop.run(
+                self.graph_service.populate_graph_with_weather_data_async(self.async_weather_service)
             )
             
-            # Preparar resposta
-            result = {
-                'center': comparison_data['center'],
-                'neighbors': comparison_data['neighbors'],
-                'comparison': comparison_data['comparison'],
-                'graph_image': graph_image_base64,
-                'heatmap_html': self.maps_service.generate_map_html(heat_map)
-            }
-            
-            return result
+            return self._build_regional_result(lat, lon)
         except Exception as e:
             print(f"Erro ao calcular risco regional: {e}")
             raise
+    
+    async def get_weather_by_city_async(self, city_name, country_code=None):
+        """
+        Obtém os dados meteorológicos de uma cidade pelo cliente assíncrono partilhado.
+        
+        Args:
+            city_name (str): Nome da cidade
+            country_code (str, optional): Código do país
+            
+        Returns:
+            WeatherData: Dados meteorológicos da cidade
+        """
+        return await self.weather_loop.run(
+            self.async_weather_service.get_weather_by_city(city_name, country_code)
+        )
+    
+    def _build_regional_result(self, lat, lon):
+        """
+        Prepara a resposta da análise regional a partir do grafo já populado.
+        
+        Args:
+            lat (float): Latitude da localização central
+            lon (float): Longitude da localização central
+            
+        Returns:
+            dict: Dados de risco de incêndio para a região e comparações
+        """
+        # Obter dados comparativos
+        comparison_data = self.graph_service.get_regional_comparison_data()
+        
+        # Gerar visualização do grafo
+        graph_image_base64 = self.graph_service.generate_graph_visualization()
+        
+        # Obter dados para mapa de calor
+        heatmap_data = self.graph_service.get_heatmap_data()
+        
+        # Preparar resposta
+        result = {
+            'center': comparison_data['center'],
+            'neighbors': comparison_data['neighbors'],
+            'comparison': comparison_data['comparison'],
+            'graph_image': graph_image_base64
+        }
+        
+        # Guardar os dados do mapa de calor para renderização posterior
+        result['result_id'] = self.result_store.put('regional', result, {
+            'center_lat': lat,
+            'center_lon': lon,
+            'zoom_start': 9,
+            'heat': heatmap_data
+        })
+        
+        return result
+    
+    def render_result_maps(self, result_id, kinds=None):
+        """
+        Renderiza os mapas de um resultado guardado.
+        
+        Args:
+            result_id (str): Identificador devolvido em result_id
+            kinds (list, optional): Mapas a renderizar ('risk', 'heat'). Padrão: todos os disponíveis.
+            
+        Returns:
+            dict: HTML de cada mapa por tipo, ou None se o resultado não existir ou tiver expirado
+        """
+        stored = self.result_store.get(result_id)
+        if stored is None:
+            return None
+        
+        map_data = stored.map_data
+        return {
+            kind: self.maps_service.render_map_html(
+                kind,
+                map_data[kind],
+                center_lat=map_data['center_lat'],
+                center_lon=map_data['center_lon'],
+                zoom_start=map_data['zoom_start']
+            )
+            for kind in ('risk', 'heat')
+            if kind in map_data and (kinds is None or kind in kinds)
+        }
+    
+    def attach_maps(self, result):
+        """
+        Acrescenta a um resultado o HTML dos seus mapas, nos campos usados antes de os mapas serem opcionais.
+        
+        Args:
+            result (dict): Resultado de uma análise de região ou regional, com result_id
+            
+        Returns:
+            dict: Cópia do resultado com 'maps' (região) ou 'heatmap_html' (regional)
+        """
+        maps = self.render_result_maps(result['result_id']) or {}
+        result = dict(result)
+        if 'region' in result:
+            result['maps'] = {
+                'risk_map_html': maps.get('risk'),
+                'heat_map_html': maps.get('heat')
+            }
+        else:
+            result['heatmap_html'] = maps.get('heat')
+        return result
@@ -7,7 +7,9 @@ import matplotlib.pyplot as plt
 import matplotlib
 import io
 import base64
+import asyncio
 from src.models.fire_risk import FireRiskCalculator
+from src.models.rate_limiter import TokenBucketRateLimiter
 
 class GraphService:
     """
@@ -118,44 +120,93 @@ class GraphService:
                 
                 try:
                     # Obter dados meteorológicos
-                    weather_data = self.weather_service.get_weather_by_location(lat, lon)
-                    node_data['weather_data'] = weather_data
-                    
-                    # Calcular risco de incêndio
-                    risk_index, risk_category = FireRiskCalculator.calculate_risk(
-                        weather_data.temperature,
-                        weather_data.humidity,
-                        weather_data.wind_speed,
-                        weather_data.precipitation
+                    weather_data = self.weather_service.get_weather_by_location(
+                        lat, lon, priority=TokenBucketRateLimiter.PRIORITY_BULK
                     )
-                    
-                    # Obter cor e descrição do risco
-                    risk_color = FireRiskCalculator.get_risk_color(risk_index)
-                    risk_description = FireRiskCalculator.get_risk_description(risk_category)
-                    
-                    # Armazenar dados de risco
-                    node_data['fire_risk'] = {
-                        'index': risk_index,
-                        'category': risk_category,
-                        'color': risk_color,
-                        'description': risk_description
-                    }
+                    self._apply_weather_to_node(node_data, weather_data)
                 except Exception as e:
                     print(f"Erro ao obter dados para o nó {node_id}: {e}")
-                    # Definir valores padrão em caso de erro
-                    node_data['weather_data'] = None
-                    node_data['fire_risk'] = {
-                        'index': 0,
-                        'category': 'desconhecido',
-                        'color': '#CCCCCC',
-                        'description': 'Não foi possível calcular o risco para este ponto.'
-                    }
+                    self._apply_weather_to_node(node_data, None)
             
             return True
         except Exception as e:
             print(f"Erro ao popular grafo com dados meteorológicos: {e}")
             return False
     
+    async def populate_graph_with_weather_data_async(self, weather_service):
+        """
+        Versão assíncrona de populate_graph_with_weather_data, que pede os dados
+        de todos os nós em simultâneo.
+        
+        Args:
+            weather_service (AsyncOpenWeatherService): Cliente assíncrono já aberto
+        """
+        if not self.graph:
+            print("Grafo não inicializado")
+            return False
+        
+        try:
+            node_ids = list(self.graph.nodes)
+            results = await asyncio.gather(
+                *(weather_service.get_weather_by_location(self.graph.nodes[node_id]['lat'],
+                                                          self.graph.nodes[node_id]['lon'],
+                                                          priority=TokenBucketRateLimiter.PRIORITY_BULK)
+                  for node_id in node_ids),
+                return_exceptions=True
+            )
+            
+            for node_id, weather_data in zip(node_ids, results):
+                if isinstance(weather_data, Exception):
+                    print(f"Erro ao obter dados para o nó {node_id}: {weather_data}")
+                    weather_data = None
+                self._apply_weather_to_node(self.graph.nodes[node_id], weather_data)
+            
+            return True
+        except Exception as e:
+            print(f"Erro ao popular grafo com dados meteorológicos: {e}")
+            return False
+    
+    def _apply_weather_to_node(self, node_data, weather_data):
+        """
+        Armazena os dados meteorológicos num nó e calcula o seu risco de incêndio.
+        
+        Args:
+            node_data (dict): Atributos do nó
+            weather_data (WeatherData): Dados meteorológicos do nó, ou None se indisponíveis
+        """
+        if weather_data is None:
+            # Definir valores padrão em caso de erro
+            node_data['weather_data'] = None
+            node_data['fire_risk'] = {
+                'index': 0,
+                'category': 'desconhecido',
+                'color': '#CCCCCC',
+                'description': 'Não foi possível calcular o risco para este ponto.'
+            }
+            return
+        
+        node_data['weather_data'] = weather_data
+        
+        # Calcular risco de incêndio
+        risk_index, risk_category = FireRiskCalculator.calculate_risk(
+            weather_data.temperature,
+            weather_data.humidity,
+            weather_data.wind_speed,
+            weather_data.precipitation
+        )
+        
+        # Obter cor e descrição do risco
+        risk_color = FireRiskCalculator.get_risk_color(risk_index)
+        risk_description = FireRiskCalculator.get_risk_description(risk_category)
+        
+        # Armazenar dados de risco
+        node_data['fire_risk'] = {
+            'index': risk_index,
+            'category': risk_category,
+            'color': risk_color,
+            'description': risk_description
+        }
+    
     def get_regional_comparison_data(self):
         """
         Obtém dados comparativos entre o nó central e os nós vizinhos.
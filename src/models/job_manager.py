@@ -0,0 +1,258 @@
+"""
+Gestor de tarefas em segundo plano para análises demoradas.
+"""
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+class JobQueueFull(Exception):
+    """
+    Lançada quando a fila de tarefas atingiu o limite.
+    """
+    
+    def __init__(self, pending, retry_after=30):
+        self.pending = pending
+        self.retry_after = retry_after
+        super().__init__(f"Fila de tarefas cheia ({pending} tarefas pendentes); tente novamente mais tarde")
+
+class Job:
+    """
+    Tarefa executada em segundo plano, com progresso e eventos consultáveis.
+    
+    A função da tarefa publica eventos com publish; os clientes podem ler o estado
+    a qualquer momento ou aguardar novos eventos com wait_events.
+    """
+    
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    
+    def __init__(self, key):
+        """
+        Inicializa a tarefa.
+        
+        Args:
+            key (hashable): Chave usada para agrupar pedidos idênticos
+        """
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.status = self.QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.total = None
+        self.completed = 0
+        self.result = None
+        self.error = None
+        self.events = []
+        self._cond = threading.Condition()
+    
+    @property
+    def finished(self):
+        return self.status in (self.DONE, self.FAILED)
+    
+    def publish(self, event, progress=False):
+        """
+        Acrescenta um evento e acorda os clientes que aguardam.
+        
+        Args:
+            event (dict): Evento a publicar
+            progress (bool): Contar o evento como uma unidade de trabalho concluída
+        """
+        with self._cond:
+            self.events.append(event)
+            if progress:
+                self.completed += 1
+            self._cond.notify_all()
+    
+    def mark_running(self):
+        """Regista o início da execução."""
+        with self._cond:
+            self.status = self.RUNNING
+            self.started_at = time.time()
+            self._cond.notify_all()
+    
+    def finish(self, result=None, error=None):
+        """
+        Regista o fim da execução, com o resultado ou a mensagem de erro.
+        """
+        with self._cond:
+            self.status = self.FAILED if error is not None else self.DONE
+            self.finished_at = time.time()
+            self.result = result
+            self.error = error
+            self._cond.notify_all()
+    
+    def wait_events(self, start=0, timeout=None):
+        """
+        Aguarda eventos posteriores a uma posição.
+        
+        Args:
+            start (int): Número de eventos já lidos
+            timeout (float, optional): Espera máxima em segundos
+        
+        Returns:
+            tuple: (novos eventos, tarefa terminada)
+        """
+        with self._cond:
+            if len(self.events) <= start and not self.finished:
+                self._cond.wait(timeout)
+            return self.events[start:], self.finished
+    
+    def to_dict(self, include_result=True):
+        """
+        Descreve o estado da tarefa.
+        
+        Args:
+            include_result (bool): Incluir o resultado, se a tarefa terminou
+        
+        Returns:
+            dict: Estado, instantes, progresso e resultado ou erro
+        """
+        with self._cond:
+            data = {
+                "id": self.id,
+                "status": self.status,
+                "created_at": self.created_at,
+                "started_at": self.started_at,
+                "finished_at": self.finished_at,
+                "progress": {"completed": self.completed, "total": self.total}
+            }
+            if self.status == self.DONE and include_result:
+                data["result"] = self.result
+            if self.status == self.FAILED:
+                data["error"] = self.error
+            return data
+
+class JobManager:
+    """
+    Executa tarefas num pool limitado de threads e guarda os resultados durante result_ttl.
+    
+    Pedidos com a mesma chave feitos enquanto uma tarefa está na fila ou em execução
+    são associados a essa tarefa em vez de criarem uma nova.
+    """
+    
+    def __init__(self, max_workers=2, result_ttl=600, max_pending=20):
+        """
+        Inicializa o gestor.
+        
+        Args:
+            max_workers (int): Tarefas executadas em simultâneo
+            result_ttl (float): Tempo, em segundos, durante o qual uma tarefa terminada é mantida
+            max_pending (int): Número máximo de tarefas na fila ou em execução
+        """
+        self.max_workers = max_workers
+        self.result_ttl = result_ttl
+        self.max_pending = max_pending
+        
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="job")
+        self._jobs = {}  # {id: Job}
+        self._active = {}  # {chave: Job} das tarefas na fila ou em execução
+        self._lock = threading.Lock()
+        
+        self.submitted = 0
+        self.deduplicated = 0
+        self.failed = 0
+        self.expired = 0
+    
+    def submit(self, key, fn, *args, **kwargs):
+        """
+        Submete uma tarefa, ou associa o pedido a uma tarefa idêntica ainda em curso.
+        
+        Args:
+            key (hashable): Chave que identifica pedidos idênticos
+            fn (callable): Função executada como fn(job, *args, **kwargs); o valor devolvido
+                           fica como resultado da tarefa
+        
+        Returns:
+            tuple: (Job, True se a tarefa foi criada ou False se já existia)
+        
+        Raises:
+            JobQueueFull: Se o número de tarefas pendentes atingiu o limite
+        """
+        with self._lock:
+            self._prune()
+            
+            job = self._active.get(key)
+            if job is not None:
+                self.deduplicated += 1
+                return job, False
+            
+            if len(self._active) >= self.max_pending:
+                raise JobQueueFull(len(self._active))
+            
+            job = Job(key)
+            self._jobs[job.id] = job
+            self._active[key] = job
+            self.submitted += 1
+        
+        self._executor.submit(self._run, job, fn, args, kwargs)
+        return job, True
+    
+    def _run(self, job, fn, args, kwargs):
+        job.mark_running()
+        try:
+            result = fn(job, *args, **kwargs)
+        except Exception as e:
+            print(f"Erro na tarefa {job.id}: {e}")
+            with self._lock:
+                self.failed += 1
+                self._active.pop(job.key, None)
+            job.publish({"type": "error", "error": str(e)})
+            job.finish(error=str(e))
+            return
+        
+        with self._lock:
+            self._active.pop(job.key, None)
+        job.finish(result=result)
+    
+    def _prune(self):
+        """
+        Remove as tarefas terminadas há mais de result_ttl. Deve ser chamado com o lock.
+        """
+        cutoff = time.time() - self.result_ttl
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.finished and job.finished_at < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+        self.expired += len(expired)
+    
+    def get(self, job_id):
+        """
+        Obtém uma tarefa pelo identificador.
+        
+        Returns:
+            Job: Tarefa, ou None se não existir ou já tiver expirado
+        """
+        with self._lock:
+            self._prune()
+            return self._jobs.get(job_id)
+    
+    def shutdown(self):
+        """
+        Termina o pool de threads sem esperar pelas tarefas em curso.
+        """
+        self._executor.shutdown(wait=False, cancel_futures=True)
+    
+    def get_stats(self):
+        """
+        Obtém estatísticas do gestor.
+        
+        Returns:
+            dict: Tarefas guardadas, pendentes, submetidas, agrupadas, falhadas e expiradas
+        """
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "result_ttl": self.result_ttl,
+                "jobs": len(self._jobs),
+                "pending": len(self._active),
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "failed": self.failed,
+                "expired": self.expired
+            }
@@ -3,6 +3,9 @@ Serviço para interação com a Google Maps API.
 """
 import os
 import json
+import hashlib
+import threading
+from collections import OrderedDict
 import folium
 from folium.plugins import HeatMap
 
@@ -20,6 +23,13 @@ class MapsService:
                                     tenta obter da variável de ambiente GOOGLE_MAPS_API_KEY.
         """
         self.api_key = api_key or os.environ.get("GOOGLE_MAPS_API_KEY", "demo_key")
+        
+        # HTML já renderizado, indexado pelo hash dos dados do mapa
+        self._html_cache = OrderedDict()
+        self._html_cache_size = int(os.environ.get("MAP_HTML_CACHE_SIZE", 64))
+        self._html_lock = threading.Lock()
+        self.html_hits = 0
+        self.html_renders = 0
     
     def create_base_map(self, center_lat=0, center_lon=0, zoom_start=2):
         """
@@ -115,3 +125,62 @@ class MapsService:
             str: HTML do mapa
         """
         return map_obj._repr_html_()
+    
+    def render_map_html(self, kind, points, center_lat=0, center_lon=0, zoom_start=2):
+        """
+        Gera o HTML de um mapa de risco ou de calor, reutilizando o de dados idênticos.
+        
+        Args:
+            kind (str): 'risk' (marcadores, ver create_risk_map) ou 'heat' (ver create_heat_map)
+            points (list): Pontos do mapa, no formato esperado pelo tipo escolhido
+            center_lat (float): Latitude central do mapa
+            center_lon (float): Longitude central do mapa
+            zoom_start (int): Nível de zoom inicial
+            
+        Returns:
+            str: HTML do mapa
+            
+        Raises:
+            ValueError: Se o tipo de mapa for desconhecido
+        """
+        if kind not in ('risk', 'heat'):
+            raise ValueError(f"Tipo de mapa desconhecido: {kind}")
+        
+        key = hashlib.sha1(json.dumps(
+            [kind, points, center_lat, center_lon, zoom_start],
+            sort_keys=True, separators=(",", ":"), default=float
+        ).encode("utf-8")).hexdigest()
+        
+        with self._html_lock:
+            html = self._html_cache.get(key)
+            if html is not None:
+                self._html_cache.move_to_end(key)
+                self.html_hits += 1
+                return html
+        
+        if kind == 'risk':
+            map_obj = self.create_risk_map(points, center_lat, center_lon, zoom_start)
+        else:
+            map_obj = self.create_heat_map(points, center_lat, center_lon, zoom_start)
+        html = self.generate_map_html(map_obj)
+        
+        with self._html_lock:
+            self.html_renders += 1
+            self._html_cache[key] = html
+            while len(self._html_cache) > self._html_cache_size:
+                self._html_cache.popitem(last=False)
+        return html
+    
+    def get_stats(self):
+        """
+        Obtém estatísticas do cache de HTML dos mapas.
+        
+        Returns:
+            dict: Mapas em cache, reutilizações e renderizações
+        """
+        with self._html_lock:
+            return {
+                'html_cached': len(self._html_cache),
+                'html_hits': self.html_hits,
+                'html_renders': self.html_renders
+            }
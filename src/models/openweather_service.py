@@ -2,8 +2,16 @@
 Serviço para interação com a API OpenWeather.
 """
 import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import requests
 from src.models.weather_data import WeatherData
+from src.models.weather_backends import HttpWeatherBackend, ReplayMissError
+from src.models.weather_cache import WeatherCache, quantize_coordinates
+from src.models.single_flight import SingleFlight, SingleFlightTimeout
+from src.models.rate_limiter import TokenBucketRateLimiter, RateLimitExceeded
+from src.models.circuit_breaker import CircuitOpenError
 
 class OpenWeatherService:
     """
@@ -13,17 +21,345 @@ class OpenWeatherService:
     # URL base da API
     BASE_URL = "https://api.openweathermap.org/data/2.5"
     
-    def __init__(self, api_key=None):
+    # Códigos HTTP que justificam uma nova tentativa
+    RETRY_STATUS_CODES = HttpWeatherBackend.RETRY_STATUS_CODES
+    
+    # Intervalo de emissão da previsão de 5 dias / 3 horas, em segundos
+    FORECAST_ISSUE_INTERVAL = 3 * 3600
+    
+    def __init__(self, api_key=None, pool_size=10, connect_timeout=3.05, read_timeout=10,
+                 max_retries=3, backoff_factor=0.5, cache=None, base_url=None, single_flight=None,
+                 backend=None, rate_limiter=None, persistent_cache=None, circuit_breaker=None,
+                 keep_raw=False):
         """
         Inicializa o serviço OpenWeather.
         
         Args:
             api_key (str, optional): Chave da API OpenWeather. Se não fornecida,
                                     tenta obter da variável de ambiente OPENWEATHER_API_KEY.
+            pool_size (int): Número máximo de conexões mantidas abertas por host
+            connect_timeout (float): Tempo limite para estabelecer a conexão, em segundos
+            read_timeout (float): Tempo limite para leitura da resposta, em segundos
+            max_retries (int): Número máximo de novas tentativas em erros 429/5xx
+            backoff_factor (float): Fator de espera exponencial entre tentativas
+            cache (WeatherCache, optional): Cache para evitar chamadas repetidas à API
+            base_url (str, optional): URL base alternativa (por exemplo, um servidor local de testes)
+            single_flight (SingleFlight, optional): Coalescência de chamadas idênticas em curso.
+                                    Se não fornecida, é criada uma própria do serviço.
+            backend (WeatherBackend, optional): Transporte das chamadas (gravação, reprodução, ...).
+                                    Se não fornecido, usa HTTP com os parâmetros de pool acima.
+            rate_limiter (TokenBucketRateLimiter, optional): Quota de chamadas à API partilhada
+                                    pelo processo. Se não fornecida, as chamadas não são limitadas.
+            persistent_cache (PersistentWeatherCache, optional): Cache em disco consultado quando
+                                    o cache em memória falha, para sobreviver a reinícios.
+            circuit_breaker (CircuitBreaker, optional): Disjuntor que suspende as chamadas
+                                    enquanto a API estiver a falhar.
+            keep_raw (bool): Manter o JSON original em cada WeatherData (padrão: só os campos usados)
         """
         self.api_key = api_key or os.environ.get("OPENWEATHER_API_KEY", "demo_key")
+        self.base_url = (base_url or self.BASE_URL).rstrip("/")
+        self.cache = cache
+        self.single_flight = single_flight or SingleFlight()
+        self.backend = backend or HttpWeatherBackend(
+            pool_size=pool_size,
+            connect_timeout=connect_timeout,
+            read_timeout=read_timeout,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor
+        )
+        self.rate_limiter = rate_limiter
+        self.persistent_cache = persistent_cache
+        self.circuit_breaker = circuit_breaker
+        self.keep_raw = keep_raw
+        
+        # Contador de chamadas emitidas ao backend (cache e coalescência não contam)
+        self._stats_lock = threading.Lock()
+        self._requests_sent = 0
+        
+        # Atualizações em segundo plano de observações servidas como desatualizadas
+        self._refresh_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="weather-refresh")
+        self._refreshing = set()
+        self._stale_served = 0
+    
+    def _get(self, endpoint, params, priority=TokenBucketRateLimiter.PRIORITY_INTERACTIVE,
+             deadline=None):
+        """
+        Executa um GET na API através do backend configurado, dentro da quota de chamadas.
+        
+        Args:
+            endpoint (str): URL completa do endpoint
+            params (dict): Parâmetros da query string
+            priority (str): Prioridade da chamada na fila da quota (interactive, bulk ou prefetch)
+            deadline (float, optional): Prazo absoluto do pedido em time.monotonic()
+            
+        Returns:
+            dict: Corpo JSON da resposta
+            
+        Raises:
+            requests.exceptions.RequestException: Se a chamada falhar após as novas tentativas
+            RateLimitExceeded: Se a espera pela quota ultrapassaria o prazo do pedido
+            CircuitOpenError: Se as chamadas estiverem suspensas pelo disjuntor
+            ReplayMissError: Se a resposta não existir no arquivo de reprodução
+        """
+        breaker = self.circuit_breaker
+        if breaker is not None:
+            breaker.before_call()
+        
+        if self.rate_limiter is not None:
+            try:
+                self.rate_limiter.acquire(priority, deadline)
+            except BaseException:
+                if breaker is not None:
+                    breaker.release()
+                raise
+        
+        with self._stats_lock:
+            self._requests_sent += 1
+        
+        try:
+            payload = self.backend.fetch(endpoint, params)
+        except requests.exceptions.RequestException as e:
+            if breaker is not None:
+                if self.is_upstream_failure(e):
+                    breaker.record_failure()
+                else:
+                    breaker.record_success()
+            raise
+        except ReplayMissError:
+            # Falta no arquivo de reprodução: a API não foi chamada
+            if breaker is not None:
+                breaker.release()
+            raise
+        except BaseException:
+            # Respostas ilegíveis ou erros do backend também contam como falha,
+            # para o disjuntor nunca ficar preso com uma chamada de teste em curso
+            if breaker is not None:
+                breaker.record_failure()
+            raise
+        
+        if breaker is not None:
+            breaker.record_success()
+        return payload
+    
+    @staticmethod
+    def is_upstream_failure(error):
+        """
+        Indica se um erro revela uma falha da API (e não um pedido inválido).
+        
+        Erros de conexão, tempos limite, 429 e 5xx contam como falha; respostas como
+        401 ou 404 mostram que a API está a responder.
+        
+        Args:
+            error (requests.exceptions.RequestException): Erro da chamada
+            
+        Returns:
+            bool: True se o erro deve contar para o disjuntor
+        """
+        response = getattr(error, "response", None)
+        if isinstance(error, requests.exceptions.HTTPError) and response is not None:
+            return response.status_code in HttpWeatherBackend.RETRY_STATUS_CODES
+        return True
+    
+    @staticmethod
+    def follower_deadline(priority, deadline):
+        """
+        Obtém o prazo até ao qual um pedido coalescido espera pela chamada já em curso.
+        
+        Sem prazo explícito, usa a espera máxima da prioridade na quota.
+        
+        Returns:
+            float: Prazo absoluto em time.monotonic()
+        """
+        if deadline is not None:
+            return deadline
+        return time.monotonic() + TokenBucketRateLimiter.DEFAULT_MAX_WAIT.get(priority, 10)
+    
+    def coalescing_key(self, lat, lon, units="metric", kind="weather"):
+        """
+        Obtém a chave usada para coalescer chamadas para o mesmo ponto.
+        
+        Usa a mesma quantização do cache, para que pedidos que partilhariam uma
+        entrada de cache partilhem também a chamada em curso.
+        
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            units (str): Unidades de medida
+            kind (str): Tipo de dado
+            
+        Returns:
+            tuple: Chave da chamada
+        """
+        if self.cache is not None:
+            return self.cache.make_key(lat, lon, units, kind)
+        return (kind,) + quantize_coordinates(lat, lon) + (units,)
+    
+    def get_connection_stats(self):
+        """
+        Obtém estatísticas de utilização do backend (pool de conexões, reprodução, ...).
+        
+        Returns:
+            dict: Requisições emitidas e estatísticas do backend
+        """
+        with self._stats_lock:
+            requests_sent = self._requests_sent
+        
+        stats = {'requests': requests_sent}
+        stats.update(self.backend.get_connection_stats())
+        return stats
+    
+    def get_stats(self):
+        """
+        Obtém estatísticas do serviço (conexões, caches, coalescência e quota).
+        
+        Returns:
+            dict: Estatísticas agregadas do serviço
+        """
+        return {
+            'connections': self.get_connection_stats(),
+            'cache': self.cache.get_stats() if self.cache is not None else None,
+            'coalescing': self.single_flight.get_stats(),
+            'rate_limit': self.rate_limiter.get_stats() if self.rate_limiter is not None else None,
+            'persistent_cache': self.persistent_cache.get_stats() if self.persistent_cache is not None else None,
+            'circuit_breaker': self.circuit_breaker.get_stats() if self.circuit_breaker is not None else None,
+            'stale_served': self._stale_served
+        }
+    
+    def close(self):
+        """
+        Fecha o backend e todas as suas conexões.
+        """
+        self._refresh_executor.shutdown(wait=False, cancel_futures=True)
+        self.backend.close()
+    
+    def _load_persisted(self, lat, lon, units, kind, max_age):
+        """
+        Obtém do cache persistente uma resposta ainda válida.
+        
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            units (str): Unidades de medida
+            kind (str): Tipo de dado
+            max_age (float): Idade máxima da resposta, em segundos
+            
+        Returns:
+            tuple: (resposta bruta, instante em que foi obtida, segundos de validade restantes) ou None
+        """
+        if self.persistent_cache is None:
+            return None
+        
+        entry = self.persistent_cache.get(lat, lon, units, kind, max_age=max_age)
+        if entry is None:
+            return None
+        
+        payload, fetched_at = entry
+        return payload, fetched_at, max_age - (time.time() - fetched_at)
+    
+    def _persist(self, lat, lon, payload, units, kind):
+        """
+        Guarda uma resposta bruta no cache persistente, se configurado.
+        """
+        if self.persistent_cache is not None:
+            self.persistent_cache.put(lat, lon, payload, units, kind)
+    
+    def get_stale_weather(self, lat, lon, units="metric"):
+        """
+        Obtém a observação expirada de um ponto e agenda a sua atualização (stale-while-revalidate).
+        
+        Args:
+            lat (float): Latitude da localização
+            lon (float): Longitude da localização
+            units (str): Unidades de medida
+        
+        Returns:
+            WeatherData: Observação marcada como desatualizada, ou None se não houver
+        """
+        if self.cache is None:
+            return None
+        
+        stale = self.cache.get_stale(lat, lon, units)
+        if stale is None:
+            return None
+        
+        self.refresh_in_background(lat, lon, units)
+        return self._serve_stale(stale)
+    
+    def last_known_weather(self, lat, lon, units="metric"):
+        """
+        Obtém a última observação conhecida de um ponto, mesmo que expirada.
+        
+        Procura primeiro no cache em memória (dentro da janela stale_ttl) e depois no
+        cache persistente (dentro da sua idade máxima).
+        
+        Returns:
+            WeatherData: Observação marcada como desatualizada, ou None
+        """
+        if self.cache is not None:
+            stale = self.cache.get_stale(lat, lon, units)
+            if stale is not None:
+                return self._serve_stale(stale)
+        
+        if self.persistent_cache is not None:
+            entry = self.persistent_cache.get(lat, lon, units)
+            if entry is not None:
+                payload, fetched_at = entry
+                return self._serve_stale(WeatherData(payload, fetched_at, keep_raw=self.keep_raw))
+        
+        return None
+    
+    def _serve_stale(self, weather_data):
+        """
+        Marca uma observação como desatualizada e contabiliza-a.
+        """
+        with self._stats_lock:
+            self._stale_served += 1
+        return weather_data.as_stale()
     
-    def get_weather_by_location(self, lat, lon, units="metric"):
+    def refresh_in_background(self, lat, lon, units="metric"):
+        """
+        Agenda a atualização de um ponto em segundo plano, uma vez por ponto de cada vez.
+        
+        Args:
+            lat (float): Latitude da localização
+            lon (float): Longitude da localização
+            units (str): Unidades de medida
+        """
+        key = self.coalescing_key(lat, lon, units)
+        with self._stats_lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+        
+        def refresh():
+            try:
+                self.get_weather_by_location(
+                    lat, lon, units,
+                    priority=TokenBucketRateLimiter.PRIORITY_PREFETCH,
+                    refresh=True
+                )
+            except Exception as e:
+                print(f"Erro ao atualizar em segundo plano ({lat}, {lon}): {e}")
+            finally:
+                with self._stats_lock:
+                    self._refreshing.discard(key)
+        
+        try:
+            self._refresh_executor.submit(refresh)
+        except RuntimeError:
+            # Serviço já fechado
+            with self._stats_lock:
+                self._refreshing.discard(key)
+    
+    def _weather_ttl(self):
+        """
+        Obtém o tempo de vida das observações atuais, em segundos.
+        """
+        return self.cache.ttl if self.cache is not None else WeatherCache.DEFAULT_TTL
+    
+    def get_weather_by_location(self, lat, lon, units="metric",
+                                priority=TokenBucketRateLimiter.PRIORITY_INTERACTIVE, deadline=None,
+                                refresh=False):
         """
         Obtém dados meteorológicos atuais para uma localização específica.
         
@@ -31,14 +367,71 @@ class OpenWeatherService:
             lat (float): Latitude da localização
             lon (float): Longitude da localização
             units (str, optional): Unidades de medida (metric, imperial, standard)
+            priority (str, optional): Prioridade na fila da quota (interactive, bulk ou prefetch)
+            deadline (float, optional): Prazo absoluto do pedido em time.monotonic()
+            refresh (bool, optional): Ignorar os caches e obter uma observação nova da API
             
         Returns:
             WeatherData: Objeto com os dados meteorológicos processados
             
         Raises:
-            Exception: Se ocorrer um erro na chamada à API
+            Exception: Se ocorrer um erro na chamada à API e não houver observação anterior
+            RateLimitExceeded: Se a espera pela quota ultrapassaria o prazo do pedido
+        """
+        # Verificar se já existe uma observação recente para este ponto
+        if self.cache is not None and not refresh:
+            cached = self.cache.get(lat, lon, units)
+            if cached is not None:
+                return cached
+            
+            # Servir já a última observação expirada e atualizá-la em segundo plano
+            stale = self.get_stale_weather(lat, lon, units)
+            if stale is not None:
+                return stale
+        
+        # Pedidos simultâneos para o mesmo ponto partilham uma única chamada
+        try:
+            return self.single_flight.do(
+                self.coalescing_key(lat, lon, units),
+                lambda: self._fetch_weather_by_location(lat, lon, units, priority, deadline, refresh),
+                self.follower_deadline(priority, deadline)
+            )
+        except SingleFlightTimeout as e:
+            # A chamada partilhada excedeu o prazo deste pedido: tratar como um tempo limite próprio
+            print(f"Erro ao obter dados meteorológicos: {e}")
+            if not refresh:
+                last_known = self.last_known_weather(lat, lon, units)
+                if last_known is not None:
+                    return last_known
+            raise requests.exceptions.Timeout(str(e)) from e
+    
+    def _fetch_weather_by_location(self, lat, lon, units, priority, deadline, refresh=False):
+        """
+        Obtém os dados meteorológicos de uma localização (do disco ou da API) e guarda-os no cache.
+        
+        Args:
+            lat (float): Latitude da localização
+            lon (float): Longitude da localização
+            units (str): Unidades de medida
+            priority (str): Prioridade na fila da quota
+            deadline (float): Prazo absoluto do pedido, ou None
+            refresh (bool): Ignorar o cache persistente e não recorrer a observações antigas
+            
+        Returns:
+            WeatherData: Objeto com os dados meteorológicos processados
         """
-        endpoint = f"{self.BASE_URL}/weather"
+        # Reaproveitar uma observação recente guardada em disco (por exemplo, após um reinício)
+        persisted = None
+        if not refresh:
+            persisted = self._load_persisted(lat, lon, units, "weather", self._weather_ttl())
+        if persisted is not None:
+            payload, fetched_at, remaining = persisted
+            weather_data = WeatherData(payload, fetched_at, keep_raw=self.keep_raw)
+            if self.cache is not None:
+                self.cache.put(lat, lon, weather_data, units, ttl=remaining)
+            return weather_data
+        
+        endpoint = f"{self.base_url}/weather"
         params = {
             "lat": lat,
             "lon": lon,
@@ -47,15 +440,25 @@ class OpenWeatherService:
         }
         
         try:
-            response = requests.get(endpoint, params=params)
-            response.raise_for_status()  # Lança exceção para códigos de erro HTTP
-            return WeatherData(response.json())
-        except requests.exceptions.RequestException as e:
-            # Registrar o erro e relançar
+            payload = self._get(endpoint, params, priority, deadline)
+        except (requests.exceptions.RequestException, RateLimitExceeded, CircuitOpenError) as e:
+            # Registrar o erro e, se possível, servir a última observação conhecida
             print(f"Erro ao obter dados meteorológicos: {e}")
+            if not refresh:
+                last_known = self.last_known_weather(lat, lon, units)
+                if last_known is not None:
+                    return last_known
             raise
+        
+        weather_data = WeatherData(payload, keep_raw=self.keep_raw)
+        self._persist(lat, lon, payload, units, "weather")
+        if self.cache is not None:
+            self.cache.put(lat, lon, weather_data, units)
+        
+        return weather_data
     
-    def get_forecast_by_location(self, lat, lon, units="metric"):
+    def get_forecast_by_location(self, lat, lon, units="metric",
+                                 priority=TokenBucketRateLimiter.PRIORITY_INTERACTIVE, deadline=None):
         """
         Obtém previsão meteorológica para os próximos dias para uma localização específica.
         
@@ -63,14 +466,57 @@ class OpenWeatherService:
             lat (float): Latitude da localização
             lon (float): Longitude da localização
             units (str, optional): Unidades de medida (metric, imperial, standard)
+            priority (str, optional): Prioridade na fila da quota (interactive, bulk ou prefetch)
+            deadline (float, optional): Prazo absoluto do pedido em time.monotonic()
             
         Returns:
             dict: Dados brutos da previsão meteorológica
             
         Raises:
             Exception: Se ocorrer um erro na chamada à API
+            RateLimitExceeded: Se a espera pela quota ultrapassaria o prazo do pedido
+        """
+        # A previsão só muda na próxima emissão, por isso fica em cache até lá
+        if self.cache is not None:
+            cached = self.cache.get(lat, lon, units, kind="forecast")
+            if cached is not None:
+                return cached
+        
+        try:
+            return self.single_flight.do(
+                self.coalescing_key(lat, lon, units, kind="forecast"),
+                lambda: self._fetch_forecast_by_location(lat, lon, units, priority, deadline),
+                self.follower_deadline(priority, deadline)
+            )
+        except SingleFlightTimeout as e:
+            print(f"Erro ao obter previsão meteorológica: {e}")
+            raise requests.exceptions.Timeout(str(e)) from e
+    
+    def _fetch_forecast_by_location(self, lat, lon, units, priority, deadline):
         """
-        endpoint = f"{self.BASE_URL}/forecast"
+        Obtém a previsão de uma localização (do disco ou da API) e guarda-a no cache até à próxima emissão.
+        
+        Args:
+            lat (float): Latitude da localização
+            lon (float): Longitude da localização
+            units (str): Unidades de medida
+            priority (str): Prioridade na fila da quota
+            deadline (float): Prazo absoluto do pedido, ou None
+            
+        Returns:
+            dict: Dados brutos da previsão meteorológica
+        """
+        # Uma previsão guardada em disco continua válida se foi obtida após a última emissão
+        until_next = self.seconds_until_next_forecast()
+        persisted = self._load_persisted(lat, lon, units, "forecast",
+                                         self.FORECAST_ISSUE_INTERVAL - until_next)
+        if persisted is not None:
+            forecast = persisted[0]
+            if self.cache is not None:
+                self.cache.put(lat, lon, forecast, units, kind="forecast", ttl=until_next)
+            return forecast
+        
+        endpoint = f"{self.base_url}/forecast"
         params = {
             "lat": lat,
             "lon": lon,
@@ -79,14 +525,34 @@ class OpenWeatherService:
         }
         
         try:
-            response = requests.get(endpoint, params=params)
-            response.raise_for_status()
-            return response.json()
+            forecast = self._get(endpoint, params, priority, deadline)
         except requests.exceptions.RequestException as e:
             print(f"Erro ao obter previsão meteorológica: {e}")
             raise
+        
+        self._persist(lat, lon, forecast, units, "forecast")
+        if self.cache is not None:
+            self.cache.put(lat, lon, forecast, units, kind="forecast",
+                           ttl=self.seconds_until_next_forecast())
+        
+        return forecast
+    
+    def seconds_until_next_forecast(self, now=None):
+        """
+        Calcula o tempo até à próxima emissão da previsão.
+        
+        Args:
+            now (float, optional): Instante de referência (epoch). Padrão: agora.
+            
+        Returns:
+            float: Segundos até à próxima emissão
+        """
+        now = time.time() if now is None else now
+        interval = self.FORECAST_ISSUE_INTERVAL
+        return (now // interval + 1) * interval - now
     
-    def get_weather_by_city(self, city_name, country_code=None, units="metric"):
+    def get_weather_by_city(self, city_name, country_code=None, units="metric",
+                            priority=TokenBucketRateLimiter.PRIORITY_INTERACTIVE, deadline=None):
         """
         Obtém dados meteorológicos atuais para uma cidade.
         
@@ -94,14 +560,17 @@ class OpenWeatherService:
             city_name (str): Nome da cidade
             country_code (str, optional): Código do país (ISO 3166)
             units (str, optional): Unidades de medida (metric, imperial, standard)
+            priority (str, optional): Prioridade na fila da quota (interactive, bulk ou prefetch)
+            deadline (float, optional): Prazo absoluto do pedido em time.monotonic()
             
         Returns:
             WeatherData: Objeto com os dados meteorológicos processados
             
         Raises:
             Exception: Se ocorrer um erro na chamada à API
+            RateLimitExceeded: Se a espera pela quota ultrapassaria o prazo do pedido
         """
-        endpoint = f"{self.BASE_URL}/weather"
+        endpoint = f"{self.base_url}/weather"
         location = f"{city_name}"
         if country_code:
             location = f"{city_name},{country_code}"
@@ -113,9 +582,7 @@ class OpenWeatherService:
         }
         
         try:
-            response = requests.get(endpoint, params=params)
-            response.raise_for_status()
-            return WeatherData(response.json())
+            return WeatherData(self._get(endpoint, params, priority, deadline), keep_raw=self.keep_raw)
         except requests.exceptions.RequestException as e:
             print(f"Erro ao obter dados meteorológicos para {location}: {e}")
             raise
@@ -0,0 +1,214 @@
+"""
+Cache persistente em disco (SQLite) para respostas da API OpenWeather.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from src.models.weather_cache import quantize_coordinates
+
+class PersistentWeatherCache:
+    """
+    Armazena as respostas brutas da OpenWeather com o instante em que foram obtidas.
+    
+    Sobrevive a reinícios e é partilhado entre processos: a base de dados usa o modo
+    WAL, que permite leituras simultâneas com uma escrita. Cada thread usa a sua
+    própria conexão, aberta apenas na primeira utilização. Entradas mais antigas
+    do que max_age são removidas periodicamente.
+    """
+    
+    # Intervalo mínimo entre limpezas de entradas antigas, em segundos
+    PRUNE_INTERVAL = 300
+    
+    def __init__(self, path, resolution=0.01, max_age=86400):
+        """
+        Inicializa o cache persistente.
+        
+        Args:
+            path (str): Caminho do ficheiro SQLite
+            resolution (float): Resolução da quantização das coordenadas em graus
+            max_age (float): Idade máxima, em segundos, das entradas mantidas em disco
+        """
+        self.path = path
+        self.resolution = resolution
+        self.max_age = max_age
+        
+        self._local = threading.local()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._stats_lock = threading.Lock()
+        self._last_prune = 0.0
+        
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.pruned = 0
+    
+    def _connection(self):
+        """
+        Obtém a conexão da thread atual, criando a base de dados se necessário.
+        
+        Returns:
+            sqlite3.Connection: Conexão da thread
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            return conn
+        
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+        conn.execute("PRAGMA busy_timeout = 5000")
+        
+        with self._schema_lock:
+            if not self._schema_ready:
+                conn.execute("PRAGMA journal_mode = WAL")
+                conn.execute("""
+                    CREATE TABLE IF NOT EXISTS observations (
+                        kind TEXT NOT NULL,
+                        qlat INTEGER NOT NULL,
+                        qlon INTEGER NOT NULL,
+                        units TEXT NOT NULL,
+                        payload TEXT NOT NULL,
+                        fetched_at REAL NOT NULL,
+                        PRIMARY KEY (kind, qlat, qlon, units)
+                    )
+                """)
+                conn.execute(
+                    "CREATE INDEX IF NOT EXISTS idx_observations_fetched_at ON observations (fetched_at)"
+                )
+                self._schema_ready = True
+        
+        conn.execute("PRAGMA synchronous = NORMAL")
+        self._local.conn = conn
+        return conn
+    
+    def get(self, lat, lon, units="metric", kind="weather", max_age=None):
+        """
+        Obtém a resposta guardada para uma coordenada.
+        
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            units (str): Unidades de medida
+            kind (str): Tipo de dado (weather, forecast, ...)
+            max_age (float, optional): Idade máxima aceite, em segundos
+        
+        Returns:
+            tuple: (resposta bruta, instante em que foi obtida) ou None se ausente ou antiga
+        """
+        qlat, qlon = quantize_coordinates(lat, lon, self.resolution)
+        max_age = self.max_age if max_age is None else max_age
+        
+        try:
+            row = self._connection().execute(
+                "SELECT payload, fetched_at FROM observations "
+                "WHERE kind = ? AND qlat = ? AND qlon = ? AND units = ? AND fetched_at > ?",
+                (kind, qlat, qlon, units, time.time() - max_age)
+            ).fetchone()
+        except sqlite3.Error as e:
+            print(f"Erro ao ler o cache persistente: {e}")
+            row = None
+        
+        with self._stats_lock:
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        
+        return json.loads(row[0]), row[1]
+    
+    def put(self, lat, lon, payload, units="metric", kind="weather", fetched_at=None):
+        """
+        Guarda a resposta bruta obtida para uma coordenada.
+        
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            payload (dict): Corpo JSON da resposta
+            units (str): Unidades de medida
+            kind (str): Tipo de dado
+            fetched_at (float, optional): Instante em que a resposta foi obtida. Padrão: agora.
+        """
+        qlat, qlon = quantize_coordinates(lat, lon, self.resolution)
+        fetched_at = time.time() if fetched_at is None else fetched_at
+        
+        try:
+            self._connection().execute(
+                "INSERT OR REPLACE INTO observations (kind, qlat, qlon, units, payload, fetched_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (kind, qlat, qlon, units, json.dumps(payload, separators=(",", ":")), fetched_at)
+            )
+        except sqlite3.Error as e:
+            print(f"Erro ao gravar no cache persistente: {e}")
+            return
+        
+        with self._stats_lock:
+            self.writes += 1
+            prune_due = fetched_at - self._last_prune >= self.PRUNE_INTERVAL
+            if prune_due:
+                self._last_prune = fetched_at
+        
+        if prune_due:
+            self.prune()
+    
+    def prune(self, max_age=None):
+        """
+        Remove as entradas mais antigas do que a idade máxima.
+        
+        Args:
+            max_age (float, optional): Idade máxima em segundos. Padrão: a do cache.
+        
+        Returns:
+            int: Número de entradas removidas
+        """
+        max_age = self.max_age if max_age is None else max_age
+        
+        try:
+            cursor = self._connection().execute(
+                "DELETE FROM observations WHERE fetched_at <= ?", (time.time() - max_age,)
+            )
+        except sqlite3.Error as e:
+            print(f"Erro ao limpar o cache persistente: {e}")
+            return 0
+        
+        with self._stats_lock:
+            self.pruned += cursor.rowcount
+        return cursor.rowcount
+    
+    def close(self):
+        """
+        Fecha a conexão da thread atual.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+    
+    def get_stats(self):
+        """
+        Obtém estatísticas de utilização do cache persistente.
+        
+        Returns:
+            dict: Entradas em disco, acertos, falhas, escritas e remoções
+        """
+        try:
+            entries = self._connection().execute("SELECT COUNT(*) FROM observations").fetchone()[0]
+        except sqlite3.Error:
+            entries = None
+        
+        with self._stats_lock:
+            lookups = self.hits + self.misses
+            return {
+                'path': self.path,
+                'entries': entries,
+                'max_age': self.max_age,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'writes': self.writes,
+                'pruned': self.pruned
+            }
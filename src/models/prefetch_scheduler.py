@@ -0,0 +1,296 @@
+"""
+Agendador de atualização antecipada (refresh-ahead) para áreas vigiadas.
+"""
+import itertools
+import threading
+import time
+from src.models.rate_limiter import TokenBucketRateLimiter
+
+# Municípios vigiados por padrão (os da árvore de regiões do despacho de emergências)
+DEFAULT_WATCHED_AREAS = [
+    {"name": "Campinas", "lat": -22.9099, "lon": -47.0626},
+    {"name": "São José dos Campos", "lat": -23.1791, "lon": -45.8872}
+]
+
+class WatchedArea:
+    """
+    Área vigiada: um ponto ou uma grade de pontos dentro de limites geográficos.
+    """
+    
+    def __init__(self, watch_id, name, coordinates, bounds=None, grid_size=None):
+        """
+        Inicializa a área vigiada.
+        
+        Args:
+            watch_id (int): Identificador da área
+            name (str): Nome da área
+            coordinates (list): Lista de tuplas (lat, lon) a manter atualizadas
+            bounds (dict, optional): Limites {north, south, east, west}, para áreas em grade
+            grid_size (int, optional): Tamanho da grade, para áreas em grade
+        """
+        self.id = watch_id
+        self.name = name
+        self.coordinates = coordinates
+        self.bounds = bounds
+        self.grid_size = grid_size
+        
+        self.result = None  # Resultado pré-calculado
+        self.computed_at = None
+    
+    def matches(self, bounds, grid_size):
+        """
+        Verifica se a área corresponde a um pedido de região.
+        """
+        if self.bounds is None or self.grid_size != grid_size:
+            return False
+        return all(
+            round(float(bounds[k]), 4) == round(float(self.bounds[k]), 4)
+            for k in ("north", "south", "east", "west")
+        )
+    
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "name": self.name,
+            "type": "bounds" if self.bounds is not None else "point",
+            "bounds": self.bounds,
+            "grid_size": self.grid_size,
+            "points": len(self.coordinates),
+            "computed_at": self.computed_at
+        }
+
+class PrefetchScheduler:
+    """
+    Mantém atualizados, em segundo plano, os dados meteorológicos das áreas vigiadas.
+    
+    Cada ponto é pedido novamente pouco antes de a sua entrada no cache expirar, com
+    a prioridade mais baixa da quota e com as chamadas espaçadas uniformemente, para
+    que o tráfego dos utilizadores nunca fique à espera da atualização. Para áreas em
+    grade, o resultado da região é recalculado após cada atualização e fica pronto
+    para ser servido diretamente.
+    """
+    
+    def __init__(self, weather_service, refresh_margin=60, calls_per_minute=30,
+                 on_refresh=None, poll_interval=30):
+        """
+        Inicializa o agendador.
+        
+        Args:
+            weather_service (OpenWeatherService): Serviço usado para as atualizações
+            refresh_margin (float): Antecedência, em segundos, em relação à expiração do cache
+            calls_per_minute (float): Parte da quota reservada às atualizações
+            on_refresh (callable, optional): Função que recebe uma WatchedArea em grade e
+                                    devolve o resultado pré-calculado da região
+            poll_interval (float): Espera máxima entre verificações, em segundos
+        """
+        self.weather_service = weather_service
+        self.cache = weather_service.cache
+        self.refresh_margin = refresh_margin
+        self.min_interval = 60.0 / calls_per_minute if calls_per_minute else 0.0
+        self.on_refresh = on_refresh
+        self.poll_interval = poll_interval
+        # Um resultado pré-calculado vale tanto tempo quanto as observações em que se baseia
+        self.result_ttl = self.cache.ttl if self.cache is not None else 600
+        
+        self._watches = {}  # {id: WatchedArea}
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+        self._last_call = 0.0
+        
+        self.refreshed = 0
+        self.failed = 0
+        self.results_computed = 0
+        self.results_served = 0
+    
+    def watch_point(self, lat, lon, name=None):
+        """
+        Regista um ponto vigiado.
+        
+        Returns:
+            WatchedArea: Área criada
+        """
+        return self._add(name or f"{lat:.4f}, {lon:.4f}", [(lat, lon)])
+    
+    def watch_bounds(self, bounds, coordinates, grid_size, name=None):
+        """
+        Regista uma região vigiada, amostrada numa grade de pontos.
+        
+        Args:
+            bounds (dict): Limites {north, south, east, west}
+            coordinates (list): Pontos da grade
+            grid_size (int): Tamanho da grade
+            name (str, optional): Nome da região
+        
+        Returns:
+            WatchedArea: Área criada
+        """
+        return self._add(name or "Região", coordinates, bounds, grid_size)
+    
+    def _add(self, name, coordinates, bounds=None, grid_size=None):
+        with self._lock:
+            watch = WatchedArea(next(self._ids), name, list(coordinates), bounds, grid_size)
+            self._watches[watch.id] = watch
+        # Antecipar a próxima verificação para incluir a nova área
+        self._wake.set()
+        return watch
+    
+    def unwatch(self, watch_id):
+        """
+        Remove uma área vigiada.
+        
+        Returns:
+            bool: True se a área existia
+        """
+        with self._lock:
+            return self._watches.pop(watch_id, None) is not None
+    
+    def list_watches(self):
+        """
+        Obtém as áreas vigiadas.
+        
+        Returns:
+            list: Lista de dicionários com as áreas
+        """
+        with self._lock:
+            return [watch.to_dict() for watch in self._watches.values()]
+    
+    def get_result(self, bounds, grid_size):
+        """
+        Obtém o resultado pré-calculado de uma região vigiada, se ainda válido.
+        
+        Args:
+            bounds (dict): Limites {north, south, east, west}
+            grid_size (int): Tamanho da grade
+        
+        Returns:
+            dict: Resultado da região ou None
+        """
+        now = time.time()
+        with self._lock:
+            for watch in self._watches.values():
+                if (watch.matches(bounds, grid_size) and watch.result is not None
+                        and now - watch.computed_at < self.result_ttl):
+                    self.results_served += 1
+                    return watch.result
+        return None
+    
+    def start(self):
+        """
+        Inicia a thread de atualização em segundo plano.
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="prefetch-scheduler", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """
+        Para a thread de atualização.
+        """
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                wait = self.run_once()
+            except Exception as e:
+                print(f"Erro no agendador de atualização: {e}")
+                wait = self.poll_interval
+            self._wake.wait(timeout=wait)
+            self._wake.clear()
+    
+    def _pace(self):
+        """
+        Espaça as chamadas uniformemente dentro da parte da quota reservada.
+        """
+        delay = self._last_call + self.min_interval - time.monotonic()
+        if delay > 0:
+            self._stop.wait(delay)
+        self._last_call = time.monotonic()
+    
+    def run_once(self):
+        """
+        Atualiza os pontos cujo cache expira dentro da margem e recalcula as regiões afetadas.
+        
+        Returns:
+            float: Segundos até à próxima atualização necessária
+        """
+        with self._lock:
+            watches = list(self._watches.values())
+        
+        now = time.time()
+        next_due = self.poll_interval
+        due = {}  # {chave de cache: (lat, lon)}, sem pontos repetidos entre áreas
+        for watch in watches:
+            for lat, lon in watch.coordinates:
+                expires_at = self.cache.expires_at(lat, lon) if self.cache is not None else None
+                refresh_at = (expires_at or 0) - self.refresh_margin
+                if refresh_at <= now:
+                    due[self.weather_service.coalescing_key(lat, lon)] = (lat, lon)
+                else:
+                    next_due = min(next_due, refresh_at - now)
+        
+        refreshed_keys = set()
+        for key, (lat, lon) in due.items():
+            if self._stop.is_set():
+                return 0
+            self._pace()
+            try:
+                self.weather_service.get_weather_by_location(
+                    lat, lon,
+                    priority=TokenBucketRateLimiter.PRIORITY_PREFETCH,
+                    refresh=True
+                )
+                refreshed_keys.add(key)
+                self.refreshed += 1
+            except Exception as e:
+                print(f"Erro ao atualizar antecipadamente ({lat}, {lon}): {e}")
+                self.failed += 1
+        
+        # Recalcular as regiões cujos pontos mudaram
+        if self.on_refresh is not None:
+            for watch in watches:
+                if watch.bounds is None:
+                    continue
+                changed = any(
+                    self.weather_service.coalescing_key(lat, lon) in refreshed_keys
+                    for lat, lon in watch.coordinates
+                )
+                if watch.result is None or changed:
+                    try:
+                        result = self.on_refresh(watch)
+                    except Exception as e:
+                        print(f"Erro ao pré-calcular a região {watch.name}: {e}")
+                        continue
+                    with self._lock:
+                        watch.result = result
+                        watch.computed_at = time.time()
+                        self.results_computed += 1
+        
+        return max(1.0, next_due)
+    
+    def get_stats(self):
+        """
+        Obtém estatísticas do agendador.
+        
+        Returns:
+            dict: Áreas e pontos vigiados, atualizações e resultados servidos
+        """
+        with self._lock:
+            return {
+                'running': self._thread is not None and self._thread.is_alive(),
+                'watches': len(self._watches),
+                'points': sum(len(watch.coordinates) for watch in self._watches.values()),
+                'refreshed': self.refreshed,
+                'failed': self.failed,
+                'results_computed': self.results_computed,
+                'results_served': self.results_served
+            }
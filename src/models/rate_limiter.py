@@ -0,0 +1,281 @@
+"""
+Limitador de taxa (token bucket) com prioridades para as chamadas à API OpenWeather.
+"""
+import asyncio
+import collections
+import itertools
+import threading
+import time
+
+class RateLimitExceeded(Exception):
+    """
+    Lançada quando a espera por uma vaga na quota ultrapassaria o prazo do pedido.
+    """
+    
+    def __init__(self, priority, estimated_wait, available_wait):
+        self.priority = priority
+        self.estimated_wait = estimated_wait
+        self.available_wait = max(0.0, available_wait)
+        super().__init__(
+            f"Quota da OpenWeather esgotada: a chamada ({priority}) teria de esperar "
+            f"{estimated_wait:.1f}s, mas o prazo permite apenas {self.available_wait:.1f}s"
+        )
+
+class TokenBucketRateLimiter:
+    """
+    Token bucket partilhado pelo processo, com filas de prioridade.
+    
+    As fichas são repostas continuamente à taxa de calls_per_minute. Os pedidos
+    esperam por ordem de prioridade (interativos, depois pedidos em lote e por fim
+    atualizações em segundo plano) e, dentro da mesma prioridade, por ordem de
+    chegada. Um pedido é rejeitado de imediato quando a espera estimada
+    ultrapassaria o seu prazo.
+    """
+    
+    # Prioridades (menor valor = atendido primeiro)
+    PRIORITY_INTERACTIVE = "interactive"
+    PRIORITY_BULK = "bulk"
+    PRIORITY_PREFETCH = "prefetch"
+    PRIORITY_LEVELS = {
+        PRIORITY_INTERACTIVE: 0,
+        PRIORITY_BULK: 1,
+        PRIORITY_PREFETCH: 2
+    }
+    
+    # Espera máxima quando o pedido não indica prazo, em segundos
+    DEFAULT_MAX_WAIT = {
+        PRIORITY_INTERACTIVE: 10,
+        PRIORITY_BULK: 60,
+        PRIORITY_PREFETCH: 60
+    }
+    
+    def __init__(self, calls_per_minute=60, burst=None):
+        """
+        Inicializa o limitador.
+        
+        Args:
+            calls_per_minute (float): Orçamento de chamadas por minuto
+            burst (int, optional): Capacidade do balde (chamadas seguidas permitidas).
+                                  Padrão: um sexto do orçamento por minuto.
+        
+        Raises:
+            ValueError: Se o orçamento não for positivo ou o balde tiver capacidade inferior a 1
+        """
+        if calls_per_minute <= 0:
+            raise ValueError("calls_per_minute deve ser positivo; para não limitar, não use o limitador")
+        if burst is not None and burst < 1:
+            raise ValueError("burst deve ser pelo menos 1")
+        
+        self.calls_per_minute = calls_per_minute
+        self.rate = calls_per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1, int(calls_per_minute // 6))
+        
+        self._tokens = float(self.capacity)
+        self._updated_at = time.monotonic()
+        # Uma fila FIFO por nível de prioridade; bilhetes saídos do meio da fila ficam em
+        # _cancelled e são descartados quando chegam à frente
+        self._lanes = [collections.deque() for _ in self.PRIORITY_LEVELS]
+        self._lane_sizes = [0] * len(self.PRIORITY_LEVELS)
+        self._cancelled = set()
+        self._wakeups = {}  # {bilhete: função que acorda o pedido em espera}
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+        
+        self._granted = {priority: 0 for priority in self.PRIORITY_LEVELS}
+        self._rejected = {priority: 0 for priority in self.PRIORITY_LEVELS}
+        self._total_wait = 0.0
+    
+    def _refill(self, now):
+        """
+        Repõe as fichas acumuladas desde a última atualização.
+        """
+        elapsed = now - self._updated_at
+        if elapsed > 0:
+            self._tokens = min(self.capacity, self._tokens + elapsed * self.rate)
+            self._updated_at = now
+    
+    def _enqueue(self, priority, wakeup):
+        """
+        Coloca um pedido na fila de espera. Deve ser chamado com o lock adquirido.
+        
+        Args:
+            priority (str): Prioridade do pedido
+            wakeup (callable): Função que acorda o pedido quando chega à frente da fila
+        
+        Returns:
+            tuple: Bilhete do pedido na fila
+        """
+        if priority not in self.PRIORITY_LEVELS:
+            raise ValueError(f"Prioridade desconhecida: {priority}")
+        
+        level = self.PRIORITY_LEVELS[priority]
+        ticket = (level, next(self._sequence))
+        self._lanes[level].append(ticket)
+        self._lane_sizes[level] += 1
+        self._wakeups[ticket] = wakeup
+        return ticket
+    
+    def _head(self):
+        """
+        Obtém o bilhete à frente da fila, ou None. Deve ser chamado com o lock adquirido.
+        """
+        for lane in self._lanes:
+            while lane and lane[0] in self._cancelled:
+                self._cancelled.discard(lane.popleft())
+            if lane:
+                return lane[0]
+        return None
+    
+    def _dequeue(self, ticket):
+        """
+        Remove um pedido da fila (concedido, rejeitado ou cancelado) e acorda o seguinte.
+        """
+        with self._lock:
+            level = ticket[0]
+            lane = self._lanes[level]
+            if lane and lane[0] == ticket:
+                lane.popleft()
+            else:
+                self._cancelled.add(ticket)
+            self._lane_sizes[level] -= 1
+            del self._wakeups[ticket]
+            
+            head = self._head()
+            if head is not None:
+                self._wakeups[head]()
+    
+    def _ahead(self, ticket):
+        """
+        Conta os pedidos à frente de um bilhete. Deve ser chamado com o lock adquirido.
+        """
+        level = ticket[0]
+        ahead = sum(self._lane_sizes[:level])
+        for waiter in self._lanes[level]:
+            if waiter == ticket:
+                break
+            if waiter not in self._cancelled:
+                ahead += 1
+        return ahead
+    
+    def _try_take(self, ticket, priority, deadline):
+        """
+        Tenta consumir uma ficha para o pedido. Deve ser chamado com o lock adquirido.
+        
+        Args:
+            ticket (tuple): Bilhete do pedido
+            priority (str): Prioridade do pedido
+            deadline (float): Prazo absoluto (time.monotonic)
+        
+        Returns:
+            float: 0 se a ficha foi concedida, ou o tempo a esperar antes de tentar de novo
+        
+        Raises:
+            RateLimitExceeded: Se a espera estimada ultrapassar o prazo
+        """
+        now = time.monotonic()
+        self._refill(now)
+        
+        is_head = self._head() == ticket
+        if is_head and self._tokens >= 1:
+            self._tokens -= 1
+            self._granted[priority] += 1
+            return 0
+        
+        # Fichas necessárias até chegar a vez deste pedido
+        ahead = 0 if is_head else self._ahead(ticket)
+        estimated_wait = (ahead + 1 - self._tokens) / self.rate
+        if now + estimated_wait > deadline:
+            self._rejected[priority] += 1
+            raise RateLimitExceeded(priority, estimated_wait, deadline - now)
+        
+        # A frente da fila espera pela próxima ficha; os restantes são acordados quando
+        # chegam à frente e, entretanto, só voltam a verificar o prazo na vez estimada
+        return max(0.001, estimated_wait)
+    
+    def _resolve_deadline(self, priority, deadline):
+        """
+        Obtém o prazo absoluto do pedido, usando a espera máxima padrão da prioridade.
+        """
+        if deadline is not None:
+            return deadline
+        return time.monotonic() + self.DEFAULT_MAX_WAIT.get(priority, 10)
+    
+    def acquire(self, priority=PRIORITY_INTERACTIVE, deadline=None):
+        """
+        Espera por uma ficha, respeitando a prioridade e o prazo do pedido.
+        
+        Args:
+            priority (str): Prioridade do pedido (interactive, bulk ou prefetch)
+            deadline (float, optional): Prazo absoluto em time.monotonic()
+        
+        Returns:
+            float: Tempo esperado em segundos
+        
+        Raises:
+            RateLimitExceeded: Se a espera ultrapassaria o prazo do pedido
+        """
+        deadline = self._resolve_deadline(priority, deadline)
+        started_at = time.monotonic()
+        wakeup = threading.Event()
+        with self._lock:
+            ticket = self._enqueue(priority, wakeup.set)
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_take(ticket, priority, deadline)
+                    if wait == 0:
+                        waited = time.monotonic() - started_at
+                        self._total_wait += waited
+                        return waited
+                    wakeup.clear()
+                wakeup.wait(timeout=wait)
+        finally:
+            self._dequeue(ticket)
+    
+    async def acquire_async(self, priority=PRIORITY_INTERACTIVE, deadline=None):
+        """
+        Versão assíncrona de acquire, que espera sem bloquear o loop de eventos.
+        """
+        deadline = self._resolve_deadline(priority, deadline)
+        started_at = time.monotonic()
+        loop = asyncio.get_running_loop()
+        wakeup = asyncio.Event()
+        with self._lock:
+            ticket = self._enqueue(priority, lambda: loop.call_soon_threadsafe(wakeup.set))
+        try:
+            while True:
+                with self._lock:
+                    wait = self._try_take(ticket, priority, deadline)
+                    if wait == 0:
+                        waited = time.monotonic() - started_at
+                        self._total_wait += waited
+                        return waited
+                    wakeup.clear()
+                try:
+                    await asyncio.wait_for(wakeup.wait(), timeout=wait)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._dequeue(ticket)
+    
+    def get_stats(self):
+        """
+        Obtém estatísticas do limitador.
+        
+        Returns:
+            dict: Orçamento, fichas disponíveis, pedidos em espera, concedidos e rejeitados
+        """
+        with self._lock:
+            self._refill(time.monotonic())
+            waiting = {priority: self._lane_sizes[level] for priority, level in self.PRIORITY_LEVELS.items()}
+            
+            granted_total = sum(self._granted.values())
+            return {
+                'calls_per_minute': self.calls_per_minute,
+                'burst': self.capacity,
+                'tokens_available': round(self._tokens, 3),
+                'waiting': waiting,
+                'granted': dict(self._granted),
+                'rejected': dict(self._rejected),
+                'average_wait': self._total_wait / granted_total if granted_total else 0.0
+            }
@@ -0,0 +1,111 @@
+"""
+Armazenamento temporário de resultados de análises para renderização posterior.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+class StoredResult:
+    """
+    Resultado guardado, com os dados necessários para desenhar os respetivos mapas.
+    """
+    
+    __slots__ = ('kind', 'result', 'map_data', 'created_at')
+    
+    def __init__(self, kind, result, map_data):
+        self.kind = kind
+        self.result = result
+        self.map_data = map_data
+        self.created_at = time.time()
+
+class ResultStore:
+    """
+    Guarda resultados recentes, identificados pelo hash do seu conteúdo.
+    
+    Resultados idênticos recebem o mesmo identificador. As entradas expiram após ttl
+    segundos e, acima de max_entries, as menos usadas são descartadas.
+    """
+    
+    def __init__(self, ttl=600, max_entries=256):
+        """
+        Inicializa o armazenamento.
+        
+        Args:
+            ttl (float): Tempo de vida, em segundos, de cada resultado
+            max_entries (int): Número máximo de resultados guardados
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        
+        self._entries = OrderedDict()  # {id: StoredResult}
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def content_id(kind, result):
+        """
+        Calcula o identificador de um resultado a partir do seu conteúdo.
+        
+        Returns:
+            str: Hash hexadecimal de 16 caracteres
+        """
+        payload = json.dumps([kind, result], sort_keys=True, separators=(",", ":"), default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()[:16]
+    
+    def put(self, kind, result, map_data=None):
+        """
+        Guarda um resultado.
+        
+        Args:
+            kind (str): Tipo de análise (region, regional, ...)
+            result (dict): Resultado serializável em JSON
+            map_data (dict, optional): Dados para desenhar os mapas do resultado
+        
+        Returns:
+            str: Identificador do resultado
+        """
+        result_id = self.content_id(kind, result)
+        with self._lock:
+            self._entries[result_id] = StoredResult(kind, result, map_data)
+            self._entries.move_to_end(result_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return result_id
+    
+    def get(self, result_id):
+        """
+        Obtém um resultado guardado.
+        
+        Returns:
+            StoredResult: Resultado, ou None se não existir ou tiver expirado
+        """
+        with self._lock:
+            entry = self._entries.get(result_id)
+            if entry is not None and time.time() - entry.created_at >= self.ttl:
+                del self._entries[result_id]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(result_id)
+            self.hits += 1
+            return entry
+    
+    def get_stats(self):
+        """
+        Obtém estatísticas do armazenamento.
+        
+        Returns:
+            dict: Resultados guardados, acertos e falhas
+        """
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses
+            }
@@ -0,0 +1,158 @@
+"""
+Formatos compactos para respostas com muitos pontos de risco.
+"""
+import gzip
+import io
+import json
+import brotli
+import numpy as np
+from src.models.fire_risk import FireRiskCalculator
+
+try:
+    import msgpack
+except ImportError:  # Dependência opcional: o formato msgpack fica indisponível
+    msgpack = None
+
+# Formatos suportados e respetivos tipos MIME
+FORMATS = {
+    'json': 'application/json',
+    'columnar': 'application/vnd.fire-risk.columnar+json',
+    'msgpack': 'application/x-msgpack',
+    'npz': 'application/x-npz'
+}
+
+# Respostas menores do que isto não compensam a compressão
+MIN_COMPRESS_SIZE = 1024
+
+# Casas decimais mantidas nos formatos compactos (cerca de 0,1 m nas coordenadas)
+COORDINATE_DECIMALS = 6
+INDEX_DECIMALS = 2
+
+def available_formats():
+    """
+    Obtém os formatos disponíveis, sem os que dependem de pacotes não instalados.
+    
+    Returns:
+        list: Nomes dos formatos
+    """
+    return [name for name in FORMATS if name != 'msgpack' or msgpack is not None]
+
+def risk_legend():
+    """
+    Obtém a legenda dos códigos de categoria usados nos formatos compactos.
+    
+    Returns:
+        dict: Categorias e cores, indexadas pelo código
+    """
+    return {
+        'categories': list(FireRiskCalculator.RISK_CATEGORIES),
+        'colors': list(FireRiskCalculator.RISK_COLORS)
+    }
+
+def points_to_arrays(points):
+    """
+    Converte a lista de pontos de risco em arrays paralelos.
+    
+    Args:
+        points (list): Dicionários com lat, lon, risk_index e risk_category
+    
+    Returns:
+        dict: Arrays NumPy lat, lon (float64), risk_index (float32) e category (uint8)
+    """
+    codes = {category: code for code, category in enumerate(FireRiskCalculator.RISK_CATEGORIES)}
+    return {
+        'lat': np.fromiter((p['lat'] for p in points), dtype=np.float64, count=len(points)),
+        'lon': np.fromiter((p['lon'] for p in points), dtype=np.float64, count=len(points)),
+        'risk_index': np.fromiter((p['risk_index'] for p in points), dtype=np.float32, count=len(points)),
+        'category': np.fromiter((codes[p['risk_category']] for p in points), dtype=np.uint8, count=len(points))
+    }
+
+def to_columnar(result):
+    """
+    Converte um resultado de região para a forma colunar.
+    
+    Os pontos passam a arrays paralelos, as categorias a códigos inteiros (com a
+    legenda em 'legend') e a cor de cada ponto é omitida, pois decorre do código.
+    
+    Args:
+        result (dict): Resultado com fire_risk.points
+    
+    Returns:
+        dict: Cópia do resultado com fire_risk.points em colunas
+    """
+    arrays = points_to_arrays(result['fire_risk']['points'])
+    columns = {
+        'count': len(arrays['lat']),
+        'lat': np.round(arrays['lat'], COORDINATE_DECIMALS).tolist(),
+        'lon': np.round(arrays['lon'], COORDINATE_DECIMALS).tolist(),
+        'risk_index': np.round(arrays['risk_index'].astype(np.float64), INDEX_DECIMALS).tolist(),
+        'category': arrays['category'].tolist()
+    }
+    fire_risk = dict(result['fire_risk'], points=columns)
+    return dict(result, fire_risk=fire_risk, legend=risk_legend())
+
+def to_npz(result):
+    """
+    Converte um resultado de região para um arquivo NumPy .npz.
+    
+    Os pontos ficam nos arrays lat, lon, risk_index e category; o resto do
+    resultado e a legenda ficam em JSON no array 'meta'.
+    
+    Args:
+        result (dict): Resultado com fire_risk.points
+    
+    Returns:
+        bytes: Conteúdo do arquivo .npz
+    """
+    arrays = points_to_arrays(result['fire_risk']['points'])
+    meta = dict(result, fire_risk={k: v for k, v in result['fire_risk'].items() if k != 'points'},
+                legend=risk_legend())
+    buffer = io.BytesIO()
+    np.savez(buffer, meta=np.array(json.dumps(meta, ensure_ascii=False)), **arrays)
+    return buffer.getvalue()
+
+def encode(result, fmt):
+    """
+    Serializa um resultado de região no formato pedido.
+    
+    Args:
+        result (dict): Resultado com fire_risk.points
+        fmt (str): Um dos formatos de FORMATS
+    
+    Returns:
+        tuple: (corpo em bytes, tipo MIME)
+    
+    Raises:
+        ValueError: Se o formato for desconhecido ou não estiver disponível
+    """
+    if fmt not in available_formats():
+        raise ValueError(f"Formato indisponível: {fmt}. Use um de: {', '.join(available_formats())}.")
+    
+    if fmt == 'json':
+        body = json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    elif fmt == 'columnar':
+        body = json.dumps(to_columnar(result), ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    elif fmt == 'msgpack':
+        body = msgpack.packb(to_columnar(result), use_bin_type=True)
+    else:
+        body = to_npz(result)
+    return body, FORMATS[fmt]
+
+def compress(body, accept_encoding):
+    """
+    Comprime o corpo com brotli ou gzip, se o cliente aceitar.
+    
+    Args:
+        body (bytes): Corpo da resposta
+        accept_encoding (werkzeug.datastructures.Accept): Cabeçalho Accept-Encoding do pedido
+    
+    Returns:
+        tuple: (corpo, codificação usada ou None)
+    """
+    if len(body) < MIN_COMPRESS_SIZE:
+        return body, None
+    if accept_encoding['br']:
+        return brotli.compress(body, quality=5), 'br'
+    if accept_encoding['gzip']:
+        return gzip.compress(body, compresslevel=6), 'gzip'
+    return body, None
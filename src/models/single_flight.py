@@ -0,0 +1,182 @@
+"""
+Coalescência de chamadas idênticas em curso (single-flight).
+"""
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, wait
+
+# Resultado entregue aos seguidores quando o líder é cancelado: devem tentar de novo
+_LEADER_ABORTED = object()
+
+class SingleFlightTimeout(TimeoutError):
+    """
+    Lançada quando um seguidor atinge o seu prazo antes de o líder terminar.
+    """
+    
+    def __init__(self, key):
+        self.key = key
+        super().__init__(f"Chamada partilhada para {key} não terminou dentro do prazo")
+
+class SingleFlight:
+    """
+    Garante que apenas uma chamada por chave está em curso de cada vez.
+    
+    Chamadores concorrentes com a mesma chave esperam pelo resultado da chamada
+    já emitida em vez de emitirem a sua. Funciona entre threads e entre loops de
+    eventos, pois o resultado é partilhado através de um concurrent.futures.Future.
+    
+    Se o líder for cancelado (por exemplo, pelo prazo do seu próprio pedido), o
+    cancelamento não é partilhado: um dos seguidores passa a líder e repete a chamada.
+    Cada seguidor espera no máximo até ao seu próprio prazo, para que um líder lento
+    não prenda pedidos com prazos mais curtos.
+    """
+    
+    def __init__(self):
+        """
+        Inicializa o controlo de chamadas em curso.
+        """
+        self._calls = {}  # {chave: Future}
+        self._lock = threading.Lock()
+        
+        self.issued = 0
+        self.coalesced = 0
+    
+    def _join(self, key):
+        """
+        Regista o chamador numa chamada existente ou cria uma nova.
+        
+        Args:
+            key (hashable): Chave da chamada
+        
+        Returns:
+            tuple: (Future partilhado, True se o chamador deve executar a chamada)
+        """
+        with self._lock:
+            future = self._calls.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future, False
+            
+            future = Future()
+            self._calls[key] = future
+            self.issued += 1
+            return future, True
+    
+    def _finish(self, key, future, result=None, error=None):
+        """
+        Conclui a chamada e entrega o resultado a todos os chamadores em espera.
+        
+        Erros que não são Exception (cancelamento, interrupção) dizem respeito só ao
+        líder; os seguidores recebem _LEADER_ABORTED e voltam a tentar.
+        """
+        with self._lock:
+            self._calls.pop(key, None)
+        
+        if future.done():
+            return
+        if error is not None and not isinstance(error, Exception):
+            future.set_result(_LEADER_ABORTED)
+        elif error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+    
+    @staticmethod
+    def _remaining(deadline):
+        """Obtém o tempo até ao prazo (None se não houver prazo)."""
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+    
+    def do(self, key, fn, deadline=None):
+        """
+        Executa fn uma única vez para chamadores concorrentes com a mesma chave.
+        
+        Args:
+            key (hashable): Chave da chamada
+            fn (callable): Função sem argumentos que produz o resultado
+            deadline (float, optional): Prazo absoluto, em time.monotonic(), até ao qual um
+                                        seguidor espera pelo líder
+        
+        Returns:
+            object: Resultado de fn, partilhado entre os chamadores
+        
+        Raises:
+            Exception: A exceção lançada por fn, também partilhada
+            SingleFlightTimeout: Se o prazo do seguidor terminar antes do resultado
+        """
+        while True:
+            future, is_leader = self._join(key)
+            if is_leader:
+                break
+            if not wait([future], timeout=self._remaining(deadline)).done:
+                raise SingleFlightTimeout(key)
+            result = future.result()
+            if result is not _LEADER_ABORTED:
+                return result
+        
+        try:
+            result = fn()
+        except BaseException as e:
+            self._finish(key, future, error=e)
+            raise
+        
+        self._finish(key, future, result=result)
+        return result
+    
+    async def do_async(self, key, coro_fn, deadline=None):
+        """
+        Versão assíncrona de do.
+        
+        Args:
+            key (hashable): Chave da chamada
+            coro_fn (callable): Função sem argumentos que devolve uma corrotina
+            deadline (float, optional): Prazo absoluto, em time.monotonic(), até ao qual um
+                                        seguidor espera pelo líder
+        
+        Returns:
+            object: Resultado da corrotina, partilhado entre os chamadores
+        
+        Raises:
+            SingleFlightTimeout: Se o prazo do seguidor terminar antes do resultado
+        """
+        while True:
+            future, is_leader = self._join(key)
+            if is_leader:
+                break
+            # asyncio.wait não cancela o Future partilhado se este seguidor for cancelado
+            # ou desistir pelo prazo
+            waiter = asyncio.wrap_future(future)
+            done, _ = await asyncio.wait([waiter], timeout=self._remaining(deadline))
+            if not done:
+                # Consumir o resultado mais tarde, para não o reportar como não lido
+                waiter.add_done_callback(lambda f: f.cancelled() or f.exception())
+                raise SingleFlightTimeout(key)
+            result = waiter.result()
+            if result is not _LEADER_ABORTED:
+                return result
+        
+        try:
+            result = await coro_fn()
+        except BaseException as e:
+            # Inclui o cancelamento, para não deixar os seguidores à espera
+            self._finish(key, future, error=e)
+            raise
+        
+        self._finish(key, future, result=result)
+        return result
+    
+    def get_stats(self):
+        """
+        Obtém estatísticas de coalescência.
+        
+        Returns:
+            dict: Chamadas emitidas, chamadas coalescidas e chamadas em curso
+        """
+        with self._lock:
+            total = self.issued + self.coalesced
+            return {
+                'issued': self.issued,
+                'coalesced': self.coalesced,
+                'in_flight': len(self._calls),
+                'coalesced_ratio': self.coalesced / total if total else 0.0
+            }
@@ -0,0 +1,181 @@
+"""
+Índice espacial em grelha para as observações meteorológicas em cache.
+"""
+import math
+import threading
+import time
+
+# Raio médio da Terra em km
+EARTH_RADIUS_KM = 6371.0088
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """
+    Calcula a distância ortodrómica (fórmula de haversine) entre dois pontos.
+    
+    Returns:
+        float: Distância em km
+    """
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+class SpatialIndex:
+    """
+    Índice de observações por baldes de uma grelha regular em graus.
+    
+    É atualizado de forma incremental pelo WeatherCache: cada entrada guardada é
+    inserida no balde da sua coordenada e retirada quando sai do cache. As consultas
+    só visitam os baldes que intersetam a área pedida, pelo que o custo depende do
+    número de observações próximas e não do tamanho do cache.
+    """
+    
+    def __init__(self, cell_size=0.1):
+        """
+        Inicializa o índice.
+        
+        Args:
+            cell_size (float): Lado de cada balde em graus (0.1° ≈ 11 km de latitude)
+        """
+        self.cell_size = cell_size
+        
+        self._buckets = {}  # {(linha, coluna): {chave: (lat, lon, valor, expira_em)}}
+        self._cells = {}  # {chave: (linha, coluna)}
+        self._lock = threading.Lock()
+        
+        self.queries = 0
+        self.found = 0
+    
+    def _cell(self, lat, lon):
+        return (math.floor(lat / self.cell_size), math.floor(lon / self.cell_size))
+    
+    def insert(self, key, lat, lon, value, expires_at):
+        """
+        Insere ou substitui uma observação.
+        
+        Args:
+            key (hashable): Chave da entrada no cache
+            lat (float): Latitude da observação
+            lon (float): Longitude da observação
+            value (object): Observação (WeatherData)
+            expires_at (float): Instante (epoch) em que a observação deixa de ser recente
+        """
+        cell = self._cell(lat, lon)
+        with self._lock:
+            previous = self._cells.get(key)
+            if previous is not None and previous != cell:
+                self._discard(key, previous)
+            self._buckets.setdefault(cell, {})[key] = (lat, lon, value, expires_at)
+            self._cells[key] = cell
+    
+    def remove(self, key):
+        """
+        Retira uma observação do índice, se existir.
+        """
+        with self._lock:
+            cell = self._cells.pop(key, None)
+            if cell is not None:
+                self._discard(key, cell)
+    
+    def _discard(self, key, cell):
+        bucket = self._buckets.get(cell)
+        if bucket is not None:
+            bucket.pop(key, None)
+            if not bucket:
+                del self._buckets[cell]
+    
+    def clear(self):
+        """
+        Retira todas as observações.
+        """
+        with self._lock:
+            self._buckets.clear()
+            self._cells.clear()
+    
+    def _candidates(self, south, north, west, east):
+        """Percorre as entradas dos baldes que intersetam o retângulo. Deve ser chamado com o lock."""
+        row_min, col_min = self._cell(south, west)
+        row_max, col_max = self._cell(north, east)
+        # Com poucos baldes ocupados é mais barato percorrê-los do que a área inteira
+        if (row_max - row_min + 1) * (col_max - col_min + 1) > len(self._buckets):
+            for (row, col), bucket in self._buckets.items():
+                if row_min <= row <= row_max and col_min <= col <= col_max:
+                    yield from bucket.values()
+            return
+        for row in range(row_min, row_max + 1):
+            for col in range(col_min, col_max + 1):
+                bucket = self._buckets.get((row, col))
+                if bucket:
+                    yield from bucket.values()
+    
+    def nearest(self, lat, lon, max_km, fresh_only=True):
+        """
+        Encontra a observação mais próxima dentro de uma distância.
+        
+        Args:
+            lat (float): Latitude do ponto
+            lon (float): Longitude do ponto
+            max_km (float): Distância máxima em km
+            fresh_only (bool): Ignorar observações já expiradas
+        
+        Returns:
+            tuple: (observação, lat, lon, distância em km) ou None se não houver nenhuma
+        """
+        # Retângulo que contém o círculo de raio max_km
+        dlat = math.degrees(max_km / EARTH_RADIUS_KM)
+        dlon = dlat / max(math.cos(math.radians(lat)), 1e-6)
+        now = time.time()
+        
+        best = None
+        with self._lock:
+            self.queries += 1
+            for obs_lat, obs_lon, value, expires_at in self._candidates(lat - dlat, lat + dlat,
+                                                                        lon - dlon, lon + dlon):
+                if fresh_only and expires_at <= now:
+                    continue
+                distance = distance_km(lat, lon, obs_lat, obs_lon)
+                if distance <= max_km and (best is None or distance < best[3]):
+                    best = (value, obs_lat, obs_lon, distance)
+            if best is not None:
+                self.found += 1
+        return best
+    
+    def within_bounds(self, bounds, fresh_only=True):
+        """
+        Obtém as observações dentro de um retângulo.
+        
+        Args:
+            bounds (dict): Limites {north, south, east, west}
+            fresh_only (bool): Ignorar observações já expiradas
+        
+        Returns:
+            list: Tuplas (lat, lon, observação)
+        """
+        south, north = bounds['south'], bounds['north']
+        west, east = bounds['west'], bounds['east']
+        now = time.time()
+        with self._lock:
+            self.queries += 1
+            return [
+                (obs_lat, obs_lon, value)
+                for obs_lat, obs_lon, value, expires_at in self._candidates(south, north, west, east)
+                if south <= obs_lat <= north and west <= obs_lon <= east
+                and not (fresh_only and expires_at <= now)
+            ]
+    
+    def get_stats(self):
+        """
+        Obtém estatísticas do índice.
+        
+        Returns:
+            dict: Observações e baldes ocupados, consultas e consultas com resultado
+        """
+        with self._lock:
+            return {
+                'entries': len(self._cells),
+                'buckets': len(self._buckets),
+                'cell_size': self.cell_size,
+                'queries': self.queries,
+                'nearest_found': self.found
+            }
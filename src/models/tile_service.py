@@ -0,0 +1,282 @@
+"""
+Serviço de mosaicos (tiles) PNG de risco de incêndio para mapas deslizantes.
+"""
+import hashlib
+import io
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+import numpy as np
+from PIL import Image
+from src.models.fire_risk import FireRiskCalculator
+from src.models.weather_data import WeatherBatch
+
+def tile_bounds(z, x, y):
+    """
+    Calcula os limites geográficos de um mosaico no esquema XYZ (Web Mercator).
+    
+    Args:
+        z (int): Nível de zoom
+        x (int): Coluna do mosaico
+        y (int): Linha do mosaico, a contar de norte
+    
+    Returns:
+        dict: Limites {north, south, east, west} em graus
+    """
+    n = 2 ** z
+    
+    def lat(row):
+        return math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * row / n))))
+    
+    return {
+        'north': lat(y),
+        'south': lat(y + 1),
+        'west': x / n * 360.0 - 180.0,
+        'east': (x + 1) / n * 360.0 - 180.0
+    }
+
+class RiskTile:
+    """
+    Mosaico renderizado, com a identificação (ETag), o instante da renderização e o
+    tempo de vida (0 para mosaicos que não devem ser guardados).
+    """
+    
+    __slots__ = ('png', 'etag', 'created_at', 'ttl')
+    
+    def __init__(self, png, ttl, created_at=None):
+        self.png = png
+        self.etag = hashlib.sha1(png).hexdigest()[:16]
+        self.ttl = ttl
+        self.created_at = time.time() if created_at is None else created_at
+    
+    def max_age(self, now=None):
+        """Segundos de vida restantes do mosaico."""
+        return max(0, int(self.ttl - ((time.time() if now is None else now) - self.created_at)))
+
+class TileService:
+    """
+    Renderiza mosaicos de risco a partir de uma grade de amostras interpolada com NumPy.
+    
+    Cada mosaico é amostrado numa grade de samples x samples células; os vértices nas
+    bordas coincidem com os dos mosaicos vizinhos, pelo que essas observações vêm do
+    cache meteorológico. O índice de risco é interpolado bilinearmente para cada pixel
+    e colorido pelas categorias de FireRiskCalculator. Os mosaicos ficam num cache em
+    memória (LRU) e, opcionalmente, em disco, ambos com tempo de vida. Mosaicos com
+    pontos sem observação ficam só em memória, durante partial_ttl, para que uma falha
+    passageira da API não deixe buracos no mapa durante todo o ttl.
+    """
+    
+    TILE_SIZE = 256
+    
+    def __init__(self, fetch_points, samples=4, ttl=600, cache_dir=None, max_memory_tiles=512,
+                 min_zoom=6, max_zoom=14, opacity=160, partial_ttl=30):
+        """
+        Inicializa o serviço de mosaicos.
+        
+        Args:
+            fetch_points (callable): Função que recebe uma lista de tuplas (lat, lon) e devolve
+                                     o WeatherData de cada ponto (ou None se falhou)
+            samples (int): Número de células de amostragem por lado do mosaico
+            ttl (float): Tempo de vida, em segundos, de um mosaico renderizado
+            cache_dir (str, optional): Diretório do cache em disco (desativado se None)
+            max_memory_tiles (int): Número máximo de mosaicos mantidos em memória
+            min_zoom (int): Menor zoom servido (zooms menores exigiriam demasiadas chamadas)
+            max_zoom (int): Maior zoom servido
+            opacity (int): Opacidade (0 a 255) das áreas com risco calculado
+            partial_ttl (float): Tempo de vida, em segundos, de um mosaico com pontos sem observação
+        """
+        self.fetch_points = fetch_points
+        self.samples = samples
+        self.ttl = ttl
+        self.cache_dir = cache_dir
+        self.max_memory_tiles = max_memory_tiles
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.opacity = opacity
+        self.partial_ttl = partial_ttl
+        
+        # Cores das categorias em RGB, indexadas pelos códigos de categoria
+        self._palette = np.array(
+            [[int(color[i:i + 2], 16) for i in (1, 3, 5)] for color in FireRiskCalculator.RISK_COLORS],
+            dtype=np.uint8
+        )
+        
+        self._tiles = OrderedDict()  # {(z, x, y): RiskTile}
+        self._lock = threading.Lock()
+        
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.rendered = 0
+    
+    def validate(self, z, x, y):
+        """
+        Verifica se o mosaico existe e está dentro dos zooms servidos.
+        
+        Raises:
+            ValueError: Se as coordenadas do mosaico forem inválidas
+        """
+        if not self.min_zoom <= z <= self.max_zoom:
+            raise ValueError(f"Zoom deve estar entre {self.min_zoom} e {self.max_zoom}.")
+        if not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise ValueError("Coordenadas do mosaico fora do intervalo para o zoom.")
+    
+    def get_tile(self, z, x, y):
+        """
+        Obtém um mosaico, do cache em memória, do disco ou renderizado de novo.
+        
+        Args:
+            z (int): Nível de zoom
+            x (int): Coluna do mosaico
+            y (int): Linha do mosaico
+        
+        Returns:
+            RiskTile: Mosaico com o PNG e a ETag
+        
+        Raises:
+            ValueError: Se as coordenadas do mosaico forem inválidas
+        """
+        self.validate(z, x, y)
+        key = (z, x, y)
+        now = time.time()
+        
+        with self._lock:
+            tile = self._tiles.get(key)
+            if tile is not None and now - tile.created_at < tile.ttl:
+                self._tiles.move_to_end(key)
+                self.memory_hits += 1
+                return tile
+        
+        tile = self._read_disk(key, now)
+        if tile is None:
+            tile = self.render(z, x, y)
+            if tile is None:
+                # Sem nenhuma observação: devolver um mosaico transparente sem o guardar
+                return RiskTile(self._encode(np.zeros((self.TILE_SIZE, self.TILE_SIZE, 4), dtype=np.uint8)), 0)
+            if tile.ttl <= 0:
+                return tile
+            if tile.ttl >= self.ttl:
+                self._write_disk(key, tile)
+        
+        with self._lock:
+            self._tiles[key] = tile
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_memory_tiles:
+                self._tiles.popitem(last=False)
+        return tile
+    
+    def render(self, z, x, y):
+        """
+        Renderiza um mosaico a partir das observações meteorológicas.
+        
+        Returns:
+            RiskTile: Mosaico renderizado (com partial_ttl se faltar alguma observação),
+                      ou None se nenhum ponto tiver observação
+        """
+        bounds = tile_bounds(z, x, y)
+        n = self.samples
+        
+        # Amostras espaçadas uniformemente em pixels (Mercator), de norte para sul
+        rows = [
+            math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + i / n) / 2 ** z))))
+            for i in range(n + 1)
+        ]
+        cols = [bounds['west'] + j * (bounds['east'] - bounds['west']) / n for j in range(n + 1)]
+        coordinates = [(lat, lon) for lat in rows for lon in cols]
+        
+        batch = WeatherBatch(coordinates, self.fetch_points(coordinates))
+        if not batch.valid.any():
+            return None
+        
+        risk_index, _, _ = batch.calculate_risk()
+        grid = np.where(batch.valid, risk_index, np.nan).reshape(n + 1, n + 1)
+        
+        risk = self._interpolate(grid)
+        valid = ~np.isnan(risk)
+        codes = np.searchsorted(FireRiskCalculator.RISK_EDGES, np.nan_to_num(risk), side='left')
+        
+        rgba = np.zeros((self.TILE_SIZE, self.TILE_SIZE, 4), dtype=np.uint8)
+        rgba[..., :3] = self._palette[codes]
+        rgba[..., 3] = np.where(valid, self.opacity, 0)
+        
+        with self._lock:
+            self.rendered += 1
+        return RiskTile(self._encode(rgba), self.ttl if batch.valid.all() else self.partial_ttl)
+    
+    def _interpolate(self, grid):
+        """
+        Interpola bilinearmente a grade de amostras para a resolução do mosaico.
+        
+        Pixels cujas amostras vizinhas incluam um ponto sem observação ficam NaN.
+        """
+        n = grid.shape[0] - 1
+        # Centro de cada pixel em coordenadas da grade de amostras
+        position = (np.arange(self.TILE_SIZE) + 0.5) * n / self.TILE_SIZE
+        index = np.minimum(position.astype(int), n - 1)
+        frac = position - index
+        
+        row_i, col_i = index[:, None], index[None, :]
+        row_f, col_f = frac[:, None], frac[None, :]
+        
+        top = grid[row_i, col_i] * (1 - col_f) + grid[row_i, col_i + 1] * col_f
+        bottom = grid[row_i + 1, col_i] * (1 - col_f) + grid[row_i + 1, col_i + 1] * col_f
+        return top * (1 - row_f) + bottom * row_f
+    
+    def _encode(self, rgba):
+        buffer = io.BytesIO()
+        Image.fromarray(rgba).save(buffer, format='PNG', optimize=True)
+        return buffer.getvalue()
+    
+    def _disk_path(self, key):
+        z, x, y = key
+        return os.path.join(self.cache_dir, str(z), str(x), f"{y}.png")
+    
+    def _read_disk(self, key, now):
+        if self.cache_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            created_at = os.path.getmtime(path)
+            if now - created_at >= self.ttl:
+                return None
+            with open(path, 'rb') as f:
+                png = f.read()
+        except OSError:
+            return None
+        with self._lock:
+            self.disk_hits += 1
+        return RiskTile(png, self.ttl, created_at)
+    
+    def _write_disk(self, key, tile):
+        if self.cache_dir is None:
+            return
+        path = self._disk_path(key)
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Escrever num ficheiro temporário e renomear, para que leitores nunca vejam um PNG parcial
+            temp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(temp_path, 'wb') as f:
+                f.write(tile.png)
+            os.replace(temp_path, path)
+            os.utime(path, (tile.created_at, tile.created_at))
+        except OSError as e:
+            print(f"Erro ao gravar mosaico em disco: {e}")
+    
+    def get_stats(self):
+        """
+        Obtém estatísticas do serviço de mosaicos.
+        
+        Returns:
+            dict: Mosaicos em memória, acertos em memória e em disco e mosaicos renderizados
+        """
+        with self._lock:
+            return {
+                'memory_tiles': len(self._tiles),
+                'memory_hits': self.memory_hits,
+                'disk_hits': self.disk_hits,
+                'rendered': self.rendered,
+                'ttl': self.ttl,
+                'partial_ttl': self.partial_ttl,
+                'cache_dir': self.cache_dir
+            }
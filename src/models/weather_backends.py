@@ -0,0 +1,354 @@
+"""
+Backends de transporte para o serviço OpenWeather: HTTP real, gravação e reprodução.
+"""
+import abc
+import asyncio
+import gzip
+import json
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from src.models.weather_cache import quantize_coordinates
+
+class ReplayMissError(LookupError):
+    """
+    Lançada quando a reprodução não encontra a resposta no arquivo.
+    
+    Não é uma falha da API: não conta para o disjuntor nem leva a servir observações antigas.
+    """
+
+class WeatherBackend(abc.ABC):
+    """
+    Interface dos backends: recebem o endpoint e os parâmetros e devolvem o JSON da resposta.
+    """
+    
+    @abc.abstractmethod
+    def fetch(self, endpoint, params):
+        """
+        Executa a chamada e devolve o corpo JSON da resposta.
+        
+        Args:
+            endpoint (str): URL completa do endpoint
+            params (dict): Parâmetros da query string
+        
+        Returns:
+            dict: Corpo JSON da resposta
+        """
+    
+    async def fetch_async(self, endpoint, params):
+        """
+        Versão assíncrona de fetch. Por padrão executa fetch numa thread separada.
+        """
+        return await asyncio.to_thread(self.fetch, endpoint, params)
+    
+    def get_connection_stats(self):
+        """
+        Obtém estatísticas de conexões do backend, se aplicável.
+        
+        Returns:
+            dict: Estatísticas do backend
+        """
+        return {}
+    
+    def close(self):
+        """
+        Liberta os recursos do backend.
+        """
+
+class HttpWeatherBackend(WeatherBackend):
+    """
+    Backend HTTP com sessão partilhada, pool de conexões keep-alive e novas tentativas.
+    """
+    
+    # Códigos HTTP que justificam uma nova tentativa
+    RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+    
+    def __init__(self, pool_size=10, connect_timeout=3.05, read_timeout=10,
+                 max_retries=3, backoff_factor=0.5):
+        """
+        Inicializa o backend HTTP.
+        
+        Args:
+            pool_size (int): Número máximo de conexões mantidas abertas por host
+            connect_timeout (float): Tempo limite para estabelecer a conexão, em segundos
+            read_timeout (float): Tempo limite para leitura da resposta, em segundos
+            max_retries (int): Número máximo de novas tentativas em erros 429/5xx
+            backoff_factor (float): Fator de espera exponencial entre tentativas
+        """
+        self.timeout = (connect_timeout, read_timeout)
+        
+        # Política de novas tentativas com espera exponencial (respeita Retry-After)
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=max_retries,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=self.RETRY_STATUS_CODES,
+            allowed_methods=frozenset(["GET"]),
+            respect_retry_after_header=True
+        )
+        
+        # Sessão partilhada com pool de conexões keep-alive.
+        # O pool do urllib3 é thread-safe, por isso a mesma sessão serve todas as threads.
+        self._adapter = HTTPAdapter(
+            pool_connections=pool_size,
+            pool_maxsize=pool_size,
+            max_retries=retry,
+            pool_block=False
+        )
+        self.session = requests.Session()
+        self.session.mount("https://", self._adapter)
+        self.session.mount("http://", self._adapter)
+    
+    def fetch(self, endpoint, params):
+        """
+        Executa um GET usando a sessão partilhada.
+        
+        Raises:
+            requests.exceptions.RequestException: Se a chamada falhar após as novas tentativas
+        """
+        response = self.session.get(endpoint, params=params, timeout=self.timeout)
+        response.raise_for_status()  # Lança exceção para códigos de erro HTTP
+        return response.json()
+    
+    def get_connection_stats(self):
+        """
+        Obtém estatísticas de utilização do pool de conexões.
+        
+        Returns:
+            dict: Requisições HTTP, conexões novas e conexões reutilizadas
+        """
+        new_connections = 0
+        pool_requests = 0
+        pools = self._adapter.poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool is None:
+                continue
+            new_connections += pool.num_connections
+            pool_requests += pool.num_requests
+        
+        return {
+            'http_requests': pool_requests,
+            'new_connections': new_connections,
+            'reused_connections': max(0, pool_requests - new_connections)
+        }
+    
+    def close(self):
+        """
+        Fecha a sessão e todas as conexões do pool.
+        """
+        self.session.close()
+
+class WeatherArchive:
+    """
+    Arquivo compacto em disco (JSON Lines comprimido com gzip) de respostas da OpenWeather.
+    
+    Cada resposta é indexada pelo tipo de endpoint, pelas coordenadas quantizadas e
+    pelas unidades (ou pelo nome da cidade), ignorando a chave da API.
+    """
+    
+    def __init__(self, path, resolution=0.01):
+        """
+        Inicializa o arquivo.
+        
+        Args:
+            path (str): Caminho do ficheiro .jsonl.gz
+            resolution (float): Resolução da quantização das coordenadas em graus
+        """
+        self.path = path
+        self.resolution = resolution
+        self._records = None  # Carregado na primeira utilização
+        self._lock = threading.Lock()
+    
+    def make_key(self, endpoint, params):
+        """
+        Constrói a chave do arquivo para uma chamada.
+        
+        Args:
+            endpoint (str): URL completa do endpoint
+            params (dict): Parâmetros da query string
+        
+        Returns:
+            str: Chave da chamada
+        """
+        kind = urlparse(endpoint).path.rstrip("/").rsplit("/", 1)[-1]
+        units = params.get("units", "metric")
+        if "lat" in params and "lon" in params:
+            qlat, qlon = quantize_coordinates(float(params["lat"]), float(params["lon"]), self.resolution)
+            return f"{kind}|{qlat}|{qlon}|{units}"
+        return f"{kind}|q={str(params.get('q', '')).lower()}|{units}"
+    
+    def _load(self):
+        """
+        Lê o arquivo do disco, se ainda não tiver sido lido.
+        """
+        if self._records is not None:
+            return
+        
+        self._records = {}
+        if not os.path.exists(self.path):
+            return
+        
+        with gzip.open(self.path, "rt", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                record = json.loads(line)
+                self._records[record["key"]] = record["payload"]
+    
+    def get(self, endpoint, params):
+        """
+        Obtém a resposta arquivada para uma chamada.
+        
+        Returns:
+            dict: Resposta arquivada ou None se não existir
+        """
+        key = self.make_key(endpoint, params)
+        with self._lock:
+            self._load()
+            return self._records.get(key)
+    
+    def put(self, endpoint, params, payload):
+        """
+        Arquiva a resposta de uma chamada (acrescenta ao ficheiro).
+        
+        Args:
+            endpoint (str): URL completa do endpoint
+            params (dict): Parâmetros da query string
+            payload (dict): Corpo JSON da resposta
+        """
+        key = self.make_key(endpoint, params)
+        line = json.dumps({"key": key, "payload": payload}, separators=(",", ":"), ensure_ascii=False)
+        
+        with self._lock:
+            self._load()
+            self._records[key] = payload
+            
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            # Cada escrita gera um membro gzip independente; o gzip lê-os em sequência
+            with gzip.open(self.path, "at", encoding="utf-8") as f:
+                f.write(line + "\n")
+    
+    def __len__(self):
+        with self._lock:
+            self._load()
+            return len(self._records)
+
+class RecordingWeatherBackend(WeatherBackend):
+    """
+    Backend que delega noutro backend e grava todas as respostas num WeatherArchive.
+    """
+    
+    def __init__(self, inner, archive):
+        """
+        Inicializa o backend de gravação.
+        
+        Args:
+            inner (WeatherBackend): Backend que executa as chamadas reais
+            archive (WeatherArchive): Arquivo onde as respostas são gravadas
+        """
+        self.inner = inner
+        self.archive = archive
+    
+    def fetch(self, endpoint, params):
+        payload = self.inner.fetch(endpoint, params)
+        self.archive.put(endpoint, params, payload)
+        return payload
+    
+    def get_connection_stats(self):
+        return self.inner.get_connection_stats()
+    
+    def close(self):
+        self.inner.close()
+
+class ReplayWeatherBackend(WeatherBackend):
+    """
+    Backend que reproduz respostas gravadas, sem acesso à rede.
+    
+    Permite injetar latência e uma taxa de erros para testes de carga reprodutíveis.
+    """
+    
+    def __init__(self, archive, latency=0.0, latency_jitter=0.0, error_rate=0.0, seed=None):
+        """
+        Inicializa o backend de reprodução.
+        
+        Args:
+            archive (WeatherArchive): Arquivo com as respostas gravadas
+            latency (float): Latência base injetada em cada chamada, em segundos
+            latency_jitter (float): Variação aleatória máxima somada à latência, em segundos
+            error_rate (float): Probabilidade (0 a 1) de uma chamada falhar
+            seed (int, optional): Semente do gerador aleatório, para execuções reprodutíveis
+        """
+        self.archive = archive
+        self.latency = latency
+        self.latency_jitter = latency_jitter
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        
+        self.replayed = 0
+        self.missing = 0
+        self.injected_errors = 0
+    
+    def _next_outcome(self):
+        """
+        Sorteia a latência e se a próxima chamada deve falhar.
+        
+        Returns:
+            tuple: (latência em segundos, True se a chamada deve falhar)
+        """
+        with self._lock:
+            delay = self.latency + self._random.uniform(0, self.latency_jitter)
+            fail = self._random.random() < self.error_rate
+        return delay, fail
+    
+    def _resolve(self, endpoint, params, fail):
+        """
+        Obtém a resposta arquivada ou lança o erro correspondente.
+        """
+        if fail:
+            with self._lock:
+                self.injected_errors += 1
+            raise requests.exceptions.ConnectionError(f"Erro injetado na reprodução de {endpoint}")
+        
+        payload = self.archive.get(endpoint, params)
+        if payload is None:
+            with self._lock:
+                self.missing += 1
+            raise ReplayMissError(
+                f"Resposta não encontrada no arquivo para {self.archive.make_key(endpoint, params)}"
+            )
+        
+        with self._lock:
+            self.replayed += 1
+        return payload
+    
+    def fetch(self, endpoint, params):
+        delay, fail = self._next_outcome()
+        if delay > 0:
+            time.sleep(delay)
+        return self._resolve(endpoint, params, fail)
+    
+    async def fetch_async(self, endpoint, params):
+        delay, fail = self._next_outcome()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        return self._resolve(endpoint, params, fail)
+    
+    def get_connection_stats(self):
+        with self._lock:
+            return {
+                'replayed': self.replayed,
+                'missing': self.missing,
+                'injected_errors': self.injected_errors
+            }
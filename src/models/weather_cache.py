@@ -0,0 +1,220 @@
+"""
+Cache em memória para dados meteorológicos, indexado por coordenadas quantizadas.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+def quantize_coordinates(lat, lon, resolution=0.01):
+    """
+    Ajusta uma coordenada à grelha da resolução indicada.
+    
+    Args:
+        lat (float): Latitude
+        lon (float): Longitude
+        resolution (float): Resolução da grelha em graus
+    
+    Returns:
+        tuple: Índices inteiros (lat, lon) da célula da grelha
+    """
+    return (int(round(lat / resolution)), int(round(lon / resolution)))
+
+class WeatherCache:
+    """
+    Cache LRU com tempo de vida (TTL) para respostas da API OpenWeather.
+    
+    As chaves são formadas pelo tipo de dado, pela coordenada ajustada à resolução
+    configurada e pelas unidades, de modo que pedidos para pontos muito próximos
+    partilham a mesma entrada. Se for indicado um índice espacial, as observações
+    atuais em unidades métricas são mantidas nele à medida que entram e saem do cache.
+    """
+    
+    # A OpenWeather atualiza as observações aproximadamente a cada 10 minutos
+    DEFAULT_TTL = 600
+    
+    def __init__(self, resolution=0.01, ttl=DEFAULT_TTL, max_entries=5000, stale_ttl=0, spatial_index=None):
+        """
+        Inicializa o cache.
+        
+        Args:
+            resolution (float): Resolução da quantização das coordenadas em graus
+            ttl (float): Tempo de vida padrão das entradas em segundos
+            max_entries (int): Número máximo de entradas antes da remoção LRU
+            stale_ttl (float): Tempo, em segundos, durante o qual uma entrada expirada
+                               ainda pode ser servida como desatualizada (get_stale)
+            spatial_index (SpatialIndex, optional): Índice atualizado com as observações guardadas
+        """
+        self.resolution = resolution
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.stale_ttl = stale_ttl
+        self.spatial_index = spatial_index
+        
+        self._entries = OrderedDict()  # {chave: (valor, expira_em)}
+        self._lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.stale_hits = 0
+    
+    def make_key(self, lat, lon, units="metric", kind="weather"):
+        """
+        Constrói a chave de cache para uma coordenada.
+        
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            units (str): Unidades de medida
+            kind (str): Tipo de dado (weather, forecast, ...)
+        
+        Returns:
+            tuple: Chave de cache
+        """
+        return (kind,) + quantize_coordinates(lat, lon, self.resolution) + (units,)
+    
+    def get(self, lat, lon, units="metric", kind="weather"):
+        """
+        Obtém uma entrada válida do cache.
+        
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            units (str): Unidades de medida
+            kind (str): Tipo de dado
+        
+        Returns:
+            object: Valor armazenado ou None se ausente ou expirado
+        """
+        key = self.make_key(lat, lon, units, kind)
+        now = time.time()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            
+            value, expires_at = entry
+            if expires_at <= now:
+                # Manter a entrada expirada enquanto ainda puder ser servida como desatualizada
+                if expires_at + self.stale_ttl <= now:
+                    del self._entries[key]
+                    self.expirations += 1
+                    self._unindex(key)
+                self.misses += 1
+                return None
+            
+            # Marcar como usado recentemente
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+    
+    def get_stale(self, lat, lon, units="metric", kind="weather"):
+        """
+        Obtém uma entrada mesmo que já tenha expirado, dentro da janela stale_ttl.
+        
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            units (str): Unidades de medida
+            kind (str): Tipo de dado
+        
+        Returns:
+            object: Valor armazenado ou None se ausente ou fora da janela
+        """
+        key = self.make_key(lat, lon, units, kind)
+        now = time.time()
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[1] + self.stale_ttl <= now:
+                return None
+            
+            self.stale_hits += 1
+            return entry[0]
+    
+    def expires_at(self, lat, lon, units="metric", kind="weather"):
+        """
+        Obtém o instante em que a entrada de uma coordenada expira, sem contar como acesso.
+        
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            units (str): Unidades de medida
+            kind (str): Tipo de dado
+        
+        Returns:
+            float: Instante de expiração (epoch) ou None se a entrada não existir
+        """
+        key = self.make_key(lat, lon, units, kind)
+        with self._lock:
+            entry = self._entries.get(key)
+            return entry[1] if entry is not None else None
+    
+    def put(self, lat, lon, value, units="metric", kind="weather", ttl=None):
+        """
+        Armazena um valor no cache.
+        
+        Args:
+            lat (float): Latitude
+            lon (float): Longitude
+            value (object): Valor a armazenar
+            units (str): Unidades de medida
+            kind (str): Tipo de dado
+            ttl (float, optional): Tempo de vida específico desta entrada em segundos
+        """
+        key = self.make_key(lat, lon, units, kind)
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            if self.spatial_index is not None and kind == "weather" and units == "metric":
+                self.spatial_index.insert(key, lat, lon, value, expires_at)
+            
+            # Remover as entradas menos usadas recentemente
+            while len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self.evictions += 1
+                self._unindex(evicted_key)
+    
+    def _unindex(self, key):
+        """
+        Retira uma entrada do índice espacial. Deve ser chamado com o lock.
+        """
+        if self.spatial_index is not None:
+            self.spatial_index.remove(key)
+    
+    def clear(self):
+        """
+        Remove todas as entradas do cache.
+        """
+        with self._lock:
+            self._entries.clear()
+            if self.spatial_index is not None:
+                self.spatial_index.clear()
+    
+    def get_stats(self):
+        """
+        Obtém estatísticas de utilização do cache.
+        
+        Returns:
+            dict: Acertos, falhas, remoções e ocupação do cache
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'resolution': self.resolution,
+                'ttl': self.ttl,
+                'stale_ttl': self.stale_ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions,
+                'expirations': self.expirations,
+                'stale_hits': self.stale_hits
+            }
@@ -1,54 +1,154 @@
 """
 Modelo para armazenamento e processamento de dados meteorológicos.
 """
+import time
+import numpy as np
+from src.models.fire_risk import FireRiskCalculator
 
 class WeatherData:
     """
     Classe para armazenar e processar dados meteorológicos obtidos da API OpenWeather.
+    
+    Os campos usados pela aplicação são lidos uma única vez na criação e guardados em
+    atributos com __slots__; o JSON original só é mantido se for pedido (keep_raw).
     """
     
-    def __init__(self, data):
+    __slots__ = (
+        'temperature',
+        'humidity',
+        'wind_speed',
+        'precipitation',
+        'weather_description',
+        'location_name',
+        'coordinates',
+        'fetched_at',
+        'stale',
+        '_raw'
+    )
+    
+    def __init__(self, data, fetched_at=None, keep_raw=False):
         """
         Inicializa um objeto WeatherData com os dados da API OpenWeather.
         
         Args:
             data (dict): Dados brutos da API OpenWeather
+            fetched_at (float, optional): Instante (epoch) em que os dados foram obtidos. Padrão: agora.
+            keep_raw (bool, optional): Manter o JSON original acessível em data
         """
-        self.data = data
+        main = data.get('main', {})
+        weather = data.get('weather', [{}])
+        coord = data.get('coord', {})
         
-    @property
-    def temperature(self):
-        """Retorna a temperatura em Celsius."""
-        return self.data.get('main', {}).get('temp')
+        # Temperatura em Celsius, humidade em %, vento em m/s e precipitação em mm nas últimas 3 horas
+        self.temperature = main.get('temp')
+        self.humidity = main.get('humidity')
+        self.wind_speed = data.get('wind', {}).get('speed')
+        self.precipitation = data.get('rain', {}).get('3h', 0)
+        self.weather_description = weather[0].get('description') if weather else ""
+        self.location_name = data.get('name', '')
+        self.coordinates = (coord.get('lat'), coord.get('lon'))
+        
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        # Verdadeiro quando a observação é servida depois de expirar no cache
+        self.stale = False
+        self._raw = data if keep_raw else None
     
     @property
-    def humidity(self):
-        """Retorna a humidade em percentagem."""
-        return self.data.get('main', {}).get('humidity')
+    def data(self):
+        """
+        Retorna o JSON original, se mantido, ou um equivalente mínimo com os campos lidos.
+        """
+        if self._raw is not None:
+            return self._raw
+        
+        lat, lon = self.coordinates
+        return {
+            'coord': {'lat': lat, 'lon': lon},
+            'name': self.location_name,
+            'main': {'temp': self.temperature, 'humidity': self.humidity},
+            'wind': {'speed': self.wind_speed},
+            'rain': {'3h': self.precipitation},
+            'weather': [{'description': self.weather_description}]
+        }
     
     @property
-    def wind_speed(self):
-        """Retorna a velocidade do vento em m/s."""
-        return self.data.get('wind', {}).get('speed')
+    def age(self):
+        """Retorna a idade da observação em segundos."""
+        return time.time() - self.fetched_at
     
-    @property
-    def precipitation(self):
-        """Retorna a precipitação em mm nas últimas 3 horas, se disponível."""
-        return self.data.get('rain', {}).get('3h', 0)
+    def as_stale(self):
+        """
+        Obtém uma cópia da observação marcada como desatualizada.
+        
+        Returns:
+            WeatherData: Cópia com stale=True, sem alterar o objeto em cache
+        """
+        stale = object.__new__(WeatherData)
+        for name in self.__slots__:
+            setattr(stale, name, getattr(self, name))
+        stale.stale = True
+        return stale
+
+class WeatherBatch:
+    """
+    Observações de vários pontos em formato de colunas (struct-of-arrays).
     
-    @property
-    def weather_description(self):
-        """Retorna a descrição do clima."""
-        weather_data = self.data.get('weather', [{}])
-        return weather_data[0].get('description') if weather_data else ""
+    Cada grandeza fica num array NumPy contíguo, o que permite calcular o risco de
+    uma grade inteira numa só operação vetorizada. Pontos sem observação ficam
+    marcados como inválidos em valid.
+    """
     
-    @property
-    def location_name(self):
-        """Retorna o nome da localização."""
-        return self.data.get('name', '')
+    __slots__ = (
+        'lat',
+        'lon',
+        'temperature',
+        'humidity',
+        'wind_speed',
+        'precipitation',
+        'fetched_at',
+        'valid'
+    )
     
-    @property
-    def coordinates(self):
-        """Retorna as coordenadas (latitude, longitude) da localização."""
-        coord = self.data.get('coord', {})
-        return (coord.get('lat'), coord.get('lon'))
+    def __init__(self, coordinates, observations):
+        """
+        Constrói o lote a partir das observações de cada ponto.
+        
+        Args:
+            coordinates (list): Tuplas (lat, lon) dos pontos
+            observations (list): WeatherData de cada ponto, ou None se o ponto falhou.
+                                 Observações sem temperatura, humidade ou vento são inválidas.
+        """
+        count = len(coordinates)
+        self.lat = np.array([lat for lat, _ in coordinates], dtype=np.float64)
+        self.lon = np.array([lon for _, lon in coordinates], dtype=np.float64)
+        self.temperature = np.zeros(count)
+        self.humidity = np.zeros(count)
+        self.wind_speed = np.zeros(count)
+        self.precipitation = np.zeros(count)
+        self.fetched_at = np.zeros(count)
+        self.valid = np.zeros(count, dtype=bool)
+        
+        for i, weather_data in enumerate(observations):
+            if weather_data is None or None in (weather_data.temperature, weather_data.humidity,
+                                                weather_data.wind_speed):
+                continue
+            self.temperature[i] = weather_data.temperature
+            self.humidity[i] = weather_data.humidity
+            self.wind_speed[i] = weather_data.wind_speed
+            self.precipitation[i] = weather_data.precipitation or 0
+            self.fetched_at[i] = weather_data.fetched_at
+            self.valid[i] = True
+    
+    def __len__(self):
+        return len(self.lat)
+    
+    def calculate_risk(self):
+        """
+        Calcula o risco de incêndio de todos os pontos do lote.
+        
+        Returns:
+            tuple: (índices de risco, códigos de categoria, cores), um elemento por ponto
+        """
+        return FireRiskCalculator.calculate_risk_batch(
+            self.temperature, self.humidity, self.wind_speed, self.precipitation
+        )
@@ -2,6 +2,7 @@
 Rotas para o sistema de despacho de emergências.
 Implementa APIs para fila, heap, pilha, lista ligada, árvore e grafo.
 """
+from datetime import datetime
 from flask import Blueprint, render_template, jsonify, request
 from src.models.emergency_dispatch_service import EmergencyDispatchService
 
@@ -11,6 +12,22 @@ emergency_dispatch_bp = Blueprint('emergency_dispatch', __name__)
 # Inicializar serviço de despacho de emergência
 dispatch_service = EmergencyDispatchService()
 
+def _page_params():
+    """
+    Lê os parâmetros de paginação limit e cursor (ID do último chamado lido).
+    
+    Returns:
+        tuple: (limit, cursor ou None)
+    
+    Raises:
+        ValueError: Se algum parâmetro for inválido
+    """
+    limit = int(request.args.get('limit', 50))
+    if not 1 <= limit <= 500:
+        raise ValueError("limit fora do intervalo")
+    cursor = request.args.get('cursor')
+    return limit, int(cursor) if cursor is not None else None
+
 @emergency_dispatch_bp.route('/emergency-dispatch', methods=['GET'])
 def show_emergency_dispatch():
     """
@@ -27,12 +44,48 @@ def get_emergency_calls():
     """
     Endpoint para obter chamados de emergência em ordem de chegada.
     
+    Retorna uma página dos chamados em memória (em aberto e resolvidos recentes):
+    {items, next_cursor, total}. Sem parâmetros, retorna a primeira página.
+    
+    Query params:
+        limit (int, optional): Chamados por página (1-500, padrão 50)
+        cursor (int, optional): Valor de next_cursor da página anterior (ID do último chamado lido)
+        since (str, optional): Só chamados criados depois deste instante (ISO 8601)
+    
+    Returns:
+        JSON: Chamados de emergência
+    """
+    try:
+        limit, cursor = _page_params()
+        since = request.args.get('since')
+        if since is not None:
+            since = datetime.fromisoformat(since).isoformat()
+    except ValueError:
+        return jsonify({
+            "success": False,
+            "message": "Parâmetros inválidos: limit entre 1 e 500, cursor inteiro e since em ISO 8601"
+        }), 400
+    
+    return jsonify(dispatch_service.get_emergency_calls(limit, cursor, since))
+
+@emergency_dispatch_bp.route('/api/dispatch/calls/archive', methods=['GET'])
+def get_archived_calls():
+    """
+    Endpoint para obter chamados resolvidos já arquivados (requer DISPATCH_ARCHIVE_DB).
+    
+    Query params:
+        limit (int, optional): Chamados por página (1-500, padrão 50)
+        cursor (int, optional): Valor de next_cursor da página anterior
+    
     Returns:
-        JSON: Lista de chamados de emergência
+        JSON: {items, next_cursor}
     """
-    # Retorna os chamados da fila em ordem de chegada
-    calls = list(dispatch_service.emergency_queue)
-    return jsonify(calls)
+    try:
+        limit, cursor = _page_params()
+    except ValueError:
+        return jsonify({"success": False, "message": "Parâmetros inválidos: limit entre 1 e 500 e cursor inteiro"}), 400
+    
+    return jsonify(dispatch_service.get_archived_calls(limit, cursor))
 
 @emergency_dispatch_bp.route('/api/dispatch/calls', methods=['POST'])
 def add_emergency_call():
@@ -63,17 +116,108 @@ def add_emergency_call():
         "emergency": emergency
     })
 
+@emergency_dispatch_bp.route('/api/dispatch/calls/<int:emergency_id>', methods=['GET'])
+def get_emergency_call(emergency_id):
+    """
+    Endpoint para obter um chamado pelo ID.
+    
+    Args:
+        emergency_id (int): ID do chamado
+    
+    Returns:
+        JSON: Dados do chamado
+    """
+    emergency = dispatch_service.get_emergency_by_id(emergency_id)
+    if not emergency:
+        return jsonify({"success": False, "message": "Chamado não encontrado"}), 404
+    return jsonify(emergency)
+
+@emergency_dispatch_bp.route('/api/dispatch/calls/<int:emergency_id>/priority', methods=['PUT'])
+def update_emergency_priority(emergency_id):
+    """
+    Endpoint para reavaliar a prioridade de um chamado em aberto.
+    
+    Args:
+        emergency_id (int): ID do chamado
+    
+    Request body:
+        severidade (int): Novo nível de severidade (1-5)
+        tipo_vegetacao (str, optional): Novo tipo de vegetação
+    
+    Returns:
+        JSON: Dados do chamado atualizado
+    """
+    data = request.get_json(silent=True) or {}
+    
+    try:
+        severidade = int(data.get('severidade'))
+        if not 1 <= severidade <= 5:
+            raise ValueError("severidade fora do intervalo")
+    except (TypeError, ValueError):
+        return jsonify({"success": False, "message": "Parâmetro 'severidade' deve ser um inteiro entre 1 e 5"}), 400
+    tipo_vegetacao = data.get('tipo_vegetacao')
+    
+    emergency = dispatch_service.update_emergency_priority(emergency_id, severidade, tipo_vegetacao)
+    if not emergency:
+        return jsonify({"success": False, "message": "Chamado em aberto não encontrado"}), 404
+    
+    return jsonify({
+        "success": True,
+        "message": "Prioridade do chamado atualizada com sucesso",
+        "emergency": emergency
+    })
+
+@emergency_dispatch_bp.route('/api/dispatch/calls/<int:emergency_id>/resolve', methods=['POST'])
+def resolve_emergency_call(emergency_id):
+    """
+    Endpoint para marcar um chamado como resolvido, retirando-o da priorização.
+    
+    Args:
+        emergency_id (int): ID do chamado
+    
+    Returns:
+        JSON: Resultado da atualização
+    """
+    success = dispatch_service.resolve_emergency(emergency_id)
+    
+    return jsonify({
+        "success": success,
+        "message": "Chamado resolvido com sucesso" if success else "Chamado não encontrado"
+    })
+
 # API para Heap - Priorização de chamados
 @emergency_dispatch_bp.route('/api/dispatch/prioritized', methods=['GET'])
 def get_prioritized_calls():
     """
-    Endpoint para obter chamados priorizados pelo heap.
+    Endpoint para obter chamados priorizados.
+    
+    Sem parâmetros, retorna a lista completa. Com limit, cursor ou status, retorna
+    uma página: {items, next_cursor, total}.
+    
+    Query params:
+        limit (int, optional): Chamados por página (1-500, padrão 50); limit=K dá o top-K
+        cursor (str, optional): Valor de next_cursor da página anterior
+        status (str, optional): Só chamados com este status (ex.: pendente)
     
     Returns:
-        JSON: Lista de chamados ordenados por prioridade
+        JSON: Chamados em aberto ordenados por prioridade
     """
-    calls = dispatch_service.get_prioritized_calls()
-    return jsonify(calls)
+    if not any(param in request.args for param in ('limit', 'cursor', 'status')):
+        return jsonify(dispatch_service.get_prioritized_calls())
+    
+    try:
+        limit = int(request.args.get('limit', 50))
+        if not 1 <= limit <= 500:
+            raise ValueError
+    except ValueError:
+        return jsonify({"success": False, "message": "Parâmetro 'limit' deve ser um inteiro entre 1 e 500"}), 400
+    
+    try:
+        page = dispatch_service.get_prioritized_page(limit, request.args.get('cursor'), request.args.get('status'))
+    except ValueError:
+        return jsonify({"success": False, "message": "Cursor inválido"}), 400
+    
+    return jsonify(page)
 
 # API para Pilha (Stack) - Histórico de ações por equipe
 @emergency_dispatch_bp.route('/api/dispatch/teams/<int:team_id>/actions', methods=['GET'])
@@ -124,10 +268,18 @@ def get_affected_areas():
     """
     Endpoint para obter áreas afetadas.
     
+    Query params:
+        status (str, optional): Só áreas com este status
+        format (str, optional): 'compact' para {fields, rows} em vez de uma lista de objetos
+    
     Returns:
         JSON: Lista de áreas afetadas
     """
-    areas = dispatch_service.get_affected_areas()
+    fmt = request.args.get('format', 'json')
+    if fmt not in ('json', 'compact'):
+        return jsonify({"success": False, "message": "Parâmetro 'format' deve ser 'json' ou 'compact'"}), 400
+    
+    areas = dispatch_service.get_affected_areas(request.args.get('status'), compact=fmt == 'compact')
     return jsonify(areas)
 
 @emergency_dispatch_bp.route('/api/dispatch/areas/<int:emergency_id>', methods=['PUT'])
@@ -155,6 +307,24 @@ def update_area_status(emergency_id):
         "message": "Status da área atualizado com sucesso" if success else "Área não encontrada"
     })
 
+@emergency_dispatch_bp.route('/api/dispatch/areas/<int:emergency_id>', methods=['DELETE'])
+def remove_affected_area(emergency_id):
+    """
+    Endpoint para remover uma área da lista de áreas afetadas.
+    
+    Args:
+        emergency_id (int): ID do chamado
+    
+    Returns:
+        JSON: Resultado da remoção
+    """
+    success = dispatch_service.remove_affected_area(emergency_id)
+    
+    return jsonify({
+        "success": success,
+        "message": "Área removida com sucesso" if success else "Área não encontrada"
+    })
+
 # API para Árvore - Hierarquia de regiões
 @emergency_dispatch_bp.route('/api/dispatch/regions', methods=['GET'])
 def get_region_hierarchy():
@@ -212,6 +382,71 @@ def calculate_route():
     
     return jsonify(route)
 
+@emergency_dispatch_bp.route('/api/dispatch/graph', methods=['GET'])
+def get_location_graph():
+    """
+    Endpoint para obter o grafo de locais conectados.
+    
+    Returns:
+        JSON: Grafo {origem: {destino: distância}}
+    """
+    return jsonify(dispatch_service.location_graph)
+
+@emergency_dispatch_bp.route('/api/dispatch/graph/routes', methods=['PUT'])
+def update_graph_route():
+    """
+    Endpoint para criar ou alterar uma ligação do grafo.
+    
+    Request body:
+        origem (str): Local de origem
+        destino (str): Local de destino
+        distancia (float): Distância da ligação
+        bidirecional (bool, optional): Aplicar também no sentido inverso (padrão: true)
+    
+    Returns:
+        JSON: Resultado da atualização
+    """
+    data = request.get_json(silent=True) or {}
+    
+    origem = data.get('origem')
+    destino = data.get('destino')
+    try:
+        distancia = float(data.get('distancia'))
+    except (TypeError, ValueError):
+        distancia = None
+    if not origem or not destino or distancia is None or not 0 <= distancia < float('inf'):
+        return jsonify({"success": False, "message": "Informe origem, destino e uma distância não negativa"}), 400
+    
+    dispatch_service.update_route(origem, destino, distancia, bool(data.get('bidirecional', True)))
+    
+    return jsonify({
+        "success": True,
+        "message": "Ligação atualizada com sucesso"
+    })
+
+@emergency_dispatch_bp.route('/api/dispatch/graph/routes', methods=['DELETE'])
+def remove_graph_route():
+    """
+    Endpoint para remover uma ligação do grafo.
+    
+    Request body:
+        origem (str): Local de origem
+        destino (str): Local de destino
+        bidirecional (bool, optional): Remover também no sentido inverso (padrão: true)
+    
+    Returns:
+        JSON: Resultado da remoção
+    """
+    data = request.get_json(silent=True) or {}
+    
+    success = dispatch_service.remove_route(data.get('origem'), data.get('destino'),
+                                            bool(data.get('bidirecional', True)))
+    
+    return jsonify({
+        "success": success,
+        "message": "Ligação removida com sucesso" if success else "Ligação não encontrada"
+    })
+
 # API para Equipes
 @emergency_dispatch_bp.route('/api/dispatch/teams', methods=['GET'])
 def get_teams():
@@ -1,9 +1,18 @@
 """
 Rotas para a API de risco de incêndio.
 """
-from flask import Blueprint, request, jsonify, render_template
+from flask import Blueprint, Response, request, jsonify, render_template, stream_with_context
 from src.models.fire_risk_controller import FireRiskController
+from src.models.rate_limiter import RateLimitExceeded
+from src.models.circuit_breaker import CircuitOpenError
+from src.models.job_manager import JobQueueFull
+from src.models.weather_backends import ReplayMissError
+from src.models import risk_encoding
+import json
+import math
 import traceback
+import httpx
+import requests
 
 # Criar blueprint para as rotas de risco de incêndio
 fire_risk_bp = Blueprint("fire_risk", __name__)
@@ -11,8 +20,118 @@ fire_risk_bp = Blueprint("fire_risk", __name__)
 # Inicializar controlador
 controller = FireRiskController()
 
+def _rate_limited_response(error):
+    """
+    Prepara a resposta 429 para um pedido rejeitado pela quota da OpenWeather.
+    """
+    response = jsonify({
+        "error": str(error),
+        "retry_after": math.ceil(error.estimated_wait)
+    })
+    response.status_code = 429
+    response.headers["Retry-After"] = str(math.ceil(error.estimated_wait))
+    return response
+
+def _unavailable_response(error):
+    """
+    Prepara a resposta 503 para um pedido sem dados enquanto a OpenWeather está indisponível.
+    """
+    response = jsonify({
+        "error": str(error),
+        "retry_after": math.ceil(error.retry_after)
+    })
+    response.status_code = 503
+    response.headers["Retry-After"] = str(math.ceil(error.retry_after))
+    return response
+
+def _region_body_error(data):
+    """
+    Valida o corpo de um pedido de região.
+    
+    Returns:
+        str: Mensagem de erro, ou None se o corpo for válido
+    """
+    if not data or "bounds" not in data:
+        return "Corpo da requisição inválido ou faltando 'bounds'."
+    if not all(k in data["bounds"] for k in ("north", "south", "east", "west")):
+        return "Objeto 'bounds' incompleto. Necessário: north, south, east, west."
+    if data.get("mode", "grid") not in ("grid", "adaptive"):
+        return "Parâmetro 'mode' inválido. Use 'grid' ou 'adaptive'."
+    return None
+
+def _includes(value):
+    """
+    Lê o parâmetro include, como lista ou texto separado por vírgulas.
+    
+    Returns:
+        set: Campos opcionais pedidos (por exemplo, {"maps"})
+    """
+    if not value:
+        return set()
+    if isinstance(value, str):
+        value = value.split(",")
+    return {str(item).strip().lower() for item in value if str(item).strip()}
+
+def _region_format(fmt=None):
+    """
+    Escolhe o formato da resposta: o parâmetro format, se indicado, ou o cabeçalho Accept.
+    
+    Returns:
+        str: Nome do formato (json, columnar, msgpack ou npz)
+    """
+    if fmt:
+        return str(fmt).strip().lower()
+    mimetypes = {mimetype: name for name, mimetype in risk_encoding.FORMATS.items()}
+    best = request.accept_mimetypes.best_match(list(mimetypes), default="application/json")
+    return mimetypes[best]
+
+def _encoded_response(result, fmt):
+    """
+    Prepara a resposta de um resultado de região no formato pedido, comprimida se o cliente aceitar.
+    """
+    try:
+        body, mimetype = risk_encoding.encode(result, fmt)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 406
+    
+    body, encoding = risk_encoding.compress(body, request.accept_encodings)
+    response = Response(body, mimetype=mimetype)
+    if encoding:
+        response.headers["Content-Encoding"] = encoding
+    response.vary.update(("Accept", "Accept-Encoding"))
+    if fmt == "npz":
+        response.headers["Content-Disposition"] = f"attachment; filename=region-{result.get('result_id', 'risk')}.npz"
+    return response
+
+def _ndjson_response(lines):
+    """
+    Prepara uma resposta em fluxo NDJSON a partir de um gerador de linhas.
+    """
+    response = Response(stream_with_context(lines), mimetype="application/x-ndjson")
+    # Evitar que proxies acumulem o fluxo antes de o enviar
+    response.headers["X-Accel-Buffering"] = "no"
+    response.headers["Cache-Control"] = "no-cache"
+    return response
+
+def _adaptive_params(data):
+    """
+    Extrai os parâmetros da amostragem adaptativa do corpo de um pedido de região.
+    
+    Returns:
+        dict: Argumentos para a amostragem adaptativa; omitidos usam os padrões do controlador
+    
+    Raises:
+        ValueError: Se algum parâmetro não for numérico
+    """
+    return {
+        "tolerance": float(data["tolerance"]) if "tolerance" in data else None,
+        "max_depth": int(data["max_depth"]) if "max_depth" in data else None,
+        "max_calls": int(data["max_calls"]) if "max_calls" in data else None,
+        "min_depth": int(data.get("min_depth", 1))
+    }
+
 @fire_risk_bp.route("/api/risk/location", methods=["GET"])
-def get_risk_for_location():
+async def get_risk_for_location():
     """
     Endpoint para obter o risco de incêndio para uma localização específica.
     
@@ -21,6 +140,8 @@ def get_risk_for_location():
         lon (float): Longitude da localização
         city (str, optional): Nome da cidade
         country (str, optional): Código do país
+        tolerance_km (float, optional): Usar a observação recente em cache mais próxima,
+                                        até esta distância, em vez de chamar a API
     
     Returns:
         JSON: Dados de risco de incêndio para a localização
@@ -30,8 +151,12 @@ def get_risk_for_location():
         if "lat" in request.args and "lon" in request.args:
             lat = float(request.args.get("lat", 0))
             lon = float(request.args.get("lon", 0))
+            tolerance_km = request.args.get("tolerance_km")
+            tolerance_km = float(tolerance_km) if tolerance_km is not None else None
+            if tolerance_km is not None and not 0 <= tolerance_km <= 50:
+                return jsonify({"error": "tolerance_km deve estar entre 0 e 50."}), 400
             
-            result = controller.calculate_fire_risk_for_location(lat, lon)
+            result = await controller.calculate_fire_risk_for_location_async(lat, lon, tolerance_km=tolerance_km)
             return jsonify(result)
         elif "city" in request.args:
             # Implementação futura para busca por cidade
@@ -39,16 +164,20 @@ def get_risk_for_location():
             city_name = request.args.get("city")
             country_code = request.args.get("country")
             try:
-                weather_data = controller.weather_service.get_weather_by_city(city_name, country_code)
+                weather_data = await controller.get_weather_by_city_async(city_name, country_code)
                 lat, lon = weather_data.coordinates
                 if lat is not None and lon is not None:
                     # Se obtivermos coordenadas, calculamos o risco regional
                     radius = float(request.args.get("radius", 0.5))
                     num_points = int(request.args.get("num_points", 8))
-                    result = controller.calculate_regional_fire_risk(lat, lon, radius, num_points)
+                    result = await controller.calculate_regional_fire_risk_async(lat, lon, radius, num_points)
                     return jsonify(result)
                 else:
                     return jsonify({"error": f"Não foi possível encontrar coordenadas para {city_name}"}), 404
+            except RateLimitExceeded as rle:
+                return _rate_limited_response(rle)
+            except CircuitOpenError as coe:
+                return _unavailable_response(coe)
             except Exception as city_error:
                 print(f"Erro ao buscar por cidade {city_name}: {city_error}")
                 return jsonify({"error": f"Erro ao processar a cidade {city_name}"}), 500
@@ -57,46 +186,270 @@ def get_risk_for_location():
     except ValueError as ve:
         print(f"Erro de valor nos parâmetros: {ve}")
         return jsonify({"error": "Parâmetros inválidos. Latitude e longitude devem ser números."}), 400
+    except RateLimitExceeded as rle:
+        return _rate_limited_response(rle)
+    except CircuitOpenError as coe:
+        return _unavailable_response(coe)
+    except ReplayMissError as rme:
+        print(f"Observação em falta no arquivo de reprodução: {rme}")
+        return jsonify({"error": "Observação não encontrada no arquivo de reprodução."}), 404
+    except (requests.exceptions.RequestException, httpx.HTTPError) as ue:
+        print(f"OpenWeather indisponível em /api/risk/location: {ue}")
+        return jsonify({"error": "Serviço meteorológico indisponível e sem observação anterior para este local."}), 503
     except Exception as e:
         print(f"Erro inesperado em /api/risk/location: {e}")
         traceback.print_exc()
         return jsonify({"error": "Ocorreu um erro interno no servidor."}), 500
 
+@fire_risk_bp.route("/api/risk/observations", methods=["GET"])
+def get_cached_observations():
+    """
+    Endpoint para obter o risco das observações recentes já em cache numa área, sem chamar a API.
+    
+    Query params:
+        north, south, east, west (float): Limites da área
+    
+    Returns:
+        JSON: Pontos com risco e idade da observação
+    """
+    try:
+        bounds = {k: float(request.args[k]) for k in ("north", "south", "east", "west")}
+    except (KeyError, ValueError):
+        return jsonify({"error": "Parâmetros inválidos. Necessário: north, south, east, west."}), 400
+    if bounds["south"] > bounds["north"] or bounds["west"] > bounds["east"]:
+        return jsonify({"error": "Limites inválidos: south <= north e west <= east."}), 400
+    
+    points = controller.cached_observations_in_bounds(bounds)
+    return jsonify({"bounds": bounds, "count": len(points), "points": points})
+
 @fire_risk_bp.route("/api/risk/region", methods=["POST"])
-def get_risk_for_region():
+async def get_risk_for_region():
     """
     Endpoint para obter o risco de incêndio para uma região.
     
     Request body:
         bounds (dict): Limites da região {north, south, east, west}
         grid_size (int, optional): Tamanho da grade para amostragem
+        mode (str, optional): "grid" (padrão) ou "adaptive" (quadtree refinada onde o risco varia)
+        tolerance (float, optional): Modo adaptativo: diferença de risco que leva a subdividir uma célula
+        max_depth (int, optional): Modo adaptativo: profundidade máxima da quadtree (até ADAPTIVE_MAX_DEPTH)
+        max_calls (int, optional): Modo adaptativo: número máximo de pontos amostrados (até ADAPTIVE_MAX_CALLS)
+        min_depth (int, optional): Modo adaptativo: profundidade da grade inicial (padrão: 1)
+        include (list|str, optional): Campos opcionais; "maps" acrescenta o HTML dos mapas
+        format (str, optional): json (padrão), columnar, msgpack ou npz; também negociável por Accept
     
     Returns:
-        JSON: Dados de risco de incêndio para a região
+        JSON: Dados de risco de incêndio para a região, com result_id para obter os mapas
     """
     try:
         data = request.json
-        if not data or "bounds" not in data:
-            return jsonify({"error": "Corpo da requisição inválido ou faltando 'bounds'."}), 400
-            
+        error = _region_body_error(data)
+        if error:
+            return jsonify({"error": error}), 400
+        
         bounds = data.get("bounds")
         grid_size = int(data.get("grid_size", 5))
         
-        if not all(k in bounds for k in ("north", "south", "east", "west")):
-             return jsonify({"error": "Objeto 'bounds' incompleto. Necessário: north, south, east, west."}), 400
-
-        result = controller.calculate_fire_risk_for_region(bounds, grid_size)
-        return jsonify(result)
+        if data.get("mode") == "adaptive":
+            result = await controller.calculate_fire_risk_for_region_adaptive_async(
+                bounds, **_adaptive_params(data)
+            )
+        else:
+            result = await controller.calculate_fire_risk_for_region_async(bounds, grid_size)
+        if "maps" in _includes(data.get("include")):
+            result = controller.attach_maps(result)
+        return _encoded_response(result, _region_format(data.get("format") or request.args.get("format")))
     except ValueError as ve:
         print(f"Erro de valor nos parâmetros: {ve}")
-        return jsonify({"error": "Parâmetros inválidos. Verifique os limites e grid_size."}), 400
+        return jsonify({"error": "Parâmetros inválidos. Verifique os limites, grid_size e os parâmetros do modo adaptativo."}), 400
     except Exception as e:
         print(f"Erro inesperado em /api/risk/region: {e}")
         traceback.print_exc()
         return jsonify({"error": "Ocorreu um erro interno no servidor."}), 500
 
+@fire_risk_bp.route("/api/risk/region/stream", methods=["POST"])
+def stream_risk_for_region():
+    """
+    Endpoint para obter o risco de incêndio de uma região de forma progressiva (NDJSON).
+    
+    Aceita o mesmo corpo que /api/risk/region. A resposta tem um objeto JSON por linha:
+    'start', depois um 'point' (ou 'point_error') por ponto, pela ordem em que ficam
+    prontos, e por fim 'summary' com o risco médio e o result_id para obter os mapas.
+    
+    Request body:
+        include (list|str, optional): Campos opcionais; "maps" acrescenta o HTML dos mapas ao 'summary'
+    
+    Returns:
+        Response: Fluxo application/x-ndjson
+    """
+    try:
+        data = request.json
+        error = _region_body_error(data)
+        if error:
+            return jsonify({"error": error}), 400
+        
+        events = controller.stream_fire_risk_for_region(
+            data["bounds"],
+            grid_size=int(data.get("grid_size", 5)),
+            adaptive=_adaptive_params(data) if data.get("mode") == "adaptive" else None
+        )
+        include_maps = "maps" in _includes(data.get("include"))
+    except ValueError as ve:
+        print(f"Erro de valor nos parâmetros: {ve}")
+        return jsonify({"error": "Parâmetros inválidos. Verifique os limites, grid_size e os parâmetros do modo adaptativo."}), 400
+    except Exception as e:
+        print(f"Erro inesperado em /api/risk/region/stream: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "Ocorreu um erro interno no servidor."}), 500
+    
+    def generate():
+        try:
+            for event in events:
+                if event["type"] == "summary" and include_maps:
+                    event = controller.attach_maps(event)
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+        except Exception as e:
+            # O estado HTTP já foi enviado; o erro segue como último evento do fluxo
+            print(f"Erro inesperado em /api/risk/region/stream: {e}")
+            traceback.print_exc()
+            yield json.dumps({"type": "error", "error": "Ocorreu um erro interno no servidor."}) + "\n"
+    
+    return _ndjson_response(generate())
+
+@fire_risk_bp.route("/api/risk/region/jobs", methods=["POST"])
+def submit_region_job():
+    """
+    Endpoint para calcular o risco de uma região em segundo plano.
+    
+    Aceita o mesmo corpo que /api/risk/region e responde de imediato com a tarefa.
+    Um pedido idêntico a uma tarefa ainda em curso recebe essa mesma tarefa.
+    
+    Returns:
+        JSON: Estado da tarefa (HTTP 202), com o endereço para consulta em Location
+    """
+    try:
+        data = request.json
+        error = _region_body_error(data)
+        if error:
+            return jsonify({"error": error}), 400
+        
+        job, created = controller.submit_region_job(
+            data["bounds"],
+            grid_size=int(data.get("grid_size", 5)),
+            adaptive=_adaptive_params(data) if data.get("mode") == "adaptive" else None
+        )
+    except ValueError as ve:
+        print(f"Erro de valor nos parâmetros: {ve}")
+        return jsonify({"error": "Parâmetros inválidos. Verifique os limites, grid_size e os parâmetros do modo adaptativo."}), 400
+    except JobQueueFull as e:
+        response = jsonify({"error": str(e), "retry_after": e.retry_after})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+    except Exception as e:
+        print(f"Erro inesperado em /api/risk/region/jobs: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "Ocorreu um erro interno no servidor."}), 500
+    
+    body = job.to_dict(include_result=False)
+    body["deduplicated"] = not created
+    response = jsonify(body)
+    response.status_code = 202
+    response.headers["Location"] = f"/api/risk/region/jobs/{job.id}"
+    return response
+
+@fire_risk_bp.route("/api/risk/region/jobs/<job_id>", methods=["GET"])
+def get_region_job(job_id):
+    """
+    Endpoint para consultar uma tarefa de região.
+    
+    Query params:
+        include (str, optional): Campos opcionais do resultado; "maps" acrescenta o HTML dos mapas
+    
+    Returns:
+        JSON: Estado e progresso da tarefa, com o resultado quando terminada
+    """
+    job = controller.job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Tarefa não encontrada ou expirada."}), 404
+    
+    body = job.to_dict()
+    if "result" in body and "maps" in _includes(request.args.get("include")):
+        body["result"] = controller.attach_maps(body["result"])
+    return jsonify(body)
+
+@fire_risk_bp.route("/api/risk/region/jobs/<job_id>/stream", methods=["GET"])
+def stream_region_job(job_id):
+    """
+    Endpoint para acompanhar uma tarefa de região em fluxo NDJSON.
+    
+    Emite os eventos já publicados e os seguintes, no mesmo formato de
+    /api/risk/region/stream, até a tarefa terminar.
+    
+    Query params:
+        since (int, optional): Número de eventos já recebidos, para retomar o fluxo
+    
+    Returns:
+        Response: Fluxo application/x-ndjson
+    """
+    job = controller.job_manager.get(job_id)
+    if job is None:
+        return jsonify({"error": "Tarefa não encontrada ou expirada."}), 404
+    
+    try:
+        since = max(0, int(request.args.get("since", 0)))
+    except ValueError:
+        return jsonify({"error": "Parâmetro 'since' inválido."}), 400
+    
+    def generate():
+        position = since
+        while True:
+            events, finished = job.wait_events(position, timeout=15)
+            for event in events:
+                yield json.dumps(event, ensure_ascii=False) + "\n"
+            position += len(events)
+            if finished and position >= len(job.events):
+                return
+            if not events:
+                # Manter a conexão viva enquanto a tarefa aguarda na fila
+                yield json.dumps({"type": "heartbeat", "status": job.status}) + "\n"
+    
+    return _ndjson_response(generate())
+
+@fire_risk_bp.route("/api/risk/tiles/<int:z>/<int:x>/<int:y>.png", methods=["GET"])
+def get_risk_tile(z, x, y):
+    """
+    Endpoint para obter um mosaico PNG de risco de incêndio (esquema XYZ, Web Mercator).
+    
+    Os mosaicos são reutilizados durante o seu tempo de vida; pedidos com
+    If-None-Match igual à ETag atual recebem HTTP 304. Mosaicos sem nenhuma
+    observação são enviados com no-store, para não ficarem em cache no cliente.
+    
+    Returns:
+        Response: Imagem PNG com Cache-Control e ETag
+    """
+    try:
+        tile = controller.tile_service.get_tile(z, x, y)
+    except ValueError as ve:
+        return jsonify({"error": str(ve)}), 400
+    except Exception as e:
+        print(f"Erro inesperado em /api/risk/tiles: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "Ocorreu um erro interno no servidor."}), 500
+    
+    if tile.etag in request.if_none_match:
+        response = Response(status=304)
+    else:
+        response = Response(tile.png, mimetype="image/png")
+    response.set_etag(tile.etag)
+    if tile.ttl > 0:
+        response.headers["Cache-Control"] = f"public, max-age={tile.max_age()}"
+    else:
+        response.headers["Cache-Control"] = "no-store"
+    return response
+
 @fire_risk_bp.route("/api/risk/regional", methods=["GET"])
-def get_regional_risk():
+async def get_regional_risk():
     """
     Endpoint para obter o risco de incêndio para uma localização e suas regiões vizinhas.
     
@@ -105,9 +458,10 @@ def get_regional_risk():
         lon (float): Longitude da localização central
         radius (float, optional): Raio em graus para os pontos vizinhos
         num_points (int, optional): Número de pontos vizinhos
+        include (str, optional): Campos opcionais; "maps" acrescenta heatmap_html
     
     Returns:
-        JSON: Dados de risco de incêndio regional e comparações
+        JSON: Dados de risco de incêndio regional e comparações, com result_id para obter o mapa
     """
     try:
         lat = float(request.args.get("lat"))
@@ -122,8 +476,10 @@ def get_regional_risk():
              return jsonify({"error": "Raio deve estar entre 0.1 e 2.0."}), 400
         if not (4 <= num_points <= 16):
              return jsonify({"error": "Número de pontos deve estar entre 4 e 16."}), 400
-
-        result = controller.calculate_regional_fire_risk(lat, lon, radius, num_points)
+        
+        result = await controller.calculate_regional_fire_risk_async(lat, lon, radius, num_points)
+        if "maps" in _includes(request.args.get("include")):
+            result = controller.attach_maps(result)
         return jsonify(result)
     except ValueError as ve:
         print(f"Erro de valor nos parâmetros: {ve}")
@@ -136,6 +492,170 @@ def get_regional_risk():
         # Retornar uma mensagem de erro genérica para o cliente
         return jsonify({"error": "Ocorreu um erro ao processar a análise regional."}), 500
 
+@fire_risk_bp.route("/api/risk/results/<result_id>", methods=["GET"])
+def get_stored_result(result_id):
+    """
+    Endpoint para obter um resultado recente de região ou de análise regional.
+    
+    Query params:
+        include (str, optional): Campos opcionais; "maps" acrescenta o HTML dos mapas
+        format (str, optional): Para regiões: json (padrão), columnar, msgpack ou npz
+    
+    Returns:
+        JSON: Resultado guardado
+    """
+    stored = controller.result_store.get(result_id)
+    if stored is None:
+        return jsonify({"error": "Resultado não encontrado ou expirado."}), 404
+    
+    result = dict(stored.result, result_id=result_id)
+    if "maps" in _includes(request.args.get("include")):
+        result = controller.attach_maps(result)
+    if stored.kind == "region":
+        return _encoded_response(result, _region_format(request.args.get("format")))
+    return jsonify(result)
+
+@fire_risk_bp.route("/api/risk/results/<result_id>/maps/<kind>", methods=["GET"])
+def get_result_map(result_id, kind):
+    """
+    Endpoint para obter o mapa de um resultado como página HTML.
+    
+    Args:
+        kind (str): "risk" (marcadores por ponto, só para regiões) ou "heat" (mapa de calor)
+    
+    Returns:
+        Response: Página HTML do mapa
+    """
+    if kind not in ("risk", "heat"):
+        return jsonify({"error": "Tipo de mapa inválido. Use 'risk' ou 'heat'."}), 400
+    
+    maps = controller.render_result_maps(result_id, kinds=[kind])
+    if maps is None:
+        return jsonify({"error": "Resultado não encontrado ou expirado."}), 404
+    if kind not in maps:
+        return jsonify({"error": "Este resultado não tem mapa deste tipo."}), 404
+    
+    response = Response(maps[kind], mimetype="text/html")
+    # O resultado é imutável: o mesmo identificador produz sempre o mesmo mapa
+    response.headers["Cache-Control"] = f"private, max-age={int(controller.result_store.ttl)}"
+    return response
+
+@fire_risk_bp.route("/api/risk/forecast", methods=["GET"])
+def get_risk_forecast():
+    """
+    Endpoint para obter a evolução do risco de incêndio ao longo da previsão de 5 dias.
+    
+    Query params:
+        lat (float): Latitude da localização
+        lon (float): Longitude da localização
+        window_hours (float, optional): Duração da janela de maior risco, em horas
+    
+    Returns:
+        JSON: Série temporal de risco, instante de pico e janela de maior risco
+    """
+    try:
+        lat = float(request.args.get("lat"))
+        lon = float(request.args.get("lon"))
+        window_hours = float(request.args.get("window_hours", 24))
+        
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            return jsonify({"error": "Latitude ou longitude inválida."}), 400
+        if not (3 <= window_hours <= 120):
+            return jsonify({"error": "window_hours deve estar entre 3 e 120."}), 400
+        
+        result = controller.calculate_fire_risk_forecast(lat, lon, window_hours)
+        return jsonify(result)
+    except (TypeError, ValueError) as ve:
+        print(f"Erro de valor nos parâmetros: {ve}")
+        return jsonify({"error": "Parâmetros inválidos. Verifique lat, lon e window_hours."}), 400
+    except RateLimitExceeded as rle:
+        return _rate_limited_response(rle)
+    except CircuitOpenError as coe:
+        return _unavailable_response(coe)
+    except requests.exceptions.RequestException as ue:
+        print(f"OpenWeather indisponível em /api/risk/forecast: {ue}")
+        return jsonify({"error": "Serviço meteorológico indisponível."}), 503
+    except Exception as e:
+        print(f"Erro inesperado em /api/risk/forecast: {e}")
+        traceback.print_exc()
+        return jsonify({"error": "Ocorreu um erro interno no servidor."}), 500
+
+@fire_risk_bp.route("/api/risk/stats", methods=["GET"])
+def get_weather_stats():
+    """
+    Endpoint para obter estatísticas da camada meteorológica (caches, conexões, quota e disjuntor).
+    
+    Returns:
+        JSON: Estatísticas de utilização
+    """
+    stats = controller.weather_service.get_stats()
+    if controller.prefetch_scheduler is not None:
+        stats['prefetch'] = controller.prefetch_scheduler.get_stats()
+    stats['jobs'] = controller.job_manager.get_stats()
+    stats['tiles'] = controller.tile_service.get_stats()
+    stats['results'] = controller.result_store.get_stats()
+    stats['maps'] = controller.maps_service.get_stats()
+    stats['spatial_index'] = controller.spatial_index.get_stats()
+    return jsonify(stats)
+
+@fire_risk_bp.route("/api/risk/watch", methods=["GET"])
+def list_watched_areas():
+    """
+    Endpoint para listar as áreas vigiadas pela atualização antecipada.
+    
+    Returns:
+        JSON: Áreas vigiadas e estatísticas do agendador
+    """
+    if controller.prefetch_scheduler is None:
+        return jsonify({"error": "Atualização antecipada desativada (PREFETCH_ENABLED=1 para ativar)."}), 503
+    
+    return jsonify({
+        "watches": controller.prefetch_scheduler.list_watches(),
+        "stats": controller.prefetch_scheduler.get_stats()
+    })
+
+@fire_risk_bp.route("/api/risk/watch", methods=["POST"])
+def add_watched_area():
+    """
+    Endpoint para registar uma área vigiada.
+    
+    Request body:
+        name (str, optional): Nome da área
+        lat, lon (float): Coordenadas, para vigiar um ponto
+        bounds (dict): Limites {north, south, east, west}, para vigiar uma região
+        grid_size (int, optional): Tamanho da grade da região
+    
+    Returns:
+        JSON: Área registada
+    """
+    if controller.prefetch_scheduler is None:
+        return jsonify({"error": "Atualização antecipada desativada (PREFETCH_ENABLED=1 para ativar)."}), 503
+    
+    data = request.json
+    if not data or not ("bounds" in data or ("lat" in data and "lon" in data)):
+        return jsonify({"error": "Corpo da requisição inválido. Forneça lat/lon ou bounds."}), 400
+    
+    try:
+        return jsonify(controller.watch_area(data)), 201
+    except (KeyError, TypeError, ValueError) as ve:
+        print(f"Erro de valor nos parâmetros: {ve}")
+        return jsonify({"error": "Parâmetros inválidos. Verifique lat/lon, bounds e grid_size."}), 400
+
+@fire_risk_bp.route("/api/risk/watch/<int:watch_id>", methods=["DELETE"])
+def remove_watched_area(watch_id):
+    """
+    Endpoint para remover uma área vigiada.
+    
+    Returns:
+        JSON: Confirmação da remoção
+    """
+    if controller.prefetch_scheduler is None:
+        return jsonify({"error": "Atualização antecipada desativada (PREFETCH_ENABLED=1 para ativar)."}), 503
+    
+    if not controller.prefetch_scheduler.unwatch(watch_id):
+        return jsonify({"error": f"Área vigiada {watch_id} não encontrada."}), 404
+    return jsonify({"removed": watch_id})
+
 @fire_risk_bp.route("/risk/map", methods=["GET"])
 def show_risk_map():
     """
@@ -5,6 +5,11 @@ let routeMap = null;
 let graphVisualization = null;
 let currentViewMode = 'heap'; // 'heap' ou 'queue'
 
+// Paginação da tabela de chamados: cursores das páginas já visitadas
+const QUEUE_PAGE_SIZE = 50;
+let queuePageCursors = [null];
+let queueNextCursor = null;
+
 // Inicializar quando a página carregar
 document.addEventListener('DOMContentLoaded', function() {
     setupFormListeners();
@@ -23,6 +28,7 @@ document.addEventListener('DOMContentLoaded', function() {
         this.classList.remove('btn-outline-dark');
         document.getElementById('viewHeapBtn').classList.add('btn-outline-dark');
         document.getElementById('viewHeapBtn').classList.remove('btn-dark');
+        resetEmergencyPaging();
         loadEmergencyCalls();
     });
     
@@ -32,9 +38,25 @@ document.addEventListener('DOMContentLoaded', function() {
         this.classList.remove('btn-outline-dark');
         document.getElementById('viewQueueBtn').classList.add('btn-outline-dark');
         document.getElementById('viewQueueBtn').classList.remove('btn-dark');
+        resetEmergencyPaging();
         loadEmergencyCalls();
     });
     
+    // Configurar botões de paginação dos chamados
+    document.getElementById('queuePrevBtn').addEventListener('click', function() {
+        if (queuePageCursors.length > 1) {
+            queuePageCursors.pop();
+            loadEmergencyCalls();
+        }
+    });
+    
+    document.getElementById('queueNextBtn').addEventListener('click', function() {
+        if (queueNextCursor !== null) {
+            queuePageCursors.push(queueNextCursor);
+            loadEmergencyCalls();
+        }
+    });
+    
     // Configurar botão de cálculo de rota
     document.getElementById('calculateRouteBtn').addEventListener('click', calculateAndDisplayRoute);
     
@@ -205,14 +227,34 @@ function initializeMap() {
     }).addTo(routeMap);
 }
 
-// Carregar chamados de emergência
+// Voltar à primeira página de chamados
+function resetEmergencyPaging() {
+    queuePageCursors = [null];
+    queueNextCursor = null;
+}
+
+// Carregar uma página de chamados de emergência
 function loadEmergencyCalls() {
     const endpoint = currentViewMode === 'heap' ? '/api/dispatch/prioritized' : '/api/dispatch/calls';
+    const cursor = queuePageCursors[queuePageCursors.length - 1];
+    let url = `${endpoint}?limit=${QUEUE_PAGE_SIZE}`;
+    if (cursor !== null) {
+        url += `&cursor=${encodeURIComponent(cursor)}`;
+    }
     
-    fetch(endpoint)
+    fetch(url)
         .then(response => response.json())
         .then(data => {
-            updateEmergencyQueueTable(data);
+            // A página atual pode ter ficado vazia (chamados resolvidos ou arquivados)
+            if (data.items.length === 0 && queuePageCursors.length > 1) {
+                queuePageCursors.pop();
+                loadEmergencyCalls();
+                return;
+            }
+            
+            queueNextCursor = data.next_cursor;
+            updateEmergencyQueueTable(data.items);
+            updateEmergencyPaging(data.total);
         })
         .catch(error => {
             console.error('Erro ao carregar chamados:', error);
@@ -302,6 +344,16 @@ function calculateAndDisplayRoute() {
         });
 }
 
+// Atualizar controles de paginação dos chamados
+function updateEmergencyPaging(total) {
+    const page = queuePageCursors.length;
+    const pages = Math.max(1, Math.ceil(total / QUEUE_PAGE_SIZE));
+    
+    document.getElementById('queuePageInfo').textContent = `Página ${page} de ${pages} (${total} chamados)`;
+    document.getElementById('queuePrevBtn').disabled = page === 1;
+    document.getElementById('queueNextBtn').disabled = queueNextCursor === null;
+}
+
 // Atualizar tabela de chamados
 function updateEmergencyQueueTable(emergencies) {
     const tableBody = document.getElementById('emergencyQueue');
@@ -806,12 +858,10 @@ function updateRouteDetails(route) {
 // Mostrar modal de atribuição de equipe
 function showAssignTeamModal(emergencyId) {
     // Buscar dados do chamado
-    fetch('/api/dispatch/prioritized')
+    fetch(`/api/dispatch/calls/${emergencyId}`)
         .then(response => response.json())
-        .then(data => {
-            const emergency = data.find(item => item.id === parseInt(emergencyId));
-            
-            if (!emergency) {
+        .then(emergency => {
+            if (!emergency || !emergency.id) {
                 alert('Chamado não encontrado!');
                 return;
             }
@@ -914,12 +964,11 @@ function showTeamAssignmentModal(teamId) {
                 </div>
             `;
             
-            // Buscar chamados pendentes
-            fetch('/api/dispatch/prioritized')
+            // Buscar o chamado pendente de maior prioridade
+            fetch('/api/dispatch/prioritized?status=pendente&limit=1')
                 .then(response => response.json())
-                .then(emergencies => {
-                    // Filtrar chamados pendentes
-                    const pendingEmergencies = emergencies.filter(e => e.status === 'pendente');
+                .then(page => {
+                    const pendingEmergencies = page.items;
                     
                     if (pendingEmergencies.length === 0) {
                         alert('Não há chamados pendentes para atribuir a esta equipe.');
@@ -25,6 +25,15 @@ function initMap() {
         maxZoom: 18
     }).addTo(map);
     
+    // Camada de mosaicos de risco renderizados no servidor (só são pedidos os mosaicos visíveis)
+    const riskTiles = L.tileLayer('/api/risk/tiles/{z}/{x}/{y}.png', {
+        minZoom: 6,
+        maxZoom: 14,
+        opacity: 0.7,
+        attribution: 'Risco: OpenWeather'
+    });
+    L.control.layers(null, { 'Mosaicos de risco': riskTiles }).addTo(map);
+    
     // Inicializar o plugin de desenho
     initDrawControl();
     
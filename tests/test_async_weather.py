@@ -0,0 +1,119 @@
+"""
+Testes do cliente assíncrono da OpenWeather contra um servidor HTTP local (sem rede).
+
+Executar a partir da raiz do repositório com: python -m pytest -q tests
+"""
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+
+# Latência simulada de cada resposta da API, em segundos
+STUB_LATENCY = 0.05
+
+class StubOpenWeatherHandler(BaseHTTPRequestHandler):
+    """Responde a /weather como a OpenWeather, após STUB_LATENCY segundos."""
+    
+    protocol_version = "HTTP/1.1"
+    connections = set()
+    in_flight = 0
+    max_in_flight = 0
+    lock = threading.Lock()
+    
+    def log_message(self, *args):
+        pass
+    
+    def do_GET(self):
+        cls = type(self)
+        with cls.lock:
+            cls.connections.add(self.client_address)
+            cls.in_flight += 1
+            cls.max_in_flight = max(cls.max_in_flight, cls.in_flight)
+        query = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+        time.sleep(STUB_LATENCY)
+        with cls.lock:
+            cls.in_flight -= 1
+        lat, lon = float(query.get("lat", 0)), float(query.get("lon", 0))
+        body = json.dumps({
+            "coord": {"lat": lat, "lon": lon},
+            "name": "Stub",
+            "main": {"temp": 20 + abs(lat) % 15, "humidity": 40},
+            "wind": {"speed": 4},
+            "weather": [{"description": "céu limpo"}]
+        }).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+@pytest.fixture(scope="module")
+def stub_url():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubOpenWeatherHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}/data/2.5"
+    server.shutdown()
+
+@pytest.fixture
+def controller(stub_url, monkeypatch):
+    monkeypatch.setenv("OPENWEATHER_API_KEY", "test")
+    monkeypatch.setenv("OPENWEATHER_BASE_URL", stub_url)
+    monkeypatch.setenv("OPENWEATHER_CALLS_PER_MINUTE", "60000")
+    monkeypatch.setenv("WEATHER_ASYNC_MAX_CONCURRENCY", "16")
+    from src.models.fire_risk_controller import FireRiskController
+    return FireRiskController()
+
+def _bounds(offset):
+    # Regiões distintas por teste, para que o cache não responda no lugar da API
+    return {"north": -10 - offset, "south": -11 - offset, "east": -40, "west": -41}
+
+def test_async_region_is_faster_than_sequential_sync(controller):
+    grid_size = 5  # grade de 6 x 6 = 36 pontos
+    
+    # Aquecer ambos os caminhos (conexões, threads) para medir só as chamadas à API
+    controller.calculate_fire_risk_for_location(-20, -45)
+    asyncio.run(controller.calculate_fire_risk_for_location_async(-21, -45))
+    
+    started = time.perf_counter()
+    sync_result = controller.calculate_fire_risk_for_region(_bounds(0), grid_size, max_workers=1)
+    sync_elapsed = time.perf_counter() - started
+    
+    started = time.perf_counter()
+    async_result = asyncio.run(controller.calculate_fire_risk_for_region_async(_bounds(2), grid_size))
+    async_elapsed = time.perf_counter() - started
+    
+    assert len(sync_result["fire_risk"]["points"]) == (grid_size + 1) ** 2
+    assert len(async_result["fire_risk"]["points"]) == (grid_size + 1) ** 2
+    # 36 chamadas de 50 ms: ~1,8 s em sequência contra ~0,15 s com 16 em simultâneo
+    assert async_elapsed * 3 < sync_elapsed, (sync_elapsed, async_elapsed)
+
+def test_async_client_is_shared_across_request_loops(controller):
+    StubOpenWeatherHandler.connections.clear()
+    
+    # Cada pedido Flask assíncrono corre no seu próprio loop, como asyncio.run
+    for i in range(5):
+        asyncio.run(controller.calculate_fire_risk_for_location_async(-30 - i, -50))
+    
+    # As conexões keep-alive do cliente partilhado são reutilizadas entre pedidos
+    assert len(StubOpenWeatherHandler.connections) == 1
+
+def test_async_concurrency_is_bounded_per_process(controller):
+    StubOpenWeatherHandler.max_in_flight = 0
+    
+    # Quatro pedidos de região simultâneos, cada um no seu loop e na sua thread
+    threads = [
+        threading.Thread(target=asyncio.run,
+                         args=(controller.calculate_fire_risk_for_region_async(_bounds(10 + 2 * i), 5),))
+        for i in range(4)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    
+    # 144 pontos no total, mas nunca mais chamadas simultâneas do que WEATHER_ASYNC_MAX_CONCURRENCY
+    assert 1 < StubOpenWeatherHandler.max_in_flight <= 16